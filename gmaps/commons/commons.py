@@ -5,7 +5,9 @@ Funciones de utilidades comunes para la extracción de la información que se us
 import json
 import logging
 import os
+import re
 import sys
+import unicodedata
 
 
 def init_default_handler(level=None, root_dir=None, name=None, date=None):
@@ -108,3 +110,24 @@ def get_zip_codes_obj_config(input_config=None, reader=None):
             return None
     else:
         return None
+
+
+def normalize_text(text=None):
+    """Función para normalizar un texto de forma que se pueda comparar con otro independientemente de las tildes, las
+    mayúsculas y los espacios en blanco.
+
+    Parameters
+    ----------
+    text : str
+        texto que se normalizará
+
+    Returns
+    -------
+    str
+        texto sin tildes ni diacríticos, en minúsculas y con los espacios en blanco consecutivos reducidos a uno solo
+    """
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    without_accents = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", without_accents).strip().casefold()
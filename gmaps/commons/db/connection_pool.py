@@ -0,0 +1,239 @@
+import collections
+import functools
+import logging
+import multiprocessing.util
+import os
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+
+from gmaps.commons.metrics.metrics import get_metrics
+
+
+class ConnectionPool:
+    """Pool de conexiones a una base de datos que se comparten entre los `readers` y `writers` que se ejecutan dentro de
+    un mismo proceso. En lugar de abrir y cerrar una conexión por cada local comercial, los `readers` y `writers` toman
+    prestada (`acquire`) una conexión del pool y la devuelven (`release`) al terminar, de forma que la base de datos no
+    tiene que arrancar un nuevo backend y autenticar al usuario en cada local.
+
+    Las conexiones que llevan un tiempo ociosas se comprueban antes de prestarlas y se sustituyen por una nueva si el
+    servidor las ha cerrado. El número de conexiones abiertas a la vez por el pool está limitado por `max_connections`;
+    si se alcanza, los préstamos esperan a que se devuelva alguna.
+
+    ...
+    Attributes
+    ----------
+    logger : logging.Logger
+        logger de la clase
+    _name : str
+        nombre del pool, usado en las trazas
+    _connect : callable
+        función sin argumentos que abre una nueva conexión
+    _max_connections : int
+        número máximo de conexiones abiertas a la vez, prestadas u ociosas
+    _health_check_seconds : float
+        segundos ociosa a partir de los cuales se comprueba una conexión antes de prestarla
+    _max_idle_seconds : float
+        segundos ociosa a partir de los cuales una conexión se cierra en lugar de prestarla
+    _acquire_timeout : float
+        segundos de espera máxima a que se devuelva una conexión cuando se ha alcanzado `max_connections`
+    _idle : collections.deque
+        conexiones disponibles e instante en que se devolvieron
+    _opened : int
+        número de conexiones abiertas, prestadas u ociosas
+    _condition : threading.Condition
+        condición para proteger el acceso concurrente a `_idle` y esperar a que se devuelva una conexión
+
+    Methods
+    -------
+    acquire()
+        presta una conexión sana del pool, abriendo una nueva si no hay ninguna disponible
+    release(connection)
+        devuelve una conexión al pool, deshaciendo la transacción que tuviese abierta
+    shutdown()
+        cierra todas las conexiones ociosas del pool
+    """
+
+    def __init__(self, connect, name=None, max_connections=2, health_check_seconds=30, max_idle_seconds=600,
+                 acquire_timeout=60):
+        """Constructor de la clase
+
+        Parameters
+        ----------
+        connect : callable
+            función sin argumentos que abre una nueva conexión
+        name : str
+            nombre del pool
+        max_connections : int
+            número máximo de conexiones abiertas a la vez
+        health_check_seconds : float
+            segundos ociosa a partir de los cuales se comprueba una conexión antes de prestarla
+        max_idle_seconds : float
+            segundos ociosa a partir de los cuales una conexión se cierra en lugar de prestarla
+        acquire_timeout : float
+            segundos de espera máxima a que se devuelva una conexión
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._name = name if name else self.__class__.__name__
+        self._connect = connect
+        self._max_connections = max(int(max_connections), 1)
+        self._health_check_seconds = health_check_seconds
+        self._max_idle_seconds = max_idle_seconds
+        self._acquire_timeout = acquire_timeout
+        self._idle = collections.deque()
+        self._opened = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Presta una conexión del pool. Las conexiones ociosas cerradas, caducadas o que no superan la comprobación se
+        descartan. Si no hay ninguna disponible se abre una nueva, salvo que ya haya `max_connections` abiertas, en
+        cuyo caso se espera a que se devuelva alguna.
+
+        Returns
+        -------
+        psycopg2.extensions.connection
+            conexión prestada
+
+        Raises
+        ------
+        TimeoutError
+            si no se devuelve ninguna conexión en `acquire_timeout` segundos
+        psycopg2.OperationalError
+            si no se puede abrir una nueva conexión
+        """
+        init_time = time.time()
+        while True:
+            with self._condition:
+                is_available = self._condition.wait_for(lambda: self._idle or self._opened < self._max_connections,
+                                                        timeout=self._acquire_timeout)
+                if not is_available:
+                    raise TimeoutError("-{pool}-: no connection released after -{timeout}- seconds".format(
+                        pool=self._name, timeout=self._acquire_timeout))
+                connection, released_time = self._idle.popleft() if self._idle else (None, None)
+                if connection is None:
+                    # la conexión se reserva antes de abrirla para no superar `max_connections`
+                    self._opened += 1
+            if connection is None:
+                connection = self._open()
+                break
+            if self._is_healthy(connection, time.time() - released_time):
+                break
+            get_metrics().incr("db.reconnects")
+            self.logger.warning("-{pool}-: discarding broken or expired connection".format(pool=self._name))
+            self._discard(connection)
+        get_metrics().observe("db.acquire_seconds", time.time() - init_time)
+        return connection
+
+    def release(self, connection):
+        """Devuelve una conexión al pool. Si tiene una transacción abierta, se deshace para que el siguiente préstamo
+        no herede nada del anterior. Las conexiones cerradas o que no se pueden limpiar se descartan.
+
+        Parameters
+        ----------
+        connection : psycopg2.extensions.connection
+            conexión que se devuelve al pool
+        """
+        if connection is None:
+            return
+        try:
+            if not connection.closed and \
+                    connection.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except psycopg2.Error as e:
+            self.logger.warning("-{pool}-: connection could not be reset: {error}".format(pool=self._name,
+                                                                                         error=str(e)))
+        if connection.closed:
+            self._discard(connection)
+            return
+        with self._condition:
+            self._idle.append((connection, time.time()))
+            self._condition.notify()
+
+    def shutdown(self):
+        """Cierra todas las conexiones ociosas del pool."""
+        with self._condition:
+            connections = [connection for connection, _ in self._idle]
+            self._idle.clear()
+        self.logger.debug("-{pool}-: closing -{total}- idle connections".format(pool=self._name,
+                                                                                 total=len(connections)))
+        for connection in connections:
+            self._discard(connection)
+
+    def _open(self):
+        """Abre una nueva conexión. La reserva hecha en `acquire` se libera si no se puede abrir."""
+        try:
+            return self._connect()
+        except Exception:
+            with self._condition:
+                self._opened -= 1
+                self._condition.notify()
+            raise
+
+    def _is_healthy(self, connection, idle_seconds):
+        """Indica si una conexión ociosa se puede prestar: no está cerrada, no ha caducado y, si lleva ociosa más de
+        `health_check_seconds`, el servidor sigue respondiendo."""
+        if connection.closed or idle_seconds > self._max_idle_seconds:
+            return False
+        if idle_seconds <= self._health_check_seconds:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, connection):
+        """Cierra una conexión ignorando los errores y libera su hueco en el pool."""
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+        with self._condition:
+            self._opened -= 1
+            self._condition.notify()
+
+
+_pools = {}
+
+
+def get_connection_pool(host=None, database=None, db_user=None, db_pass=None, config=None):
+    """Devuelve el pool de conexiones del proceso actual a la base de datos indicada, creándolo si no existe. Los pools
+    se registran por pid para que los procesos hijos creados con `fork` no compartan las conexiones de su padre, y se
+    cierran automáticamente al terminar el proceso.
+
+    Parameters
+    ----------
+    host : str
+        host o fqdn donde se aloja la base de datos
+    database : str
+        nombre de la base de datos
+    db_user : str
+        usuario de la base de datos
+    db_pass : str
+        contraseña del usuario
+    config : dict
+        configuración opcional del pool: `max_connections`, `health_check_seconds`, `max_idle_seconds` y
+        `acquire_timeout`
+
+    Returns
+    -------
+    ConnectionPool
+        pool de conexiones asociado al proceso y a la base de datos
+    """
+    key = (os.getpid(), host, database, db_user)
+    pool = _pools.get(key)
+    if pool is None:
+        config = config if config else {}
+        keys = ["max_connections", "health_check_seconds", "max_idle_seconds", "acquire_timeout"]
+        pool = ConnectionPool(functools.partial(psycopg2.connect, host=host, user=db_user, password=db_pass,
+                                                database=database),
+                              name="{database}@{host}".format(database=database, host=host),
+                              **{key: config.get(key) for key in keys if config.get(key) is not None})
+        _pools[key] = pool
+        # los workers de multiprocessing terminan con os._exit, por lo que no se ejecuta `atexit`
+        multiprocessing.util.Finalize(pool, pool.shutdown, exitpriority=10)
+    return pool
@@ -68,6 +68,22 @@ sql_ocupation = """
     )
 """
 
+# segundos que se tardó en extraer cada local comercial, para estimar el coste de cada código postal
+sql_extraction_time = """
+    CREATE TABLE IF NOT EXISTS commercial_premise_extraction_time (
+        id SERIAL,
+        commercial_premise_id INTEGER NOT NULL,
+        seconds FLOAT NOT NULL,
+        date DATE NOT NULL,
+        hash_commercial_premise VARCHAR(600),
+        PRIMARY KEY(id),
+        FOREIGN KEY (commercial_premise_id)
+            REFERENCES commercial_premise(id)
+            ON DELETE CASCADE
+            ON UPDATE CASCADE
+    )
+"""
+
 sql_zip_codes_info = """
     CREATE TABLE IF NOT EXISTS zip_code_info (
         id SERIAL,
@@ -101,6 +117,12 @@ sql_index_creation = """
     CREATE UNIQUE INDEX commercial_premise_index ON commercial_premise (name, address, date)
 """
 
+# índice para la consulta de los comentarios ya registrados de un local comercial en la extracción incremental
+sql_comments_index_creation = """
+    CREATE INDEX IF NOT EXISTS commercial_premise_comments_hash_index
+        ON commercial_premise_comments (hash_commercial_premise)
+"""
+
 
 def _exec_drop(host=None, user=None, passwd=None, db_name=None, queries=[]):
     """Función encargada de eliminar las tablas en la base de datos.
@@ -219,10 +241,12 @@ def create_schema(host=None, user=None, passwd=None, db_name=None):
     tables = [sql_main_table,
               sql_comments,
               sql_ocupation,
+              sql_extraction_time,
               sql_zip_codes_info,
               sql_types_table_creation,
               sql_execution_table,
-              sql_index_creation]
+              sql_index_creation,
+              sql_comments_index_creation]
     _exec_create(host=host, user=user, passwd=passwd, db_name=db_name, queries=tables)
 
 
@@ -245,6 +269,7 @@ def drop_schema(host=None, user=None, passwd=None, db_name=None):
 
     drop_sql = ["DROP TABLE IF EXISTS commercial_premise_occupation",
                 "DROP TABLE IF EXISTS commercial_premise_comments",
+                "DROP TABLE IF EXISTS commercial_premise_extraction_time",
                 "DROP TABLE IF EXISTS commercial_premise",
                 "DROP INDEX IF EXISTS public.commercial_premise_index",
                 "DROP TABLE IF EXISTS execution_info",
@@ -297,6 +322,7 @@ def drop_results_schema(host=None, user=None, passwd=None, db_name=None):
 
     drop_sql = ["DROP TABLE IF EXISTS commercial_premise_occupation",
                 "DROP TABLE IF EXISTS commercial_premise_comments",
+                "DROP TABLE IF EXISTS commercial_premise_extraction_time",
                 "DROP TABLE IF EXISTS commercial_premise",
                 "DROP INDEX IF EXISTS commercial_premise_index"
                 ]
@@ -318,7 +344,8 @@ def create_results_schema(host=None, user=None, passwd=None, db_name=None):
             nombre de la base de datos a la que conectarse
 
         """
-    tables = [sql_main_table, sql_comments, sql_ocupation, sql_index_creation]
+    tables = [sql_main_table, sql_comments, sql_ocupation, sql_extraction_time, sql_index_creation,
+              sql_comments_index_creation]
     _exec_create(host=host, user=user, passwd=passwd, db_name=db_name, queries=tables)
 
 
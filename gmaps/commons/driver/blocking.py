@@ -0,0 +1,163 @@
+import logging
+
+from selenium.common.exceptions import WebDriverException
+
+# patrones de urls (formato de `Network.setBlockedURLs`) de los recursos que no se usan durante la extracción
+_IMAGE_URL_PATTERNS = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.ico", "*.bmp"]
+_PHOTO_URL_PATTERNS = ["*googleusercontent.com/*", "*streetviewpixels-pa.googleapis.com/*", "*/maps/photometa/*"]
+_MAP_TILE_URL_PATTERNS = ["*/maps/vt?*", "*/maps/vt/*", "*/kh/v=*", "*khms*.google.com/*", "*/maps/api/js/StaticMapService*"]
+_MEDIA_URL_PATTERNS = ["*.mp4", "*.webm", "*.mp3", "*.ogg"]
+_FONT_URL_PATTERNS = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*fonts.gstatic.com/*", "*fonts.googleapis.com/*"]
+
+_BLOCKED_CONTENT_SETTINGS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.default_content_setting_values.notifications": 2,
+    "profile.default_content_setting_values.geolocation": 2,
+    "profile.default_content_setting_values.media_stream": 2
+}
+
+RESOURCE_BLOCKING_PRESETS = {
+    # no se bloquea ningún recurso, equivalente a no configurar el bloqueo
+    "none": {
+        "arguments": [],
+        "prefs": {},
+        "blocked_urls": []
+    },
+    # se bloquean imágenes, fotos, teselas del mapa y multimedia pero se mantienen fuentes y estilos para que el
+    # gráfico de ocupación por horas se renderice y sea visible
+    "with-occupancy": {
+        "arguments": ["--blink-settings=imagesEnabled=false"],
+        "prefs": _BLOCKED_CONTENT_SETTINGS,
+        "blocked_urls": _IMAGE_URL_PATTERNS + _PHOTO_URL_PATTERNS + _MAP_TILE_URL_PATTERNS + _MEDIA_URL_PATTERNS
+    },
+    # sólo se necesita el texto de la página: además de lo anterior se bloquean las fuentes
+    "text-only": {
+        "arguments": ["--blink-settings=imagesEnabled=false"],
+        "prefs": _BLOCKED_CONTENT_SETTINGS,
+        "blocked_urls": _IMAGE_URL_PATTERNS + _PHOTO_URL_PATTERNS + _MAP_TILE_URL_PATTERNS + _MEDIA_URL_PATTERNS +
+        _FONT_URL_PATTERNS
+    }
+}
+
+# amplía el buffer de `performance` para poder medir todos los recursos descargados por la página
+_RESOURCE_TIMING_BUFFER_SCRIPT = "performance.setResourceTimingBufferSize(10000);"
+
+
+class ResourceBlockingProfile:
+    """Perfil de bloqueo de recursos para el navegador headless. Se aplica en el momento de construir el driver en dos
+    niveles: preferencias de contenido de Chrome (`prefs`) y bloqueo de urls por patrones a través del protocolo
+    DevTools (`Network.setBlockedURLs`).
+
+    ...
+    Attributes
+    ----------
+    logger : logging.Logger
+        logger de la clase
+    name : str
+        nombre del perfil
+    arguments : list
+        argumentos adicionales para `webdriver.ChromeOptions`
+    prefs : dict
+        preferencias de contenido de Chrome
+    blocked_urls : list
+        patrones de urls que se bloquean
+
+    Methods
+    -------
+    from_config(config)
+        construye el perfil a partir del nombre de un preset o de un diccionario de configuración
+    apply_options(driver_arguments, experimental_arguments)
+        añade los argumentos y preferencias del perfil a la configuración del driver
+    apply_driver(driver)
+        activa el bloqueo de urls en un driver ya construido
+    """
+
+    def __init__(self, name=None, arguments=None, prefs=None, blocked_urls=None):
+        """Constructor de la clase
+
+        Parameters
+        ----------
+        name : str
+            nombre del perfil
+        arguments : list
+            argumentos adicionales para `webdriver.ChromeOptions`
+        prefs : dict
+            preferencias de contenido de Chrome
+        blocked_urls : list
+            patrones de urls que se bloquean
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.name = name
+        self.arguments = arguments if arguments else []
+        self.prefs = prefs if prefs else {}
+        self.blocked_urls = blocked_urls if blocked_urls else []
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Construye el perfil a partir de la configuración `resource_blocking` de la ejecución. La configuración puede
+        ser el nombre de un preset (`none`, `with-occupancy`, `text-only`) o un diccionario con la clave `preset` y,
+        opcionalmente, `blocked_urls` y `prefs` adicionales.
+
+        Parameters
+        ----------
+        config : str or dict
+            configuración del bloqueo de recursos
+
+        Returns
+        -------
+        ResourceBlockingProfile
+            perfil configurado o None si no hay configuración
+
+        Raises
+        ------
+        ValueError
+            si el preset indicado no existe
+        """
+        if not config:
+            return None
+        config = {"preset": config} if isinstance(config, str) else config
+        preset_name = config.get("preset", "none")
+        if preset_name not in RESOURCE_BLOCKING_PRESETS:
+            raise ValueError("resource blocking preset -{preset}- is not supported. supported presets: {presets}"
+                             .format(preset=preset_name, presets=list(RESOURCE_BLOCKING_PRESETS.keys())))
+        preset = RESOURCE_BLOCKING_PRESETS.get(preset_name)
+        prefs = dict(preset.get("prefs"))
+        prefs.update(config.get("prefs", {}))
+        return cls(name=preset_name,
+                   arguments=preset.get("arguments"),
+                   prefs=prefs,
+                   blocked_urls=preset.get("blocked_urls") + config.get("blocked_urls", []))
+
+    def apply_options(self, driver_arguments, experimental_arguments):
+        """Añade los argumentos y preferencias del perfil a la configuración con la que se construye el driver.
+
+        Parameters
+        ----------
+        driver_arguments : list
+            argumentos del driver que se modificarán
+        experimental_arguments : dict
+            argumentos experimentales del driver que se modificarán
+        """
+        driver_arguments += [argument for argument in self.arguments if argument not in driver_arguments]
+        if self.prefs:
+            prefs = experimental_arguments.get("prefs", {})
+            prefs.update(self.prefs)
+            experimental_arguments["prefs"] = prefs
+
+    def apply_driver(self, driver):
+        """Activa el bloqueo de urls en un driver ya construido y amplía el buffer de medición de recursos de la
+        página.
+
+        Parameters
+        ----------
+        driver : webdriver.Chrome
+            driver sobre el que se activa el bloqueo
+        """
+        try:
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": _RESOURCE_TIMING_BUFFER_SCRIPT})
+            if self.blocked_urls:
+                driver.execute_cdp_cmd("Network.enable", {})
+                driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.blocked_urls})
+        except WebDriverException as e:
+            self.logger.warning("-{profile}-: resource blocking could not be applied: {error}".format(
+                profile=self.name, error=str(e)))
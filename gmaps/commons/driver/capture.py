@@ -0,0 +1,144 @@
+"""
+Captura de las respuestas de red que descarga la página a partir del log de rendimiento de Chrome
+(`goog:loggingPrefs`), para poder leer los datos directamente de las peticiones XHR en lugar de del DOM renderizado.
+"""
+import base64
+import json
+import logging
+
+from selenium.common.exceptions import WebDriverException
+
+from gmaps.commons.metrics.metrics import get_metrics
+
+PERFORMANCE_LOG_CAPABILITY = "goog:loggingPrefs"
+
+
+def enable_performance_log(capabilities):
+    """Activa el log de rendimiento de Chrome, que incluye los eventos de red, en las capabilities con las que se
+    construye el driver.
+
+    Parameters
+    ----------
+    capabilities : dict
+        capabilities del driver que se modificarán
+    """
+    logging_prefs = capabilities.get(PERFORMANCE_LOG_CAPABILITY, {})
+    logging_prefs["performance"] = "ALL"
+    capabilities[PERFORMANCE_LOG_CAPABILITY] = logging_prefs
+
+
+class NetworkCapture:
+    """Lee los eventos de red del log de rendimiento de un driver y guarda las respuestas cuya url contiene alguno de
+    los patrones configurados. El cuerpo de las respuestas se obtiene bajo demanda a través del protocolo DevTools
+    (`Network.getResponseBody`).
+
+    ...
+    Attributes
+    ----------
+    logger : logging.Logger
+        logger de la clase
+    driver : webdriver.Chrome
+        driver con el log de rendimiento activado
+    url_patterns : list
+        fragmentos de url de las respuestas que se capturan
+    is_available : bool
+        False si el driver no tiene el log de rendimiento activado
+    _pending : dict
+        respuestas recibidas que todavía no han terminado de descargarse, por id de petición
+    _finished : list
+        respuestas descargadas como tuplas (id de petición, url)
+    _bodies : dict
+        cuerpos de respuesta ya leídos, por id de petición
+
+    Methods
+    -------
+    reset()
+        descarta los eventos y respuestas capturados hasta el momento
+    poll()
+        procesa los eventos de red nuevos del log de rendimiento
+    response_finished(pattern)
+        condición de espera que se cumple cuando se ha descargado una respuesta que contiene `pattern`
+    get_bodies(pattern)
+        devuelve el cuerpo de las respuestas descargadas que contienen `pattern`
+    """
+
+    def __init__(self, driver, url_patterns=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.driver = driver
+        self.url_patterns = url_patterns if url_patterns else []
+        self.is_available = True
+        self._pending = {}
+        self._finished = []
+        self._bodies = {}
+
+    def reset(self):
+        """Descarta los eventos y respuestas capturados hasta el momento, por ejemplo antes de navegar a una nueva
+        página."""
+        self.poll()
+        self._pending = {}
+        self._finished = []
+        self._bodies = {}
+
+    def poll(self):
+        """Procesa los eventos de red nuevos del log de rendimiento. Si el driver no tiene el log activado, la captura
+        queda desactivada."""
+        if not self.is_available:
+            return
+        try:
+            entries = self.driver.get_log("performance")
+        except WebDriverException as e:
+            self.logger.warning("performance log is not available in driver: {error}".format(error=str(e)))
+            self.is_available = False
+            return
+        for entry in entries:
+            try:
+                message = json.loads(entry.get("message")).get("message", {})
+            except (TypeError, ValueError):
+                continue
+            method = message.get("method")
+            params = message.get("params", {})
+            request_id = params.get("requestId")
+            if method == "Network.responseReceived":
+                url = params.get("response", {}).get("url", "")
+                if any(pattern in url for pattern in self.url_patterns):
+                    self._pending[request_id] = url
+            elif method == "Network.loadingFinished" and request_id in self._pending:
+                self._finished.append((request_id, self._pending.pop(request_id)))
+            elif method == "Network.loadingFailed":
+                self._pending.pop(request_id, None)
+
+    def response_finished(self, pattern):
+        """Condición de espera, con el mismo contrato que `expected_conditions`, que se cumple cuando se ha descargado
+        alguna respuesta cuya url contiene `pattern`."""
+        def condition(driver):
+            self.poll()
+            return any(pattern in url for _, url in self._finished)
+        return condition
+
+    def get_bodies(self, pattern):
+        """Devuelve el cuerpo de las respuestas descargadas cuya url contiene `pattern`, en orden de llegada.
+
+        Returns
+        -------
+        list
+            cuerpos de las respuestas como texto
+        """
+        self.poll()
+        bodies = []
+        for request_id, url in self._finished:
+            if pattern not in url:
+                continue
+            if request_id not in self._bodies:
+                try:
+                    response = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+                except WebDriverException as e:
+                    self.logger.warning("body of response -{url}- is not available: {error}".format(url=url,
+                                                                                                  error=str(e)))
+                    continue
+                body = response.get("body", "")
+                if response.get("base64Encoded"):
+                    body = base64.b64decode(body).decode("utf-8", errors="replace")
+                self._bodies[request_id] = body
+                get_metrics().incr("capture.responses")
+            bodies.append(self._bodies.get(request_id))
+        return bodies
@@ -0,0 +1,324 @@
+import collections
+import logging
+import multiprocessing.util
+import os
+import threading
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+from gmaps.commons.metrics.metrics import get_metrics
+
+
+class DriverPool:
+    """Pool de instancias de chromedriver ya arrancadas que se comparten entre los distintos `extractores` que se
+    ejecutan dentro de un mismo proceso. En lugar de arrancar y finalizar un navegador por cada local comercial, los
+    extractores toman prestado (`acquire`) un driver del pool y lo devuelven (`release`) al terminar, de forma que el
+    siguiente extractor lo encuentra ya arrancado.
+
+    Los drivers de reserva que se están arrancando cuentan como ociosos al devolver un driver, por lo que el pool nunca
+    mantiene más de `max(size, standby)` navegadores arrancados además de los prestados.
+
+    ...
+    Attributes
+    ----------
+    logger : logging.Logger
+        logger de la clase
+    _name : str
+        nombre del pool, usado en las trazas
+    _size : int
+        número máximo de drivers ociosos que se mantienen arrancados en el pool
+    _idle : collections.deque
+        drivers arrancados y disponibles para ser prestados
+    _reset_url : str
+        url a la que se navega al devolver un driver para descargar la página anterior
+    _standby : int
+        número de drivers de reserva que se arrancan en segundo plano para el siguiente préstamo
+    _booting : int
+        número de drivers que se están arrancando en segundo plano
+    _leased : int
+        número de drivers prestados actualmente
+    _condition : threading.Condition
+        condición para proteger el acceso concurrente a `_idle` y esperar a los drivers que se están arrancando
+    _closed : bool
+        indica si el pool ha sido finalizado
+    _shutdown_timeout : int
+        tiempo máximo en segundos que se espera a los arranques en curso al finalizar el pool
+    _recycling_policy : gmaps.commons.driver.recycling.DriverRecyclingPolicy
+        política que decide cuándo se debe retirar un driver en lugar de devolverlo al pool
+
+    Methods
+    -------
+    acquire(builder)
+        presta un driver del pool, construyendo uno nuevo si no hay ninguno disponible
+    release(driver, builder=None)
+        devuelve un driver al pool tras limpiar su estado. Si el pool está lleno o no se puede limpiar, se finaliza
+    shutdown()
+        finaliza todos los drivers ociosos del pool
+    """
+
+    def __init__(self, size=1, name=None, reset_url="about:blank", recycling_policy=None, standby=0):
+        """Constructor de la clase
+
+        Parameters
+        ----------
+        size : int
+            número máximo de drivers ociosos que se mantienen arrancados
+        name : str
+            nombre del pool
+        reset_url : str
+            url a la que se navega para limpiar el driver entre préstamos
+        recycling_policy : gmaps.commons.driver.recycling.DriverRecyclingPolicy
+            política de reciclado de drivers. Opcional
+        standby : int
+            número de drivers de reserva que se arrancan en segundo plano. Limita la memoria usada por el arranque
+            anticipado
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._name = name if name else self.__class__.__name__
+        self._size = size
+        self._idle = collections.deque()
+        self._reset_url = reset_url
+        self._standby = standby
+        self._booting = 0
+        self._leased = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._shutdown_timeout = 30
+        self._recycling_policy = recycling_policy
+
+    def acquire(self, builder):
+        """Presta un driver del pool. Si no hay ninguno ocioso pero hay alguno arrancándose en segundo plano, se espera a
+        que termine; en caso contrario se construye uno nuevo con `builder`. Tras el préstamo se lanza el arranque en
+        segundo plano de los drivers de reserva con el mismo `builder`.
+
+        El pool no guarda el `builder`: todos los extractores que comparten un pool deben construir drivers con la misma
+        configuración, porque cualquiera de ellos puede recibir un driver construido por otro.
+
+        Parameters
+        ----------
+        builder : callable
+            función sin argumentos que devuelve una instancia de webdriver.Chrome
+
+        Returns
+        -------
+        webdriver.Chrome
+            driver prestado o None en caso de que no se haya podido construir
+        """
+        init_time = time.time()
+        while True:
+            with self._condition:
+                while not self._idle and self._booting:
+                    self._condition.wait()
+                driver = self._idle.popleft() if self._idle else None
+            if driver and not self._is_alive(driver):
+                # el navegador de un driver ocioso puede haber sido finalizado desde fuera (por ejemplo, al cancelar
+                # una tarea que ha superado su plazo)
+                self.logger.warning("-{pool}-: discarding dead driver".format(pool=self._name))
+                self._quit(driver)
+                continue
+            # un driver ocioso puede haber superado la antigüedad máxima mientras esperaba en el pool
+            if not driver or not self._recycle(driver):
+                break
+        if driver:
+            self.logger.debug("-{pool}-: reusing warm driver".format(pool=self._name))
+        elif builder:
+            self.logger.debug("-{pool}-: there is no idle driver, building a new one".format(pool=self._name))
+            driver = self._build(builder)
+        else:
+            self.logger.error("-{pool}-: there is no builder to create a new driver".format(pool=self._name))
+        get_metrics().observe("driver.acquire_seconds", time.time() - init_time)
+        if driver:
+            with self._condition:
+                self._leased += 1
+        self._prefetch(builder)
+        return driver
+
+    def _build(self, builder):
+        """Construye un nuevo driver con `builder` y lo prepara para la política de reciclado."""
+        driver = builder()
+        if driver and self._recycling_policy:
+            self._recycling_policy.track(driver)
+        return driver
+
+    def _prefetch(self, builder):
+        """Lanza en segundo plano el arranque con `builder` de tantos drivers como sean necesarios para que haya
+        `_standby` drivers disponibles para los siguientes préstamos: ociosos, arrancándose o prestados que volverán al
+        pool. Así el arranque del navegador del siguiente préstamo se solapa con el trabajo del préstamo actual."""
+        with self._condition:
+            returning = min(self._leased, max(self._size - len(self._idle), 0))
+            available = len(self._idle) + self._booting + returning
+            missing = self._standby - available if builder and not self._closed else 0
+            self._booting += max(missing, 0)
+        for _ in range(missing):
+            threading.Thread(target=self._prefetch_driver, args=(builder,),
+                             name="{pool}-prefetch".format(pool=self._name), daemon=True).start()
+
+    def _prefetch_driver(self, builder):
+        """Arranca un driver de reserva y lo deja ocioso en el pool. Si el pool se ha finalizado mientras tanto, el
+        driver se finaliza."""
+        driver = None
+        try:
+            driver = self._build(builder)
+        except Exception as e:
+            self.logger.error("-{pool}-: error prefetching driver: {error}".format(pool=self._name, error=str(e)))
+        with self._condition:
+            self._booting -= 1
+            is_closed = self._closed
+            if driver and not is_closed:
+                self._idle.append(driver)
+            self._condition.notify_all()
+        if driver and is_closed:
+            self._quit(driver)
+
+    def release(self, driver, builder=None):
+        """Devuelve un driver al pool. Antes de dejarlo disponible se limpia su estado (ventanas, cookies y
+        almacenamiento local) y se vuelve a inyectar la sesión con la que se construyó, si la tiene. Si el pool está
+        lleno, finalizado o la limpieza falla, el driver se finaliza.
+
+        Parameters
+        ----------
+        driver : webdriver.Chrome
+            driver que se devuelve al pool
+        builder : callable
+            función con la que se arranca en segundo plano el driver que sustituye a uno reciclado. Opcional
+        """
+        if not driver:
+            return
+        with self._condition:
+            self._leased = max(self._leased - 1, 0)
+        if not self._is_alive(driver):
+            self._quit(driver)
+            return
+        if self._recycling_policy:
+            self._recycling_policy.record_page(driver)
+            if self._recycle(driver):
+                # se arranca en segundo plano el driver que sustituye al reciclado
+                self._prefetch(builder)
+                return
+        with self._condition:
+            is_full = self._closed or len(self._idle) + self._booting >= self._size
+        if is_full or not self._reset(driver):
+            self._quit(driver)
+            return
+        with self._condition:
+            self._idle.append(driver)
+            self._condition.notify_all()
+
+    def _recycle(self, driver):
+        """Comprueba la política de reciclado y finaliza el driver si ha superado alguno de sus umbrales. El siguiente
+        préstamo construirá un driver nuevo en su lugar.
+
+        Returns
+        -------
+        bool
+            True si el driver ha sido reciclado, False en caso contrario
+        """
+        if not self._recycling_policy:
+            return False
+        reason = self._recycling_policy.get_recycle_reason(driver)
+        if not reason:
+            return False
+        self.logger.info("-{pool}-: recycling driver due to -{reason}- limit after -{pages}- pages".format(
+            pool=self._name, reason=reason, pages=driver.pages_served))
+        metrics = get_metrics()
+        metrics.incr("driver.recycled")
+        metrics.incr("driver.recycled.{reason}".format(reason=reason))
+        metrics.observe("driver.pages_served", driver.pages_served)
+        self._quit(driver)
+        return True
+
+    def _reset(self, driver):
+        """Limpia el estado del driver para que el siguiente préstamo no herede nada del anterior.
+
+        Returns
+        -------
+        bool
+            True si el driver ha quedado limpio y puede volver al pool, False en caso contrario
+        """
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            try:
+                driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            except WebDriverException:
+                pass
+            try:
+                driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            except WebDriverException:
+                driver.delete_all_cookies()
+            # la sesión inyectada al construir el driver no es estado del préstamo anterior
+            session_profile = getattr(driver, "session_profile", None)
+            if session_profile:
+                session_profile.apply_driver(driver)
+            driver.get(self._reset_url)
+            return True
+        except WebDriverException as e:
+            self.logger.warning("-{pool}-: driver could not be reset: {error}".format(pool=self._name, error=str(e)))
+            return False
+
+    @staticmethod
+    def _is_alive(driver):
+        """Indica si el proceso chromedriver del driver sigue en ejecución."""
+        try:
+            return driver.service.process.poll() is None
+        except AttributeError:
+            return True
+
+    def _quit(self, driver):
+        """Finaliza el driver ignorando los errores del navegador."""
+        try:
+            driver.quit()
+        except WebDriverException as e:
+            self.logger.warning("-{pool}-: error shutting down driver: {error}".format(pool=self._name, error=str(e)))
+
+    def shutdown(self):
+        """Finaliza todos los drivers ociosos del pool. Los drivers que se estén arrancando en segundo plano se
+        finalizarán en cuanto terminen de arrancar."""
+        with self._condition:
+            self._closed = True
+            # se espera a los arranques en curso para no dejar procesos de chromedriver huérfanos
+            self._condition.wait_for(lambda: not self._booting, timeout=self._shutdown_timeout)
+            drivers = list(self._idle)
+            self._idle.clear()
+        self.logger.debug("-{pool}-: shutting down -{total}- idle drivers".format(pool=self._name,
+                                                                                   total=len(drivers)))
+        for driver in drivers:
+            self._quit(driver)
+
+
+_pools = {}
+
+
+def get_driver_pool(name="default", size=1, recycling_policy=None, standby=0):
+    """Devuelve el pool de drivers del proceso actual, creándolo si no existe. Los pools se registran por pid para que
+    los procesos hijos creados con `fork` no reutilicen los drivers de su padre, y se finalizan automáticamente al
+    terminar el proceso.
+
+    Parameters
+    ----------
+    name : str
+        nombre del pool dentro del proceso
+    size : int
+        número máximo de drivers ociosos que mantendrá el pool
+    recycling_policy : gmaps.commons.driver.recycling.DriverRecyclingPolicy
+        política de reciclado de drivers que se aplicará al crear el pool
+    standby : int
+        número de drivers de reserva que el pool arrancará en segundo plano
+
+    Returns
+    -------
+    DriverPool
+        pool de drivers asociado al proceso
+    """
+    key = (os.getpid(), name)
+    pool = _pools.get(key)
+    if pool is None:
+        pool = DriverPool(size=size, name=name, recycling_policy=recycling_policy, standby=standby)
+        _pools[key] = pool
+        # los workers de multiprocessing terminan con os._exit, por lo que no se ejecuta `atexit`
+        multiprocessing.util.Finalize(pool, pool.shutdown, exitpriority=10)
+    return pool
@@ -0,0 +1,110 @@
+"""
+Funciones de utilidades para inspeccionar el árbol de procesos de chromedriver/Chrome a partir de `/proc`.
+"""
+import os
+import signal
+
+_PROC_DIR = "/proc"
+
+
+def get_driver_pid(driver):
+    """Devuelve el pid del proceso chromedriver asociado al driver.
+
+    Parameters
+    ----------
+    driver : webdriver.Chrome
+        driver del que obtener el pid
+
+    Returns
+    -------
+    int
+        pid del proceso chromedriver o None si no se puede obtener
+    """
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+def _get_parent_pid(pid):
+    """Lee el pid del proceso padre de `/proc/<pid>/stat`. Devuelve None si el proceso ya no existe."""
+    try:
+        with open(os.path.join(_PROC_DIR, str(pid), "stat"), "r") as f:
+            stat = f.read()
+    except (IOError, OSError):
+        return None
+    # el nombre del proceso puede contener espacios y paréntesis, los campos se leen tras el último ')'
+    fields = stat[stat.rfind(")") + 2:].split()
+    return int(fields[1]) if len(fields) > 1 else None
+
+
+def get_process_tree_pids(root_pid):
+    """Devuelve los pids del proceso `root_pid` y de todos sus descendientes.
+
+    Parameters
+    ----------
+    root_pid : int
+        pid del proceso raíz
+
+    Returns
+    -------
+    list
+        lista de pids, empezando por `root_pid`. Vacía si no se puede leer `/proc`
+    """
+    if not root_pid or not os.path.isdir(_PROC_DIR):
+        return []
+    children = {}
+    for entry in os.listdir(_PROC_DIR):
+        if entry.isdigit():
+            parent = _get_parent_pid(int(entry))
+            if parent is not None:
+                children.setdefault(parent, []).append(int(entry))
+    pids = [root_pid]
+    pending = [root_pid]
+    while pending:
+        for child in children.get(pending.pop(), []):
+            pids.append(child)
+            pending.append(child)
+    return pids
+
+
+def get_process_rss(pid):
+    """Devuelve la memoria residente (RSS) en bytes del proceso `pid` o 0 si no se puede leer."""
+    try:
+        with open(os.path.join(_PROC_DIR, str(pid), "statm"), "r") as f:
+            resident_pages = int(f.read().split()[1])
+    except (IOError, OSError, IndexError, ValueError):
+        return 0
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def get_process_tree_rss(root_pid):
+    """Devuelve la suma de la memoria residente (RSS) en bytes del proceso `root_pid` y de todos sus descendientes."""
+    return sum(get_process_rss(pid) for pid in get_process_tree_pids(root_pid))
+
+
+def kill_process_tree(root_pid, include_root=True):
+    """Finaliza (SIGKILL) el proceso `root_pid` y todos sus descendientes, empezando por los descendientes.
+
+    Parameters
+    ----------
+    root_pid : int
+        pid del proceso raíz
+    include_root : bool
+        si es False sólo se finalizan los descendientes
+
+    Returns
+    -------
+    list
+        pids de los procesos finalizados
+    """
+    pids = get_process_tree_pids(root_pid)
+    pids = pids if include_root else pids[1:]
+    killed = []
+    for pid in reversed(pids):
+        try:
+            os.kill(pid, signal.SIGKILL)
+            killed.append(pid)
+        except (ProcessLookupError, PermissionError):
+            continue
+    return killed
@@ -0,0 +1,110 @@
+import logging
+import time
+
+from gmaps.commons.driver.proc import get_driver_pid, get_process_tree_rss
+
+
+class DriverRecyclingPolicy:
+    """Política de reciclado de drivers. Las sesiones de Chrome de larga duración van acumulando memoria, por lo que
+    cada driver se retira en cuanto supera alguno de los umbrales configurados: páginas servidas, antigüedad de la
+    sesión o memoria residente (RSS) del árbol de procesos de chromedriver/Chrome.
+
+    Los datos de seguimiento se guardan como atributos del propio driver (`created_at` y `pages_served`), del mismo
+    modo que se hace con `driver.wait`.
+
+    ...
+    Attributes
+    ----------
+    logger : logging.Logger
+        logger de la clase
+    max_pages : int
+        número máximo de páginas servidas por un driver. None para no aplicar el umbral
+    max_rss_mb : int
+        memoria residente máxima en MB del árbol de procesos del driver. None para no aplicar el umbral
+    max_age_seconds : int
+        antigüedad máxima en segundos de la sesión del driver. None para no aplicar el umbral
+
+    Methods
+    -------
+    from_config(config)
+        construye la política a partir de la sección `recycling` del fichero de configuración
+    track(driver)
+        inicializa los datos de seguimiento de un driver recién construido
+    record_page(driver)
+        registra una página servida por el driver
+    get_recycle_reason(driver)
+        devuelve el motivo por el que se debe reciclar el driver o None si se puede seguir usando
+    """
+
+    def __init__(self, max_pages=None, max_rss_mb=None, max_age_seconds=None):
+        """Constructor de la clase
+
+        Parameters
+        ----------
+        max_pages : int
+            número máximo de páginas servidas por un driver
+        max_rss_mb : int
+            memoria residente máxima en MB del árbol de procesos del driver
+        max_age_seconds : int
+            antigüedad máxima en segundos de la sesión del driver
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.max_age_seconds = max_age_seconds
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Construye la política a partir de la configuración de reciclado.
+
+        Parameters
+        ----------
+        config : dict
+            diccionario con las claves opcionales `max_pages`, `max_rss_mb` y `max_age_seconds`
+
+        Returns
+        -------
+        DriverRecyclingPolicy
+            política configurada o None si no hay configuración
+        """
+        if not config:
+            return None
+        return cls(max_pages=config.get("max_pages"),
+                   max_rss_mb=config.get("max_rss_mb"),
+                   max_age_seconds=config.get("max_age_seconds"))
+
+    def track(self, driver):
+        """Inicializa los datos de seguimiento de un driver recién construido."""
+        if not hasattr(driver, "created_at"):
+            driver.created_at = time.time()
+            driver.pages_served = 0
+
+    def record_page(self, driver):
+        """Registra una página servida por el driver."""
+        self.track(driver)
+        driver.pages_served += 1
+
+    def get_recycle_reason(self, driver):
+        """Comprueba los umbrales de la política para el driver.
+
+        Parameters
+        ----------
+        driver : webdriver.Chrome
+            driver a comprobar
+
+        Returns
+        -------
+        str
+            motivo del reciclado (`pages`, `age` o `rss`) o None si el driver no ha superado ningún umbral
+        """
+        self.track(driver)
+        if self.max_pages and driver.pages_served >= self.max_pages:
+            return "pages"
+        if self.max_age_seconds and time.time() - driver.created_at >= self.max_age_seconds:
+            return "age"
+        if self.max_rss_mb:
+            rss_mb = get_process_tree_rss(get_driver_pid(driver)) / (1024 * 1024)
+            if rss_mb >= self.max_rss_mb:
+                self.logger.debug("driver process tree rss: -{rss}- MB".format(rss=int(rss_mb)))
+                return "rss"
+        return None
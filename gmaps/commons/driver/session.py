@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+import time
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+from gmaps.commons.extractor.landing import LANDING_CONSENT, LANDING_PROBE_SCRIPT, classify_landing
+
+# cookie de consentimiento aceptado que se inyecta si todavía no se ha capturado la sesión (la misma que usa la
+# descarga HTTP)
+_DEFAULT_COOKIES = [{"name": "CONSENT", "value": "YES+", "domain": ".google.com", "path": "/", "secure": True}]
+
+# campos de las cookies de `Network.getAllCookies` que acepta `Network.setCookies`
+_COOKIE_FIELDS = ["name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires"]
+
+# envía el formulario de "aceptar todo" de la página de consentimiento: el que no rechaza el uso de cookies
+# (`set_eom=false`) o, en su defecto, el último formulario de la página
+_ACCEPT_CONSENT_SCRIPT = """
+var forms = Array.prototype.slice.call(document.querySelectorAll("form[action*='consent.google']"));
+var accept = forms.filter(function (form) {
+    return form.querySelector("input[name='set_eom'][value='false']");
+})[0] || forms[forms.length - 1];
+if (!accept) {
+    return false;
+}
+accept.submit();
+return true;
+"""
+
+
+class SessionProfile:
+    """Estado de sesión que se inyecta en cada driver al construirlo: las cookies de una sesión en la que ya se ha
+    aceptado el aviso de consentimiento y las preferencias de idioma. Así la primera navegación de cada driver llega
+    directamente a la página solicitada, sin pasar por la página de consentimiento ni por sus redirecciones.
+
+    Las cookies se capturan una vez (`capture`) con un navegador real y se guardan en un fichero json que comparten
+    todos los procesos y ejecuciones hasta que caduca (`max_age_hours`).
+
+    ...
+    Attributes
+    ----------
+    logger : logging.Logger
+        logger de la clase
+    file_path : str
+        fichero json donde se guarda la sesión capturada
+    locale : str
+        idioma del navegador, por ejemplo `es-ES`
+    max_age_hours : float
+        horas tras las que la sesión capturada se considera caducada y se vuelve a capturar
+    capture_url : str
+        url de Google Maps que se visita para capturar la sesión
+    cookies : list
+        cookies de la sesión en el formato de `Network.setCookies`
+    created : float
+        instante en que se capturó la sesión. None si no se ha capturado
+
+    Methods
+    -------
+    from_config(config)
+        construye el perfil a partir de la configuración `session` de la ejecución
+    load()
+        carga la sesión capturada del fichero
+    save()
+        guarda la sesión capturada en el fichero
+    is_stale()
+        indica si la sesión no se ha capturado o ha caducado
+    capture(driver, timeout=10)
+        acepta el aviso de consentimiento en un driver y captura sus cookies
+    apply_options(driver_arguments, experimental_arguments)
+        añade las preferencias de idioma a la configuración del driver
+    apply_driver(driver)
+        inyecta las cookies de la sesión en un driver ya construido
+    """
+
+    def __init__(self, file_path=None, locale="es-ES", max_age_hours=72, capture_url="https://www.google.com/maps"):
+        """Constructor de la clase
+
+        Parameters
+        ----------
+        file_path : str
+            fichero json donde se guarda la sesión capturada
+        locale : str
+            idioma del navegador
+        max_age_hours : float
+            horas tras las que la sesión capturada caduca
+        capture_url : str
+            url de Google Maps que se visita para capturar la sesión
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.file_path = file_path
+        self.locale = locale
+        self.max_age_hours = max_age_hours
+        self.capture_url = capture_url
+        self.cookies = []
+        self.created = None
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Construye el perfil a partir de la configuración.
+
+        Parameters
+        ----------
+        config : dict
+            diccionario con las claves `enabled` y `file_path` y las claves opcionales `locale`, `max_age_hours` y
+            `capture_url`
+
+        Returns
+        -------
+        SessionProfile
+            perfil configurado o None si no está activado
+        """
+        if not config or not config.get("enabled"):
+            return None
+        keys = ["file_path", "locale", "max_age_hours", "capture_url"]
+        return cls(**{key: config.get(key) for key in keys if config.get(key) is not None})
+
+    def load(self):
+        """Carga la sesión capturada del fichero, si existe.
+
+        Returns
+        -------
+        bool
+            True si se ha cargado una sesión sin caducar
+        """
+        if not self.file_path or not os.path.isfile(self.file_path):
+            return False
+        try:
+            with open(self.file_path, "r") as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning("session could not be loaded from -{file}-: {error}".format(file=self.file_path,
+                                                                                          error=str(e)))
+            return False
+        self.cookies = stored.get("cookies", [])
+        self.created = stored.get("created")
+        self.locale = stored.get("locale", self.locale)
+        return not self.is_stale()
+
+    def save(self):
+        """Guarda la sesión capturada en el fichero. Se escribe en un fichero temporal que después se renombra para que
+        los procesos que la cargan a la vez nunca lean un fichero a medio escribir."""
+        if not self.file_path:
+            return
+        tmp_path = "{file}.{pid}.tmp".format(file=self.file_path, pid=os.getpid())
+        with open(tmp_path, "w") as f:
+            json.dump({"created": self.created, "locale": self.locale, "cookies": self.cookies}, f)
+        os.replace(tmp_path, self.file_path)
+        self.logger.info("session with -{cookies}- cookies saved in -{file}-".format(cookies=len(self.cookies),
+                                                                                   file=self.file_path))
+
+    def is_stale(self):
+        """Indica si la sesión no se ha capturado o ha caducado."""
+        return not self.cookies or self.created is None or \
+            time.time() - self.created > self.max_age_hours * 3600
+
+    def capture(self, driver, timeout=10):
+        """Visita Google Maps, acepta el aviso de consentimiento si aparece y captura las cookies de Google del driver
+        como nueva sesión, que se guarda en el fichero.
+
+        Parameters
+        ----------
+        driver : webdriver.Chrome
+            driver recién construido, sin sesión inyectada
+        timeout : float
+            segundos de espera máxima a que la aceptación del consentimiento redirija a Google Maps
+
+        Returns
+        -------
+        bool
+            True si se ha capturado la sesión
+        """
+        try:
+            driver.get(self.capture_url)
+            landing = classify_landing(driver.current_url, driver.execute_script(LANDING_PROBE_SCRIPT))
+            if landing == LANDING_CONSENT and driver.execute_script(_ACCEPT_CONSENT_SCRIPT):
+                WebDriverWait(driver, timeout).until(
+                    lambda current_driver: classify_landing(current_driver.current_url) != LANDING_CONSENT)
+            cookies = driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+        except (TimeoutException, WebDriverException) as e:
+            self.logger.warning("session could not be captured: {error}".format(error=str(e)))
+            return False
+        self.cookies = [{field: cookie.get(field) for field in _COOKIE_FIELDS
+                         if cookie.get(field) is not None and not (field == "expires" and cookie.get("session"))}
+                        for cookie in cookies if "google." in cookie.get("domain", "")]
+        self.created = time.time()
+        self.save()
+        return True
+
+    def apply_options(self, driver_arguments, experimental_arguments):
+        """Añade las preferencias de idioma a la configuración con la que se construye el driver.
+
+        Parameters
+        ----------
+        driver_arguments : list
+            argumentos del driver que se modificarán
+        experimental_arguments : dict
+            argumentos experimentales del driver que se modificarán
+        """
+        if not self.locale:
+            return
+        language_argument = "--lang={locale}".format(locale=self.locale)
+        if language_argument not in driver_arguments:
+            driver_arguments.append(language_argument)
+        prefs = experimental_arguments.get("prefs", {})
+        prefs["intl.accept_languages"] = "{locale},{language}".format(locale=self.locale,
+                                                                      language=self.locale.split("-")[0])
+        experimental_arguments["prefs"] = prefs
+
+    def apply_driver(self, driver):
+        """Inyecta las cookies de la sesión en un driver ya construido, o la cookie de consentimiento por defecto si
+        todavía no se ha capturado ninguna sesión. El pool de drivers vuelve a llamarla tras limpiar las cookies de un
+        driver.
+
+        Parameters
+        ----------
+        driver : webdriver.Chrome
+            driver en el que se inyecta la sesión
+        """
+        try:
+            driver.execute_cdp_cmd("Network.setCookies", {"cookies": self.cookies if self.cookies else _DEFAULT_COOKIES})
+        except WebDriverException as e:
+            self.logger.warning("session could not be applied: {error}".format(error=str(e)))
+
+
+_profiles = {}
+
+
+def get_session_profile(config=None):
+    """Devuelve el perfil de sesión del proceso actual, creándolo y cargando la sesión capturada si no existe.
+
+    Parameters
+    ----------
+    config : dict
+        configuración `session` de la ejecución
+
+    Returns
+    -------
+    SessionProfile
+        perfil del proceso o None si no hay configuración
+    """
+    pid = os.getpid()
+    if pid not in _profiles:
+        profile = SessionProfile.from_config(config)
+        if profile and not profile.load() and profile.created is not None:
+            profile.logger.warning("session in -{file}- is stale, it will be injected anyway".format(
+                file=profile.file_path))
+        _profiles[pid] = profile
+    return _profiles.get(pid)
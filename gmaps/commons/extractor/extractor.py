@@ -3,9 +3,16 @@ import time
 
 import selenium
 from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
 from selenium.webdriver.support.ui import WebDriverWait
 
+from gmaps.commons.driver.blocking import ResourceBlockingProfile
+from gmaps.commons.extractor.landing import LANDING_NORMAL, LANDING_PROBE_SCRIPT, BlockedPageException, \
+    classify_landing
+from gmaps.commons.extractor.pacing import get_rate_limiter
+from gmaps.commons.metrics.metrics import get_metrics
+from gmaps.process.scheduler import track_driver
+
 
 class AbstractGMapsExtractor:
     """
@@ -21,6 +28,8 @@ class AbstractGMapsExtractor:
         lista con los argumentos por defectos con los que se construirá el chrome web driver.
     _default_experimental_driver_args : dict
         diccionario con valores experimentales que se establece en el momoento de instanciar el chrome web driver.
+    _default_capabilities : dict
+        diccionario con las capabilities que se establecen en el momento de instanciar el chrome web driver.
     shared_result_elements_xpath_query : str
         query de xpath para buscar elementos de resultado usado en el proceso de búsqueda de locales comerciales.
     _driver_location : str
@@ -47,6 +56,21 @@ class AbstractGMapsExtractor:
         instancia que hace referencia a la instancia del writer que se instancia haciendo uso del `_output_config`.
     _postal_code : str
         contiene el código postal para el cual vamos a realizar la extracción de la información.
+    _driver_pool : gmaps.commons.driver.pool.DriverPool
+        pool de drivers del que se toma prestado el driver en lugar de construir uno nuevo. Si es None se construye y
+        finaliza un driver por instancia.
+    _resource_blocking : gmaps.commons.driver.blocking.ResourceBlockingProfile
+        perfil de bloqueo de recursos (imágenes, fuentes, teselas del mapa...) que se aplica al construir el driver.
+    _latency_tracker : gmaps.commons.extractor.latency.LatencyTracker
+        tracker que calibra el tiempo máximo de cada espera con nombre a partir de la latencia observada. Si es None
+        todas las esperas usan `_driver_wait`.
+    _session_profile : gmaps.commons.driver.session.SessionProfile
+        sesión (cookies del consentimiento aceptado e idioma) que se inyecta en cada driver al construirlo. Si es None
+        los drivers arrancan sin sesión.
+    _lazy_driver : bool
+        si es True el driver no se arranca en `auto_boot` sino la primera vez que se solicita con `get_driver`.
+    _blocked : gmaps.commons.extractor.landing.BlockedPageException
+        página de bloqueo detectada durante la extracción. Si no es None la extracción debe reintentarse más tarde.
 
     Methods
     -------
@@ -56,11 +80,25 @@ class AbstractGMapsExtractor:
         genera y devuelve una instancia de selenium chromedriver.
     force_sleep(sleep_time=0)
         hace dormir el thread para dar tiempo a chrome a renderizar todos los elementos necesarios.
+    wait_until(name, condition, external_driver=None)
+        espera a que se cumpla una condición con nombre usando el tiempo máximo calibrado para ella. Lanza
+        TimeoutException si no se cumple.
+    wait_for(condition, timeout=None, external_driver=None)
+        espera a que se cumpla una condición sobre el DOM o la red, con un tiempo máximo, y devuelve en cuanto se
+        cumple.
+    check_landing(external_driver=None, url=None)
+        comprueba que el navegador no ha sido redirigido a la página de consentimiento o de captcha.
+    raise_if_blocked()
+        lanza BlockedPageException si durante la extracción se ha detectado una página de bloqueo.
+    pace(endpoint)
+        espera el turno de la siguiente petición de tipo `endpoint` según el ritmo compartido por todos los procesos.
     finish()
         finaliza el driver asociado a la instancia y cierra la conexión a la base de datos, si esta última existe.
     get_info_obj(xpath_query, external_driver=None)
         busca en el driver, de la instancia o el pasado por argumento, el elemento del navegador que cumpla la
         query.
+    probe_fields(selectors, external_driver=None)
+        resuelve un diccionario de consultas xpath en una única llamada al navegador, sin espera implícita.
     get_driver()
         devuelve la instancia del driver asociado a la instancia
     auto_boot()
@@ -74,7 +112,8 @@ class AbstractGMapsExtractor:
         función a implementar por las clases que implementen esta clase, `AbstractGMapsExtractor`
     """
 
-    def __init__(self, driver_location=None, output_config=None):
+    def __init__(self, driver_location=None, output_config=None, driver_pool=None, resource_blocking=None,
+                 latency_tracker=None, session_profile=None):
         """Constructor genérico común para todos los `extractores`. Todas las clases que extiendan esta clase, deben
         llamar a este constructor para inicializar campos comunes.
 
@@ -84,12 +123,21 @@ class AbstractGMapsExtractor:
             ubicación del selenium chromedriver para instanciar el driver usado para realizar el scraping.
         output_config: dict
             diccionario de python que contiene la configuración del soporte de salida para esta instancia.
+        driver_pool: gmaps.commons.driver.pool.DriverPool
+            pool de drivers del que tomar prestado el driver. Opcional.
+        resource_blocking: str or dict
+            nombre del preset o configuración del perfil de bloqueo de recursos. Opcional.
+        latency_tracker: gmaps.commons.extractor.latency.LatencyTracker
+            tracker de latencias para calibrar el tiempo máximo de cada espera. Opcional.
+        session_profile: gmaps.commons.driver.session.SessionProfile
+            sesión que se inyecta en cada driver al construirlo. Opcional.
         """
         super(AbstractGMapsExtractor, self).__init__()
         self.logger = logging.getLogger(self.__class__.__name__)
         self._default_driver_args = ["--disable-extensions", "--disable-gpu", "start-maximized",
                                      "disable-infobars", "--headless", "--no-sandbox", "--disable-dev-shm-usage"]
         self._default_experimental_driver_args = {}
+        self._default_capabilities = {}
         self.shared_result_elements_xpath_query = "//div[contains(@class, 'section-result-content')]"
         self._driver_location = driver_location
         self._driver_options = None
@@ -105,6 +153,16 @@ class AbstractGMapsExtractor:
         self._postal_code = None
         self._driver_build_intent = 0
         self._max_driver_build_intent = 5
+        self._driver_pool = driver_pool
+        self._resource_blocking = ResourceBlockingProfile.from_config(resource_blocking)
+        self._latency_tracker = latency_tracker
+        self._session_profile = session_profile
+        self._lazy_driver = False
+        self._blocked = None
+        if self._resource_blocking:
+            self._resource_blocking.apply_options(self._default_driver_args, self._default_experimental_driver_args)
+        if self._session_profile:
+            self._session_profile.apply_options(self._default_driver_args, self._default_experimental_driver_args)
 
     def _get_driver_config(self, driver_arguments=None, experimental_arguments=None):
         """Función privada que devuelve la configuración necesaria para instanciar un chromedriver. Si le llegan
@@ -135,6 +193,9 @@ class AbstractGMapsExtractor:
         for argument in arguments:
             chrome_options.add_argument(argument)
 
+        for capability_key, capability_value in self._default_capabilities.items():
+            chrome_options.set_capability(capability_key, capability_value)
+
         return chrome_options
 
     def extract_current_address(self, name, address_str):
@@ -203,6 +264,12 @@ class AbstractGMapsExtractor:
                 chrome_options=options)
             driver.wait = WebDriverWait(driver, self._driver_wait)
             driver.implicitly_wait(self._driver_implicit_wait)
+            if self._resource_blocking:
+                self._resource_blocking.apply_driver(driver)
+            if self._session_profile:
+                # el pool de drivers vuelve a inyectar la sesión cuando limpia las cookies del driver
+                self._session_profile.apply_driver(driver)
+                driver.session_profile = self._session_profile
         except selenium.common.exceptions.WebDriverException as driverException:
             if self._driver_build_intent == self._max_driver_build_intent:
                 self.logger.error("maximum retries to build driver reached. Aborting to generate driver")
@@ -233,11 +300,150 @@ class AbstractGMapsExtractor:
         time.sleep(sleep_time)
         self.logger.debug("-{postal_code}- awaking... the process continues...".format(postal_code=self._postal_code))
 
+    def get_wait_timeout(self, name):
+        """Devuelve el tiempo máximo de espera, en segundos, para la condición `name`: el calibrado por el tracker de
+        latencias o `_driver_wait` si la instancia no tiene tracker."""
+        return self._latency_tracker.get_timeout(name) if self._latency_tracker else self._driver_wait
+
+    def wait_until(self, name, condition, external_driver=None):
+        """Espera a que se cumpla la condición `name`, igual que `driver.wait.until`, pero con el tiempo máximo
+        calibrado por el tracker de latencias para esa condición. El tiempo que tarda en cumplirse se registra en el
+        tracker para las siguientes calibraciones.
+
+        Parameters
+        ----------
+        name : str
+            nombre de la condición de espera
+        condition : callable
+            condición que recibe el driver y devuelve un valor verdadero cuando se cumple
+        external_driver : webdriver.Chrome
+            driver sobre el que se evalúa la condición. En caso de ser None se usará el de la instancia
+
+        Returns
+        -------
+        object
+            el valor devuelto por la condición
+
+        Raises
+        ------
+        TimeoutException
+            si la condición no se cumple en el tiempo máximo
+        """
+        driver = external_driver if external_driver else self._driver
+        if not self._latency_tracker:
+            try:
+                return driver.wait.until(condition)
+            except TimeoutException:
+                get_metrics().incr("wait.timeouts")
+                raise
+        timeout = self.get_wait_timeout(name)
+        init_time = time.time()
+        try:
+            result = WebDriverWait(driver, timeout).until(condition)
+        except TimeoutException:
+            metrics = get_metrics()
+            metrics.incr("wait.timeouts")
+            metrics.incr("wait.{name}.timeout".format(name=name))
+            raise
+        self._latency_tracker.record(name, time.time() - init_time)
+        return result
+
+    def wait_for(self, condition, timeout=None, external_driver=None, poll_frequency=0.2):
+        """Espera a que se cumpla una condición (ver `gmaps.commons.extractor.waits`) en lugar de dormir un tiempo
+        fijo. Devuelve en cuanto la condición se cumple y, como mucho, espera `timeout` segundos.
+
+        Parameters
+        ----------
+        condition : callable
+            condición que recibe el driver y devuelve un valor verdadero cuando se cumple
+        timeout : int
+            tiempo máximo de espera en segundos. En caso de ser None se usará `sleep_m`
+        external_driver : webdriver.Chrome
+            driver sobre el que se evalúa la condición. En caso de ser None se usará el de la instancia
+        poll_frequency : float
+            segundos entre evaluaciones de la condición
+
+        Returns
+        -------
+        object
+            el valor devuelto por la condición o False si no se ha cumplido en el tiempo máximo
+        """
+        driver = external_driver if external_driver else self._driver
+        timeout = timeout if timeout is not None else self.sleep_m
+        try:
+            return WebDriverWait(driver, timeout, poll_frequency=poll_frequency,
+                                 ignored_exceptions=[NoSuchElementException, StaleElementReferenceException]
+                                 ).until(condition)
+        except TimeoutException:
+            self.logger.debug("-{postal_code}- condition not reached after -{seconds}- seconds".format(
+                postal_code=self._postal_code, seconds=timeout))
+            return False
+
+    def pace(self, endpoint):
+        """Espera, antes de cada navegación, a que el limitador de ritmo compartido por todos los procesos permita una
+        nueva petición de tipo `endpoint` (`search`, `place` o `reviews`). No espera si la ejecución no limita el
+        ritmo de peticiones."""
+        rate_limiter = get_rate_limiter()
+        if rate_limiter:
+            rate_limiter.acquire(endpoint)
+
+    def check_landing(self, external_driver=None, url=None):
+        """Clasifica la página a la que ha llegado la última navegación (`normal`, `consent` o `captcha`) a partir de
+        su url y de los formularios de consentimiento o captcha presentes en la página. Las páginas de bloqueo se
+        registran en las métricas `blocks.redirect` y `blocks.{tipo}` y detienen la extracción.
+
+        Arguments
+        ---------
+        external_driver : webdriver.Chrome
+            driver que ha navegado. Si no está definido se usa el de la instancia
+        url : str
+            url final de una descarga HTTP. Si está definida se clasifica sólo la url, sin consultar el navegador
+
+        Returns
+        -------
+        str
+            tipo de página, `normal` si no es una página de bloqueo
+
+        Raises
+        ------
+        BlockedPageException
+            si la página es la de consentimiento de cookies o la de captcha
+        """
+        if url is not None:
+            landing = classify_landing(url)
+        else:
+            driver = external_driver if external_driver else self._driver
+            url = driver.current_url if driver else ""
+            landing = classify_landing(url)
+            if driver and landing == LANDING_NORMAL:
+                try:
+                    landing = classify_landing(url, driver.execute_script(LANDING_PROBE_SCRIPT))
+                except selenium.common.exceptions.WebDriverException:
+                    pass
+        if landing != LANDING_NORMAL:
+            metrics = get_metrics()
+            metrics.incr("blocks.redirect")
+            metrics.incr("blocks.{landing}".format(landing=landing))
+            self.logger.warning("redirected to -{landing}- page: -{url}-".format(landing=landing, url=url))
+            self._blocked = BlockedPageException(landing, url)
+            raise self._blocked
+        return landing
+
+    def raise_if_blocked(self):
+        """Lanza la excepción de la página de bloqueo detectada durante la extracción, si la hay. Permite propagar el
+        bloqueo desde los métodos que capturan cualquier excepción para devolver la información parcial extraída."""
+        if self._blocked:
+            raise self._blocked
+
     def finish(self):
-        """finaliza el driver asociado a la instancia y cierra la conexión a la base de datos, si esta última existe."""
-        if self._driver:
+        """finaliza el driver asociado a la instancia y cierra la conexión a la base de datos, si esta última existe.
+        Si la instancia usa un pool de drivers, el driver se devuelve al pool en lugar de finalizarlo."""
+        if self._driver and self._driver_pool:
+            self._driver_pool.release(self._driver, builder=self._pool_driver_builder)
+            self._driver = None
+        elif self._driver:
             self._driver.quit()
-        else:
+        elif not self._lazy_driver:
             self.logger.warning("there is no any driver to shut down")
         if self._writer:
             self._writer.finish()
@@ -269,15 +475,114 @@ class AbstractGMapsExtractor:
             element = None
         return element
 
+    def get_page_transfer_stats(self, external_driver=None):
+        """Obtiene de la API `performance` del navegador los bytes transferidos y el número de recursos descargados
+        por la página actual, así como el tiempo hasta que el documento estuvo listo.
+
+        Parameters
+        ----------
+        external_driver : webdriver.Chrome
+            driver del que obtener las estadísticas. En caso de ser None se usará el de la instancia
+
+        Returns
+        -------
+        dict
+            diccionario con `transfer_bytes`, `resources` y `dom_ready_ms`, o un diccionario vacío si no se han podido
+            obtener
+        """
+        driver = external_driver if external_driver else self._driver
+        script = """
+            var navigation = performance.getEntriesByType('navigation')[0];
+            var resources = performance.getEntriesByType('resource');
+            var transferred = navigation ? navigation.transferSize : 0;
+            for (var i = 0; i < resources.length; i++) { transferred += resources[i].transferSize || 0; }
+            return {
+                transfer_bytes: transferred,
+                resources: resources.length,
+                dom_ready_ms: navigation ? navigation.domContentLoadedEventEnd - navigation.startTime : null
+            };
+        """
+        try:
+            return driver.execute_script(script)
+        except selenium.common.exceptions.WebDriverException as e:
+            self.logger.debug("-{postal_code}-: page transfer stats not available: {error}".format(
+                postal_code=self._postal_code, error=str(e)))
+            return {}
+
+    def probe_fields(self, selectors, external_driver=None):
+        """Resuelve un diccionario completo de consultas xpath en una única llamada `execute_script`. A diferencia de
+        `get_info_obj`/`get_obj_text`, que hacen una llamada al driver por elemento y pagan la espera implícita
+        (`_driver_implicit_wait`) cuando el elemento no existe, la búsqueda se hace en el navegador y los elementos
+        ausentes se devuelven inmediatamente como None.
+
+        Parameters
+        ----------
+        selectors : dict
+            diccionario cuyas claves son los nombres de los campos y cuyos valores son la consulta xpath o un
+            diccionario con la consulta (`xpath`) y la lista de atributos a leer del elemento (`attributes`)
+        external_driver : webdriver.Chrome
+            instancia en el que se ejecutarán las consultas. En caso de ser None se usará el de la instancia
+
+        Returns
+        -------
+        dict
+            diccionario con las mismas claves que `selectors`. Cada valor es None si el elemento no existe o un
+            diccionario con su texto (`text`) y los atributos pedidos
+        """
+        driver = external_driver if external_driver else self._driver
+        queries = {name: selector if isinstance(selector, dict) else {"xpath": selector}
+                   for name, selector in selectors.items()}
+        script = """
+            var queries = arguments[0];
+            var fields = {};
+            Object.keys(queries).forEach(function(name) {
+                var element = document.evaluate(queries[name].xpath, document, null,
+                    XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+                if (element === null) {
+                    fields[name] = null;
+                    return;
+                }
+                var field = {text: (element.innerText || '').trim()};
+                (queries[name].attributes || []).forEach(function(attribute) {
+                    field[attribute] = element.getAttribute(attribute);
+                });
+                fields[name] = field;
+            });
+            return fields;
+        """
+        return driver.execute_script(script, queries)
+
     def get_driver(self):
-        """Devuelve la instancia del driver asociado a la instancia en el atributo: self._driver"""
+        """Devuelve la instancia del driver asociado a la instancia en el atributo: self._driver. Si el arranque del
+        driver es diferido (`_lazy_driver`), se arranca en la primera llamada."""
+        if self._driver is None and self._lazy_driver:
+            self._boot_driver()
         return self._driver
 
     def auto_boot(self):
-        """Función de arranque para inicializar el chromedriver"""
+        """Función de arranque para inicializar el chromedriver. Si el arranque es diferido (`_lazy_driver`), el driver
+        se arranca la primera vez que se solicita con `get_driver`."""
+        if not self._lazy_driver:
+            self._boot_driver()
+
+    def _boot_driver(self):
+        """Arranca el chromedriver. Si la instancia tiene un pool de drivers, el driver se toma prestado del pool y sólo
+        se construye uno nuevo si no hay ninguno disponible."""
         self._driver_options = self._get_driver_config()
-        self._driver = self._build_driver(provided_driver_location=self._driver_location,
-                                          driver_options=self._driver_options)
+        if self._driver_pool:
+            self._driver = self._driver_pool.acquire(builder=self._pool_driver_builder)
+        else:
+            self._driver = self._build_driver(provided_driver_location=self._driver_location,
+                                              driver_options=self._driver_options)
+        if self._driver:
+            # el planificador sólo finaliza los navegadores registrados por la tarea que cancela
+            track_driver(self._driver)
+
+    def _pool_driver_builder(self):
+        """Función usada por el pool de drivers para construir un nuevo driver con la configuración de la instancia."""
+        self._driver_build_intent = 0
+        return self._build_driver(provided_driver_location=self._driver_location,
+                                  driver_options=self._driver_options)
 
     def get_obj_text(self, xpath_query, external_driver=None):
         """Función similar a `get_info_obj`, pero en vez de devolver la referencia al elemento, devuelve el texto
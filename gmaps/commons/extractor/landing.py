@@ -0,0 +1,62 @@
+"""
+Clasificación de la página a la que llega el navegador tras una navegación: la página solicitada, el aviso de
+consentimiento de cookies o la página de captcha ("tráfico inusual") con la que Google bloquea las peticiones.
+"""
+
+LANDING_NORMAL = "normal"
+LANDING_CONSENT = "consent"
+LANDING_CAPTCHA = "captcha"
+
+_CONSENT_URL_PATTERNS = ["consent.google.", "consent.youtube."]
+_CAPTCHA_URL_PATTERNS = ["google.com/sorry/", "/sorry/index"]
+
+# comprobación en la página de los elementos de las páginas de bloqueo cuando se muestran sin cambiar de url
+LANDING_PROBE_SCRIPT = """
+return {
+    consent: !!document.querySelector("form[action*='consent.google']"),
+    captcha: !!document.querySelector("#captcha-form, form[action*='/sorry/'], iframe[src*='recaptcha']")
+};
+"""
+
+
+class BlockedPageException(Exception):
+    """Excepción que indica que Google ha servido una página de bloqueo (consentimiento o captcha) en lugar de la página
+    solicitada. Las tareas que la lanzan deben reintentarse más tarde en lugar de darse por fallidas.
+
+    ...
+    Attributes
+    ----------
+    landing : str
+        tipo de página de bloqueo: `consent` o `captcha`
+    url : str
+        url de la página de bloqueo
+    """
+
+    def __init__(self, landing, url=None):
+        super().__init__("blocked by -{landing}- page: -{url}-".format(landing=landing, url=url))
+        self.landing = landing
+        self.url = url
+
+
+def classify_landing(url=None, markers=None):
+    """Clasifica la página a la que ha llegado una navegación.
+
+    Parameters
+    ----------
+    url : str
+        url de la página
+    markers : dict
+        resultado de `LANDING_PROBE_SCRIPT` en la página, con las claves `consent` y `captcha`. Opcional
+
+    Returns
+    -------
+    str
+        `captcha`, `consent` o `normal`
+    """
+    url = url if url else ""
+    markers = markers if markers else {}
+    if markers.get("captcha") or any(pattern in url for pattern in _CAPTCHA_URL_PATTERNS):
+        return LANDING_CAPTCHA
+    if markers.get("consent") or any(pattern in url for pattern in _CONSENT_URL_PATTERNS):
+        return LANDING_CONSENT
+    return LANDING_NORMAL
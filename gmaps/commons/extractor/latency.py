@@ -0,0 +1,179 @@
+"""
+Calibración adaptativa de los tiempos máximos de espera a partir de la latencia observada para cada condición de espera.
+"""
+import fcntl
+import json
+import logging
+import math
+import multiprocessing.util
+import os
+import threading
+
+
+class LatencyTracker:
+    """Registra cuánto tarda en cumplirse cada condición de espera, identificada por nombre, y calcula el tiempo máximo
+    de espera de cada condición a partir del percentil de las últimas observaciones multiplicado por un factor de
+    seguridad. Las observaciones se guardan en un fichero json para que persistan entre ejecuciones.
+
+    ...
+    Attributes
+    ----------
+    logger : logging.Logger
+        logger de la clase
+    file_path : str
+        fichero json donde se persisten las observaciones. None para no persistirlas
+    window : int
+        número de observaciones más recientes que se usan por condición
+    percentile : float
+        percentil de la latencia observada que se usa como base del tiempo de espera
+    safety_factor : float
+        factor por el que se multiplica el percentil
+    min_timeout : float
+        tiempo de espera mínimo en segundos
+    max_timeout : float
+        tiempo de espera máximo en segundos
+    min_samples : int
+        número mínimo de observaciones de una condición para calibrar su tiempo de espera
+    default_timeout : float
+        tiempo de espera que se usa mientras no haya suficientes observaciones
+    _samples : dict
+        observaciones por nombre de condición
+    _new_samples : dict
+        observaciones registradas en este proceso que aún no se han persistido
+
+    Methods
+    -------
+    from_config(config)
+        construye el tracker a partir de la configuración `timeouts` de la ejecución
+    record(name, seconds)
+        registra el tiempo que ha tardado en cumplirse la condición `name`
+    get_timeout(name)
+        devuelve el tiempo de espera calibrado para la condición `name`
+    load()
+        carga las observaciones persistidas
+    save()
+        persiste las observaciones nuevas, combinándolas con las que ya existan en el fichero
+    """
+
+    def __init__(self, file_path=None, window=500, percentile=99, safety_factor=2.0, min_timeout=1, max_timeout=20,
+                 min_samples=20, default_timeout=10):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.file_path = file_path
+        self.window = window
+        self.percentile = percentile
+        self.safety_factor = safety_factor
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_samples = min_samples
+        self.default_timeout = default_timeout
+        self._samples = {}
+        self._new_samples = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Construye el tracker a partir de la configuración.
+
+        Parameters
+        ----------
+        config : dict
+            diccionario con las claves opcionales `file_path`, `window`, `percentile`, `safety_factor`, `min_timeout`,
+            `max_timeout`, `min_samples` y `default_timeout`
+
+        Returns
+        -------
+        LatencyTracker
+            tracker configurado o None si no hay configuración
+        """
+        if not config:
+            return None
+        keys = ["file_path", "window", "percentile", "safety_factor", "min_timeout", "max_timeout", "min_samples",
+                "default_timeout"]
+        return cls(**{key: config.get(key) for key in keys if config.get(key) is not None})
+
+    def record(self, name, seconds):
+        """Registra el tiempo en segundos que ha tardado en cumplirse la condición `name`."""
+        with self._lock:
+            self._samples[name] = (self._samples.get(name, []) + [seconds])[-self.window:]
+            self._new_samples.setdefault(name, []).append(seconds)
+
+    def get_timeout(self, name):
+        """Devuelve el tiempo de espera calibrado para la condición `name`.
+
+        Returns
+        -------
+        float
+            percentil de las observaciones por el factor de seguridad, acotado entre `min_timeout` y `max_timeout`, o
+            `default_timeout` si todavía no hay suficientes observaciones
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(name, []))
+        if len(samples) < self.min_samples:
+            return self.default_timeout
+        index = min(int(math.ceil(self.percentile / 100.0 * len(samples))) - 1, len(samples) - 1)
+        timeout = samples[max(index, 0)] * self.safety_factor
+        return min(max(timeout, self.min_timeout), self.max_timeout)
+
+    def load(self):
+        """Carga las observaciones persistidas en `file_path`, si existe."""
+        if not self.file_path or not os.path.isfile(self.file_path):
+            return
+        with open(self.file_path, "r") as f:
+            fcntl.flock(f, fcntl.LOCK_SH)
+            try:
+                stored = json.load(f)
+            except ValueError:
+                self.logger.warning("latency file -{file}- is not valid json, ignoring it".format(file=self.file_path))
+                stored = {}
+        with self._lock:
+            for name, samples in stored.items():
+                self._samples[name] = (samples + self._samples.get(name, []))[-self.window:]
+
+    def save(self):
+        """Persiste las observaciones registradas en este proceso, combinándolas con las que ya haya en el fichero, de
+        forma que varios procesos pueden guardar sus observaciones sobre el mismo fichero."""
+        with self._lock:
+            new_samples = self._new_samples
+            self._new_samples = {}
+        if not self.file_path or not new_samples:
+            return
+        with open(self.file_path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            try:
+                stored = json.loads(f.read() or "{}")
+            except ValueError:
+                stored = {}
+            for name, samples in new_samples.items():
+                stored[name] = (stored.get(name, []) + samples)[-self.window:]
+            f.seek(0)
+            f.truncate()
+            json.dump(stored, f)
+        self.logger.debug("latency samples saved in -{file}-".format(file=self.file_path))
+
+
+_trackers = {}
+
+
+def get_latency_tracker(config=None):
+    """Devuelve el tracker de latencias del proceso actual, creándolo y cargando las observaciones persistidas si no
+    existe. Al finalizar el proceso se persisten las nuevas observaciones.
+
+    Parameters
+    ----------
+    config : dict
+        configuración `timeouts` de la ejecución
+
+    Returns
+    -------
+    LatencyTracker
+        tracker del proceso o None si no hay configuración
+    """
+    pid = os.getpid()
+    if pid not in _trackers:
+        tracker = LatencyTracker.from_config(config)
+        if tracker:
+            tracker.load()
+            multiprocessing.util.Finalize(tracker, tracker.save, exitpriority=5)
+        _trackers[pid] = tracker
+    return _trackers.get(pid)
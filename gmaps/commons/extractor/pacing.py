@@ -0,0 +1,123 @@
+"""
+Limitación del ritmo de peticiones a Google Maps compartida entre todos los procesos de la ejecución. Cada tipo de
+petición (`search`, `place`, `reviews`) tiene su propio token bucket, guardado en memoria compartida, de forma que las
+navegaciones de todos los procesos se reparten de manera uniforme en lugar de concentrarse en ráfagas.
+"""
+import logging
+import multiprocessing
+import time
+
+from gmaps.commons.metrics.metrics import get_metrics
+
+
+class RateLimiter:
+    """Token buckets compartidos entre procesos. Cada bucket se rellena a `rate` tokens por segundo hasta un máximo de
+    `burst` tokens y cada petición consume un token. Si no hay tokens disponibles, la petición reserva el siguiente
+    token (el bucket queda en negativo) y espera el tiempo necesario fuera del lock, de forma que las peticiones se
+    sirven en orden de llegada sin esperas activas.
+
+    La instancia debe construirse en el proceso principal y pasarse a los procesos del pool al crearlos (por ejemplo con
+    el `initializer` del pool), ya que la memoria compartida no se puede enviar como argumento de una tarea.
+
+    ...
+    Attributes
+    ----------
+    logger : logging.Logger
+        logger de la clase
+    endpoints : dict
+        configuración (`rate` y `burst`) de cada tipo de petición
+    _indexes : dict
+        posición del bucket de cada tipo de petición en `_state`
+    _state : multiprocessing.Array
+        tokens disponibles e instante de la última recarga de cada bucket
+    _lock : multiprocessing.Lock
+        lock que protege `_state`
+
+    Methods
+    -------
+    from_config(config)
+        construye el limitador a partir de la configuración `pacing` de la ejecución
+    acquire(endpoint)
+        espera a que haya un token disponible para una petición de tipo `endpoint`
+    """
+
+    def __init__(self, endpoints=None):
+        """Constructor de la clase
+
+        Parameters
+        ----------
+        endpoints : dict
+            por cada tipo de petición, diccionario con las claves `rate` (peticiones por segundo) y `burst` (número
+            máximo de peticiones seguidas)
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.endpoints = endpoints if endpoints else {}
+        self._indexes = {endpoint: index for index, endpoint in enumerate(sorted(self.endpoints))}
+        self._state = multiprocessing.Array("d", 2 * len(self._indexes), lock=False)
+        self._lock = multiprocessing.Lock()
+        now = time.time()
+        for endpoint, index in self._indexes.items():
+            self._state[2 * index] = float(self.endpoints.get(endpoint).get("burst", 1))
+            self._state[2 * index + 1] = now
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Construye el limitador a partir de la configuración.
+
+        Parameters
+        ----------
+        config : dict
+            diccionario con las claves `enabled` y `endpoints`
+
+        Returns
+        -------
+        RateLimiter
+            limitador configurado o None si no está activado
+        """
+        if not config or not config.get("enabled"):
+            return None
+        return cls(endpoints=config.get("endpoints"))
+
+    def acquire(self, endpoint):
+        """Espera a que haya un token disponible para una petición de tipo `endpoint`. Los tipos de petición sin bucket
+        configurado no se limitan.
+
+        Parameters
+        ----------
+        endpoint : str
+            tipo de petición
+
+        Returns
+        -------
+        float
+            segundos de espera
+        """
+        index = self._indexes.get(endpoint)
+        if index is None:
+            return 0
+        rate = float(self.endpoints.get(endpoint).get("rate", 1))
+        burst = float(self.endpoints.get(endpoint).get("burst", 1))
+        with self._lock:
+            now = time.time()
+            tokens = min(burst, self._state[2 * index] + (now - self._state[2 * index + 1]) * rate)
+            self._state[2 * index] = tokens - 1
+            self._state[2 * index + 1] = now
+        wait = max(1 - tokens, 0) / rate
+        get_metrics().observe("pacing.{endpoint}.wait_seconds".format(endpoint=endpoint), wait)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+_rate_limiter = None
+
+
+def set_rate_limiter(rate_limiter=None):
+    """Establece el limitador del proceso actual. Se llama en el arranque de cada proceso del pool."""
+    global _rate_limiter
+    _rate_limiter = rate_limiter
+
+
+def get_rate_limiter():
+    """Devuelve el limitador del proceso actual o None si la ejecución no limita el ritmo de peticiones."""
+    return _rate_limiter
@@ -0,0 +1,125 @@
+"""
+Condiciones de espera sobre el DOM y la red para usar con `WebDriverWait` en lugar de esperas fijas (`force_sleep`).
+Cada condición es un callable que recibe el driver y devuelve un valor que se evalúa como verdadero en cuanto se cumple,
+siguiendo el mismo contrato que `selenium.webdriver.support.expected_conditions`.
+"""
+import time
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+
+# el buffer de `resource timing` del navegador deja de registrar recursos al llenarse (250 entradas por defecto), con lo
+# que el número de recursos dejaría de crecer aunque la página siguiese descargando. La primera vez que se evalúa en un
+# documento se amplía el buffer y se duplica cada vez que se llena, sin borrar las entradas que usan las estadísticas de
+# transferencia de la página
+_RESOURCES_COUNT_SCRIPT = """
+    if (!window.__gmapsResourceBufferSize) {
+        window.__gmapsResourceBufferSize = Math.max(2 * performance.getEntriesByType('resource').length, 1000);
+        performance.setResourceTimingBufferSize(window.__gmapsResourceBufferSize);
+        performance.addEventListener('resourcetimingbufferfull', function () {
+            window.__gmapsResourceBufferSize *= 2;
+            performance.setResourceTimingBufferSize(window.__gmapsResourceBufferSize);
+        });
+    }
+    return [document.readyState, performance.getEntriesByType('resource').length];
+"""
+
+# indica si alguno de los elementos que cumplen el localizador es visible, en una única llamada al navegador
+_ANY_DISPLAYED_SCRIPT = """
+    var by = arguments[0], value = arguments[1], elements = [];
+    if (by === 'xpath') {
+        var result = document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        for (var i = 0; i < result.snapshotLength; i++) { elements.push(result.snapshotItem(i)); }
+    } else {
+        elements = Array.prototype.slice.call(document.querySelectorAll(value));
+    }
+    return elements.some(function (element) {
+        return !!(element.offsetWidth || element.offsetHeight || element.getClientRects().length) &&
+            window.getComputedStyle(element).visibility !== 'hidden';
+    });
+"""
+
+# traducción a selectores css de los localizadores que no son xpath
+_CSS_LOCATORS = {
+    By.CSS_SELECTOR: "{value}",
+    By.ID: "[id=\"{value}\"]",
+    By.CLASS_NAME: ".{value}",
+    By.NAME: "[name=\"{value}\"]",
+    By.TAG_NAME: "{value}"
+}
+
+
+class network_idle:
+    """Se cumple cuando el documento ha terminado de cargar y no se ha descargado ningún recurso nuevo durante
+    `idle_time` segundos. Los recursos se cuentan con la API `resource timing` del navegador, cuyo buffer se amplía para
+    que el número de recursos siga creciendo en las páginas que descargan muchos."""
+
+    def __init__(self, idle_time=0.5):
+        self.idle_time = idle_time
+        self._last_count = None
+        self._last_change = None
+
+    def __call__(self, driver):
+        ready_state, resources_count = driver.execute_script(_RESOURCES_COUNT_SCRIPT)
+        now = time.time()
+        if ready_state != "complete" or resources_count != self._last_count:
+            self._last_count = resources_count
+            self._last_change = now
+            return False
+        return now - self._last_change >= self.idle_time
+
+
+class spinner_stable:
+    """Se cumple cuando no hay ningún indicador de carga visible, que cumpla `locator`, durante `idle_time`
+    segundos. La búsqueda se hace en el navegador con una única llamada, de forma que cuando el indicador no existe (el
+    caso habitual) no se paga la espera implícita del driver en cada evaluación."""
+
+    def __init__(self, locator, idle_time=0.5):
+        self.locator = locator
+        self.idle_time = idle_time
+        self._hidden_since = None
+
+    def __call__(self, driver):
+        by, value = self.locator
+        if by != By.XPATH:
+            by, value = By.CSS_SELECTOR, _CSS_LOCATORS[by].format(value=value)
+        is_loading = driver.execute_script(_ANY_DISPLAYED_SCRIPT, by, value)
+        now = time.time()
+        if is_loading:
+            self._hidden_since = None
+            return False
+        if self._hidden_since is None:
+            self._hidden_since = now
+        return now - self._hidden_since >= self.idle_time
+
+
+class all_of:
+    """Se cumple cuando se cumplen todas las condiciones. Devuelve el resultado de la última."""
+
+    def __init__(self, *conditions):
+        self.conditions = conditions
+
+    def __call__(self, driver):
+        result = False
+        for condition in self.conditions:
+            result = condition(driver)
+            if not result:
+                return False
+        return result
+
+
+class any_of:
+    """Se cumple en cuanto se cumple alguna de las condiciones. Devuelve el resultado de la primera que se cumple."""
+
+    def __init__(self, *conditions):
+        self.conditions = conditions
+
+    def __call__(self, driver):
+        for condition in self.conditions:
+            try:
+                result = condition(driver)
+            except WebDriverException:
+                result = False
+            if result:
+                return result
+        return False
@@ -0,0 +1,145 @@
+"""
+Descarga de páginas de Google Maps sin navegador, con un pool de conexiones HTTP por proceso, y lectura del estado
+inicial (`APP_INITIALIZATION_STATE`) que la página incluye en el html y que contiene los mismos datos que después se
+renderizan.
+"""
+import json
+import logging
+import os
+import re
+import time
+
+import urllib3
+
+from gmaps.commons.metrics.metrics import get_metrics
+
+_APP_INITIALIZATION_STATE_PATTERN = re.compile(r"window\.APP_INITIALIZATION_STATE\s*=\s*(.*?);\s*window\.APP_FLAGS",
+                                               re.DOTALL)
+
+_DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/87.0.4280.88 "
+                  "Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "es-ES,es;q=0.9",
+    # se acepta el aviso de cookies para que se devuelva la página de google maps y no la de consentimiento
+    "Cookie": "CONSENT=YES+"
+}
+
+
+def parse_app_initialization_state(html):
+    """Función que extrae el estado inicial (`APP_INITIALIZATION_STATE`) del html de una página de Google Maps.
+
+    Parameters
+    ----------
+    html : str
+        contenido html de la página
+
+    Returns
+    -------
+    list
+        estado inicial de la página o None si no se encuentra o no es un json válido
+    """
+    match = _APP_INITIALIZATION_STATE_PATTERN.search(html) if html else None
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return None
+
+
+class HttpFetcher:
+    """Descarga páginas reutilizando las conexiones HTTP abiertas con cada host.
+
+    ...
+    Attributes
+    ----------
+    logger : logging.Logger
+        logger de la clase
+    timeout : float
+        tiempo máximo en segundos de cada petición
+    _http : urllib3.PoolManager
+        pool de conexiones HTTP
+
+    Methods
+    -------
+    from_config(config)
+        construye el fetcher a partir de la configuración `http_fetch` de la ejecución
+    fetch(url)
+        descarga la url y devuelve la url final, tras las redirecciones, y el contenido
+    """
+
+    def __init__(self, timeout=10, retries=1, max_connections=4, headers=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.timeout = timeout
+        request_headers = dict(_DEFAULT_HEADERS)
+        request_headers.update(headers if headers else {})
+        self._http = urllib3.PoolManager(maxsize=max_connections, headers=request_headers,
+                                         retries=urllib3.Retry(total=retries, redirect=5))
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Construye el fetcher a partir de la configuración.
+
+        Parameters
+        ----------
+        config : dict
+            diccionario con las claves opcionales `timeout`, `retries`, `max_connections` y `headers`
+
+        Returns
+        -------
+        HttpFetcher
+            fetcher configurado o None si no está activado (`enabled`)
+        """
+        if not config or not config.get("enabled"):
+            return None
+        keys = ["timeout", "retries", "max_connections", "headers"]
+        return cls(**{key: config.get(key) for key in keys if config.get(key) is not None})
+
+    def fetch(self, url):
+        """Descarga la url.
+
+        Returns
+        -------
+        tuple
+            url final tras las redirecciones y contenido de la respuesta, o (None, None) si la petición falla
+        """
+        init_time = time.time()
+        metrics = get_metrics()
+        try:
+            response = self._http.request("GET", url, timeout=self.timeout)
+        except urllib3.exceptions.HTTPError as e:
+            metrics.incr("http.errors")
+            self.logger.warning("error fetching -{url}-: {error}".format(url=url, error=str(e)))
+            return None, None
+        metrics.observe("http.fetch_seconds", time.time() - init_time)
+        metrics.observe("http.bytes", len(response.data))
+        if response.status != 200:
+            metrics.incr("http.errors")
+            self.logger.warning("-{url}- returned status -{status}-".format(url=url, status=response.status))
+            return None, None
+        final_url = response.geturl() or url
+        return final_url, response.data.decode("utf-8", errors="replace")
+
+
+_fetchers = {}
+
+
+def get_http_fetcher(config=None):
+    """Devuelve el fetcher del proceso actual, creándolo si no existe, para que todos los extractores del proceso
+    compartan el pool de conexiones.
+
+    Parameters
+    ----------
+    config : dict
+        configuración `http_fetch` de la ejecución
+
+    Returns
+    -------
+    HttpFetcher
+        fetcher del proceso o None si no está activado
+    """
+    pid = os.getpid()
+    if pid not in _fetchers:
+        _fetchers[pid] = HttpFetcher.from_config(config)
+    return _fetchers.get(pid)
@@ -0,0 +1,158 @@
+"""
+Enrutado entre la descarga HTTP sin navegador y la extracción con Selenium a partir de la tasa de éxito observada para
+cada campo en la descarga HTTP.
+"""
+import logging
+import os
+import threading
+
+
+class FieldRouter:
+    """Decide si una extracción se intenta primero por HTTP. Por cada campo requerido se registra si la descarga HTTP
+    lo ha conseguido; mientras todos los campos tengan una tasa de éxito suficiente se sigue usando HTTP y, en caso
+    contrario, se usa directamente Selenium. Cada cierto número de extracciones se vuelve a probar HTTP para detectar si
+    la tasa de éxito ha mejorado.
+
+    ...
+    Attributes
+    ----------
+    logger : logging.Logger
+        logger de la clase
+    name : str
+        nombre del router, usado en las trazas
+    required_fields : list
+        campos que la descarga HTTP tiene que conseguir para evitar el uso de Selenium
+    min_success_rate : float
+        tasa de éxito mínima de cada campo para seguir usando HTTP
+    min_samples : int
+        número de intentos por HTTP antes de empezar a evaluar la tasa de éxito
+    explore_every : int
+        cada cuántas extracciones enrutadas a Selenium se vuelve a probar HTTP
+    window : int
+        número de intentos más recientes que se tienen en cuenta por campo
+    _results : dict
+        resultados de los últimos intentos por campo
+    _skipped : int
+        extracciones enrutadas a Selenium desde el último intento por HTTP
+
+    Methods
+    -------
+    from_config(name, config)
+        construye el router a partir de la configuración `http_fetch` de la ejecución
+    use_http()
+        indica si la siguiente extracción se debe intentar por HTTP
+    record(found_fields)
+        registra qué campos ha conseguido un intento por HTTP
+    get_success_rate(field)
+        devuelve la tasa de éxito de un campo
+    """
+
+    def __init__(self, name=None, required_fields=None, min_success_rate=0.8, min_samples=20, explore_every=20,
+                 window=200):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.name = name
+        self.required_fields = required_fields if required_fields else []
+        self.min_success_rate = min_success_rate
+        self.min_samples = min_samples
+        self.explore_every = explore_every
+        self.window = window
+        self._results = {}
+        self._skipped = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, name, config=None, required_fields=None):
+        """Construye el router a partir de la configuración.
+
+        Parameters
+        ----------
+        name : str
+            nombre del router. Se usa para leer los campos requeridos de `required_fields.<name>`
+        config : dict
+            diccionario con las claves opcionales `required_fields`, `min_success_rate`, `min_samples` y
+            `explore_every`
+        required_fields : list
+            campos requeridos por defecto si no están configurados
+
+        Returns
+        -------
+        FieldRouter
+            router configurado
+        """
+        config = config if config else {}
+        keys = ["min_success_rate", "min_samples", "explore_every"]
+        fields = config.get("required_fields", {}).get(name) or required_fields
+        return cls(name=name, required_fields=fields,
+                   **{key: config.get(key) for key in keys if config.get(key) is not None})
+
+    def get_success_rate(self, field):
+        """Devuelve la tasa de éxito por HTTP del campo o None si no hay ningún intento registrado."""
+        with self._lock:
+            results = self._results.get(field, [])
+        return sum(results) / len(results) if results else None
+
+    def use_http(self):
+        """Indica si la siguiente extracción se debe intentar por HTTP.
+
+        Returns
+        -------
+        bool
+            True si todos los campos requeridos tienen una tasa de éxito suficiente, si todavía no hay suficientes
+            intentos o si toca volver a probar HTTP
+        """
+        with self._lock:
+            samples = min([len(self._results.get(field, [])) for field in self.required_fields] or [0])
+        if samples < self.min_samples:
+            return True
+        failing = [field for field in self.required_fields
+                   if self.get_success_rate(field) < self.min_success_rate]
+        if not failing:
+            return True
+        with self._lock:
+            self._skipped += 1
+            explore = self._skipped >= self.explore_every
+            if explore:
+                self._skipped = 0
+        if not explore:
+            self.logger.debug("-{router}-: routing to selenium due to low success rate of fields: {fields}".format(
+                router=self.name, fields=failing))
+        return explore
+
+    def record(self, found_fields):
+        """Registra el resultado de un intento por HTTP.
+
+        Parameters
+        ----------
+        found_fields : dict
+            indica por cada campo requerido si se ha conseguido por HTTP
+        """
+        with self._lock:
+            for field in self.required_fields:
+                results = self._results.get(field, []) + [1 if found_fields.get(field) else 0]
+                self._results[field] = results[-self.window:]
+
+
+_routers = {}
+
+
+def get_field_router(name, config=None, required_fields=None):
+    """Devuelve el router `name` del proceso actual, creándolo si no existe.
+
+    Parameters
+    ----------
+    name : str
+        nombre del router: `place` o `results`
+    config : dict
+        configuración `http_fetch` de la ejecución
+    required_fields : list
+        campos requeridos por defecto si no están configurados
+
+    Returns
+    -------
+    FieldRouter
+        router del proceso
+    """
+    key = (os.getpid(), name)
+    if key not in _routers:
+        _routers[key] = FieldRouter.from_config(name, config, required_fields)
+    return _routers.get(key)
@@ -0,0 +1,95 @@
+"""
+Métricas de ejecución por proceso (contadores y tiempos) que se usan para medir y ajustar el comportamiento del programa
+en cada máquina. Cada proceso mantiene su propio registro y vuelca un resumen en los logs al finalizar.
+"""
+import logging
+import multiprocessing.util
+import os
+import threading
+
+
+class MetricsRegistry:
+    """Registro de métricas del proceso.
+
+    ...
+    Attributes
+    ----------
+    logger : logging.Logger
+        logger de la clase
+    _counters : dict
+        contadores por nombre de métrica
+    _timings : dict
+        observaciones agregadas (número, suma y máximo) por nombre de métrica
+    _lock : threading.Lock
+        cerrojo para proteger la actualización concurrente de las métricas
+
+    Methods
+    -------
+    incr(name, value=1)
+        incrementa el contador `name`
+    observe(name, value)
+        registra una observación (tiempo, bytes...) para la métrica `name`
+    snapshot()
+        devuelve una copia de las métricas registradas
+    log_summary()
+        vuelca en los logs el resumen de las métricas registradas
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._counters = {}
+        self._timings = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name, value=1):
+        """Incrementa el contador `name` en `value`."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        """Registra una observación para la métrica `name`."""
+        with self._lock:
+            count, total, maximum = self._timings.get(name, (0, 0, 0))
+            self._timings[name] = (count + 1, total + value, max(maximum, value))
+
+    def snapshot(self):
+        """Devuelve una copia de las métricas registradas.
+
+        Returns
+        -------
+        dict
+            diccionario con las claves `counters` y `timings`. Cada elemento de `timings` contiene el número de
+            observaciones (`count`), la suma (`total`), la media (`mean`) y el máximo (`max`)
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            timings = {name: {"count": count, "total": total, "mean": total / count if count else 0, "max": maximum}
+                       for name, (count, total, maximum) in self._timings.items()}
+        return {"counters": counters, "timings": timings}
+
+    def log_summary(self):
+        """Vuelca en los logs el resumen de las métricas registradas."""
+        snapshot = self.snapshot()
+        if snapshot.get("counters") or snapshot.get("timings"):
+            self.logger.info("-{pid}-: metrics summary: {metrics}".format(pid=os.getpid(), metrics=snapshot))
+
+
+_registries = {}
+
+
+def get_metrics():
+    """Devuelve el registro de métricas del proceso actual, creándolo si no existe. Al finalizar el proceso se vuelca
+    el resumen de las métricas en los logs.
+
+    Returns
+    -------
+    MetricsRegistry
+        registro de métricas del proceso
+    """
+    pid = os.getpid()
+    registry = _registries.get(pid)
+    if registry is None:
+        registry = MetricsRegistry()
+        _registries[pid] = registry
+        multiprocessing.util.Finalize(registry, registry.log_summary, exitpriority=0)
+    return registry
@@ -20,6 +20,9 @@ class AbstractWriter:
     is_registered(name, date)
         función auxiliar que checkea si la instancia está ya registrado en el soporte de salida para evitar volver a
         procesarlo o escribirlo en la bbdd. A implementar por las clases hijas.
+    get_comment_fingerprints(hash_commercial_premise)
+        función auxiliar que devuelve las huellas de los comentarios ya registrados para un local comercial. Por defecto
+        no hay ningún comentario registrado.
     """
 
     def __init__(self, name=None):
@@ -37,6 +40,9 @@ class AbstractWriter:
     def write(self, element, is_update=False):
         raise NotImplementedError("Method must be implemented in subclass")
 
+    def get_comment_fingerprints(self, hash_commercial_premise):
+        return set()
+
 
 class DbWriter(AbstractWriter):
     """Esta clase abstracta extiende de `AbstractReader` y contiene la definición e interfaz de funciones para todos
@@ -0,0 +1,171 @@
+"""
+Modelo de coste de la extracción de cada código postal a partir del número de locales comerciales que se registraron en
+ejecuciones anteriores y de lo que se tardó en extraerlos, para poder ejecutar primero los códigos postales más costosos
+(longest processing time first) y evitar que un código postal grande empiece al final de la ejecución y la alargue en
+solitario.
+"""
+import logging
+import statistics
+
+
+class ZipCostModel:
+    """Estima el coste de extraer un código postal y sus tipos de locales. Como la duración de la extracción está
+    dominada por la extracción de cada local, el coste es el número de locales esperados por los segundos esperados
+    por local: la media de locales registrados por ejecución y la media de segundos de extracción por local para el
+    código postal y los mismos tipos de locales. Si no hay histórico para esa combinación se usa la media del código
+    postal y, en su defecto, la mediana de todo el histórico. Sin histórico de duraciones el coste es el número de
+    locales esperados.
+
+    ...
+    Attributes
+    ----------
+    logger : logging.Logger
+        logger de la clase
+    _places : dict
+        media de locales por ejecución por código postal y tipos de locales
+    _zip_places : dict
+        media de locales por ejecución por código postal, para cualquier combinación de tipos de locales
+    _default_places : float
+        número de locales de los códigos postales sin histórico
+    _seconds : dict
+        media de segundos de extracción por local por código postal y tipos de locales
+    _zip_seconds : dict
+        media de segundos de extracción por local por código postal, para cualquier combinación de tipos de locales
+    _default_seconds : float
+        segundos de extracción por local de los códigos postales sin histórico de duraciones
+
+    Methods
+    -------
+    get_places(postal_code, places_types)
+        devuelve el número de locales esperados para el código postal y los tipos de locales
+    get_seconds(postal_code, places_types)
+        devuelve los segundos de extracción esperados por local para el código postal y los tipos de locales
+    get_cost(postal_code, places_types)
+        devuelve el coste esperado para el código postal y los tipos de locales
+    sort(zip_config)
+        ordena los códigos postales de mayor a menor coste
+    """
+
+    def __init__(self, history=None, durations=None):
+        """Constructor de la clase
+
+        Parameters
+        ----------
+        history : list
+            tuplas (código postal, tipos de locales separados por '+', media de locales por ejecución) de las
+            ejecuciones anteriores
+        durations : list
+            tuplas (código postal, tipos de locales separados por '+', media de segundos de extracción por local) de
+            las ejecuciones anteriores. Opcional
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._places, self._zip_places = self._get_means(history)
+        self._default_places = statistics.median(self._places.values()) if self._places else 0
+        self._seconds, self._zip_seconds = self._get_means(durations)
+        self._default_seconds = statistics.median(self._seconds.values()) if self._seconds else 1
+
+    @classmethod
+    def _get_means(cls, history):
+        """Agrupa el histórico por código postal y tipos de locales.
+
+        Returns
+        -------
+        tuple
+            media de los valores por código postal y tipos de locales, y media de estas por código postal
+        """
+        values_by_key = {}
+        for postal_code, places_types, value in history if history else []:
+            key = (str(postal_code), cls._get_types_key(str(places_types).split("+")))
+            values_by_key.setdefault(key, []).append(float(value))
+        means = {key: statistics.mean(values) for key, values in values_by_key.items()}
+        zip_values = {}
+        for (postal_code, _), value in means.items():
+            zip_values.setdefault(postal_code, []).append(value)
+        return means, {postal_code: statistics.mean(values) for postal_code, values in zip_values.items()}
+
+    @staticmethod
+    def _get_types_key(places_types):
+        return "+".join(sorted([place_type.strip() for place_type in places_types if place_type.strip()]))
+
+    def _get_value(self, means, zip_means, default, postal_code, places_types):
+        key = (str(postal_code), self._get_types_key(places_types if places_types else []))
+        if key in means:
+            return means.get(key)
+        return zip_means.get(str(postal_code), default)
+
+    def get_places(self, postal_code, places_types=None):
+        """Devuelve el número de locales esperados para el código postal y los tipos de locales.
+
+        Parameters
+        ----------
+        postal_code : str
+            código postal
+        places_types : list
+            tipos de locales de la búsqueda
+
+        Returns
+        -------
+        float
+            número de locales esperados
+        """
+        return self._get_value(self._places, self._zip_places, self._default_places, postal_code, places_types)
+
+    def get_seconds(self, postal_code, places_types=None):
+        """Devuelve los segundos de extracción esperados por local para el código postal y los tipos de locales.
+
+        Parameters
+        ----------
+        postal_code : str
+            código postal
+        places_types : list
+            tipos de locales de la búsqueda
+
+        Returns
+        -------
+        float
+            segundos esperados por local
+        """
+        return self._get_value(self._seconds, self._zip_seconds, self._default_seconds, postal_code, places_types)
+
+    def get_cost(self, postal_code, places_types=None):
+        """Devuelve el coste esperado para el código postal y los tipos de locales: número de locales esperados por los
+        segundos esperados por local.
+
+        Parameters
+        ----------
+        postal_code : str
+            código postal
+        places_types : list
+            tipos de locales de la búsqueda
+
+        Returns
+        -------
+        float
+            segundos de extracción esperados o número de locales esperados si no hay histórico de duraciones
+        """
+        return self.get_places(postal_code, places_types) * self.get_seconds(postal_code, places_types)
+
+    def sort(self, zip_config):
+        """Ordena los códigos postales de mayor a menor coste esperado.
+
+        Parameters
+        ----------
+        zip_config : list
+            códigos postales con las claves `postal_code` y `types`
+
+        Returns
+        -------
+        list
+            códigos postales ordenados de mayor a menor coste
+        """
+        sorted_config = sorted(zip_config, key=lambda zip_info: -self.get_cost(zip_info.get("postal_code"),
+                                                                                 zip_info.get("types")))
+        if sorted_config:
+            self.logger.info("zip codes sorted by expected cost, from -{first}- ({max_cost:.0f}) to -{last}- "
+                             "({min_cost:.0f})".format(
+                                 first=sorted_config[0].get("postal_code"), last=sorted_config[-1].get("postal_code"),
+                                 max_cost=self.get_cost(sorted_config[0].get("postal_code"),
+                                                        sorted_config[0].get("types")),
+                                 min_cost=self.get_cost(sorted_config[-1].get("postal_code"),
+                                                        sorted_config[-1].get("types"))))
+        return sorted_config
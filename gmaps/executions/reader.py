@@ -1,7 +1,6 @@
 import logging
 
-import psycopg2
-
+from gmaps.commons.db.connection_pool import get_connection_pool
 from gmaps.commons.reader.reader import DbReader
 
 
@@ -19,9 +18,17 @@ class ExecutionDbReader(DbReader):
     logger : logging.Logger
         instancia de logging.Logger
     db
-        referencia a la conexión a la base de datos
+        referencia a la conexión a la base de datos, prestada por el pool de conexiones del proceso
+    _pool_config : dict
+        configuración del pool de conexiones (`pool` en la configuración de la base de datos)
     _read_execution_info : str
         query que se ejecutará para obtener los códigos postales para la ejecución del programa
+    _read_zip_history : str
+        query que se ejecutará para obtener la media de locales registrados por ejecución para cada código postal y
+        tipos de locales
+    _read_zip_durations : str
+        query que se ejecutará para obtener la media de segundos de extracción por local para cada código postal y
+        tipos de locales
     """
 
     def __init__(self, config=None):
@@ -30,6 +37,7 @@ class ExecutionDbReader(DbReader):
         self.db_name = config.get("database")
         self.logger = logging.getLogger(self.__class__.__name__)
         self.db = None
+        self._pool_config = config.get("pool")
         self._read_execution_info = """
             select zip_info.zip_code as zip_code, zip_info.gmaps_url as gmaps_url,
                 zip_info.country as country, string_agg(categoria, ',') as place_type
@@ -39,6 +47,21 @@ class ExecutionDbReader(DbReader):
             group by zip_code, gmaps_url, country;
         """
 
+        self._read_zip_history = """
+            select zip_code, execution_places_types, count(*)::float / count(distinct date) as places
+            from commercial_premise
+            where date >= %s
+            group by zip_code, execution_places_types
+        """
+
+        self._read_zip_durations = """
+            select place.zip_code, place.execution_places_types, avg(extraction.seconds) as seconds
+            from commercial_premise as place
+            join commercial_premise_extraction_time as extraction on place.id = extraction.commercial_premise_id
+            where place.date >= %s
+            group by place.zip_code, place.execution_places_types
+        """
+
         self._recover_execution = """
             SELECT id, name, commercial_premise_gmaps_url, zip_code, execution_places_types, address
             FROM commercial_premise
@@ -62,17 +85,18 @@ class ExecutionDbReader(DbReader):
         """
 
     def finish(self):
-        """Función encargada de cerrar la conexión a la base de datos."""
-        self.db.close()
+        """Función encargada de devolver la conexión a la base de datos al pool de conexiones del proceso."""
+        if self.db is not None:
+            get_connection_pool(self.host, self.db_name, self.db_user, self.db_pass, self._pool_config).release(
+                self.db)
+            self.db = None
 
     def auto_boot(self):
-        """Función encargada de crear la conexión a la base de datos."""
-        self.db = psycopg2.connect(
-            host=self.host,
-            user=self.db_user,
-            password=self.db_pass,
-            database=self.db_name
-        )
+        """Función encargada de tomar prestada una conexión del pool de conexiones del proceso. Si la instancia ya
+        tiene una conexión, no hace nada."""
+        if self.db is None:
+            self.db = get_connection_pool(self.host, self.db_name, self.db_user, self.db_pass,
+                                          self._pool_config).acquire()
 
     def read(self):
         """Función encargada de ejecutar la query y obtener los resultados de la base de datos y devolverlos en forma de
@@ -109,6 +133,52 @@ class ExecutionDbReader(DbReader):
             cursor.close()
             return executions
 
+    def read_zip_history(self, since_date=None):
+        """Función encargada de obtener, de las ejecuciones desde `since_date`, la media de locales registrados por
+        ejecución para cada código postal y tipos de locales.
+
+        Returns
+        -------
+        list
+            tuplas (código postal, tipos de locales separados por '+', media de locales por ejecución)
+        """
+        cursor = self.db.cursor()
+        history = []
+        try:
+            cursor.execute(self._read_zip_history, (since_date,))
+            history = [(zip_code, places_types, places) for zip_code, places_types, places in cursor.fetchall()
+                       if zip_code and places_types]
+        except Exception as e:
+            self.logger.error("something went wrong trying to retrieve zip codes history")
+            self.logger.error(str(e))
+        finally:
+            cursor.close()
+            return history
+
+    def read_zip_durations(self, since_date=None):
+        """Función encargada de obtener, de las ejecuciones desde `since_date`, la media de segundos de extracción por
+        local para cada código postal y tipos de locales.
+
+        Returns
+        -------
+        list
+            tuplas (código postal, tipos de locales separados por '+', media de segundos de extracción por local)
+        """
+        cursor = self.db.cursor()
+        durations = []
+        try:
+            cursor.execute(self._read_zip_durations, (since_date,))
+            durations = [(zip_code, places_types, seconds) for zip_code, places_types, seconds in cursor.fetchall()
+                         if zip_code and places_types and seconds is not None]
+        except Exception as e:
+            # la tabla de duraciones no existe en las bases de datos creadas antes de registrarlas
+            self.db.rollback()
+            self.logger.error("something went wrong trying to retrieve zip codes durations")
+            self.logger.error(str(e))
+        finally:
+            cursor.close()
+            return durations
+
     def recover_execution(self, date=None, is_forced=False):
         """Función encargada de ejecutar la query y obtener los resultados de la base de datos y devolverlos en forma de
         json array
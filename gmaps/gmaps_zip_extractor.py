@@ -3,17 +3,22 @@ Script principal que lleva la lógica de más alto nivel para la ejecución de `
 obtener la información de los locales comerciales para cada código postal que se le pase al programa como entrada.
 """
 import argparse
-import itertools
 import logging
 import time
-from datetime import datetime
-from multiprocessing.pool import Pool
+from datetime import datetime, timedelta
 
 from gmaps.commons.commons import get_zip_codes_obj_config, get_obj_from_file, init_default_handler, \
     validate_required_keys
+from gmaps.commons.driver.pool import get_driver_pool
+from gmaps.commons.driver.recycling import DriverRecyclingPolicy
+from gmaps.commons.driver.session import SessionProfile, get_session_profile
+from gmaps.commons.extractor.extractor import AbstractGMapsExtractor
+from gmaps.commons.extractor.latency import get_latency_tracker
+from gmaps.commons.extractor.pacing import RateLimiter, set_rate_limiter
+from gmaps.executions.cost import ZipCostModel
 from gmaps.executions.reader import ExecutionDbReader
 from gmaps.places.extractor import PlacesExtractor
-from gmaps.process.gmaps_process import GmapsProcessPool
+from gmaps.process.scheduler import WorkScheduler, emit
 from gmaps.results.optimized_extractor import OptimizedResultsExtractor
 
 
@@ -33,9 +38,42 @@ def get_parser():
     path to configuration file in json format that with the following schema:
         {
           "driver_path": "<path_to_driver>",
-          "executors": <number_of_executors>,
+          "executors": <number of tasks (zip codes and places) running at the same time, one browser each>,
           "log_level": "<log_level>",
           "log_dir": <path where logs will be stored>,
+          "resource_blocking": "<resources blocked in the browser: [none, with-occupancy, text-only]>",
+          "incremental_reviews": <only extract the reviews published since the last stored one: [true, false]>,
+          "extraction_engine": "<source of the place info: [dom, network]>",
+          "http_fetch": {
+            "enabled": <try a browserless http fetch before selenium: [true, false]>,
+            "timeout": <http request timeout in seconds>,
+            "min_success_rate": <success rate of every required field needed to keep routing to http>,
+            "min_samples": <http attempts before the success rate is evaluated>,
+            "explore_every": <places routed to selenium before http is tried again>,
+            "required_fields": {
+              "place": [<fields that http must get for a place, e.g. name, address, score, opening_hours, comments>],
+              "results": [<fields that http must get for every search result, e.g. name, address>]
+            }
+          },
+          "timeouts": {
+            "file_path": "<json file where wait latencies are persisted between executions>",
+            "percentile": <latency percentile used as base timeout>,
+            "safety_factor": <factor applied to the percentile>,
+            "min_timeout": <minimum timeout in seconds>,
+            "max_timeout": <maximum timeout in seconds>,
+            "min_samples": <samples needed before calibrating a wait>
+          },
+          "driver_pool": {
+            "size": <number of warm drivers kept per worker process and pool>,
+            "standby": <number of drivers booted in background for the next place per worker process and pool>,
+            (at most executors * (1 + pools * max(size, standby)) browsers run at the same time, pools being 1 for
+             the dom extraction engine and 2 for the network one)
+            "recycling": {
+              "max_pages": <pages served before a driver is replaced>,
+              "max_rss_mb": <chrome process tree resident memory limit in MB>,
+              "max_age_seconds": <driver session age limit in seconds>
+            }
+          },
           "input_config": {
             "type": "file",
             "local": {
@@ -106,23 +144,105 @@ def get_zip_execution_obj_config(input_config):
     return executions
 
 
+def get_zip_cost_model(execution_config, today_date):
+    """Función encargada de construir el modelo de coste de los códigos postales a partir de los locales registrados en
+    el soporte de salida en las ejecuciones de los últimos `history_days` días y de lo que se tardó en extraerlos.
+
+    Parameters
+    ----------
+    execution_config : dict
+        configuración de la ejecución. El modelo se configura en `scheduler.lpt`
+    today_date : datetime.date
+        fecha de la ejecución
+
+    Returns
+    -------
+    gmaps.executions.cost.ZipCostModel
+        modelo de coste o None si no está activado o el soporte de salida no es una base de datos
+    """
+    lpt_config = (execution_config.get("scheduler") or {}).get("lpt") or {}
+    output_config = execution_config.get("output_config")
+    if not lpt_config.get("enabled") or output_config.get("type") != "db":
+        return None
+    since_date = today_date - timedelta(days=lpt_config.get("history_days", 90))
+    reader = ExecutionDbReader(output_config.get("db").get("config"))
+    reader.auto_boot()
+    history = reader.read_zip_history(since_date=since_date.isoformat())
+    durations = reader.read_zip_durations(since_date=since_date.isoformat())
+    reader.finish()
+    return ZipCostModel(history, durations)
+
+
+def bootstrap_session_profile(logger, execution_config):
+    """Función encargada de capturar, antes de lanzar los procesos de extracción, la sesión (cookies del consentimiento
+    aceptado) que se inyecta en todos los drivers. Sólo se captura con un navegador si no hay una sesión guardada o ha
+    caducado.
+
+    Parameters
+    ----------
+    logger : logging.Logger
+        logger de la ejecución
+    execution_config : dict
+        configuración de la ejecución. La sesión se configura en `session`
+    """
+    session_profile = SessionProfile.from_config(execution_config.get("session"))
+    if not session_profile or session_profile.load():
+        return
+    logger.info("session in -{file}- is missing or stale, capturing a new one".format(
+        file=session_profile.file_path))
+    # el driver se construye sin sesión ni pool para que la captura parta de un navegador limpio
+    bootstrap_extractor = AbstractGMapsExtractor(driver_location=execution_config.get("driver_path"),
+                                                 resource_blocking=execution_config.get("resource_blocking"))
+    bootstrap_extractor.auto_boot()
+    if bootstrap_extractor.get_driver():
+        session_profile.capture(bootstrap_extractor.get_driver())
+    bootstrap_extractor.finish()
+
+
+def get_worker_driver_pool(driver_pool_config=None, extraction_engine=None):
+    """Función que devuelve el pool de drivers del proceso actual en caso de que se haya configurado en la ejecución.
+    Los extractores que usan el motor de extracción `network` construyen los drivers con el log de rendimiento activado,
+    por lo que toman prestados sus drivers de un pool propio (`network`) en lugar del pool compartido (`default`).
+
+    Parameters
+    ----------
+    driver_pool_config : dict
+        configuración del pool de drivers (`driver_pool`) establecida en el fichero de configuración
+    extraction_engine : str
+        motor de extracción del extractor que usará el pool: `dom` o `network`. Por defecto `dom`
+
+    Returns
+    -------
+    gmaps.commons.driver.pool.DriverPool
+        pool de drivers del proceso o None si no se ha configurado
+    """
+    if driver_pool_config and (driver_pool_config.get("size", 0) > 0 or driver_pool_config.get("standby", 0) > 0):
+        recycling_policy = DriverRecyclingPolicy.from_config(driver_pool_config.get("recycling"))
+        return get_driver_pool(name="network" if extraction_engine == "network" else "default",
+                               size=driver_pool_config.get("size", 0), recycling_policy=recycling_policy,
+                               standby=driver_pool_config.get("standby", 0))
+    else:
+        return None
+
+
 def scrap_zip_code(arguments):
     """ Función que crea una instancia de `OptimizedResultsExtractor` y ejecuta su función `scrap`. Esta función
-    (`scrap_zip_code`) es llamada por el pool de procesos para paralelizar la extracción de las urls de acceso a cada
-    local comercial que se encuentre en las páginas de resultados para un código postal y tipos de locales comerciales.
+    (`scrap_zip_code`) es llamada por el planificador de tareas para paralelizar la extracción de las urls de acceso a
+    cada local comercial que se encuentre en las páginas de resultados para un código postal y tipos de locales
+    comerciales. Los locales encontrados no se extraen aquí: los locales de cada página se publican en el planificador
+    (`emit`) en cuanto se extraen, y este encola una tarea `scrap_place` por cada uno mientras se sigue paginando.
 
     Parameters
     ----------
     arguments : dict
         diccionario que contiene los campos para instanciar un objecto de la clase `OptimizedResultsExtractor` y además
-        los campos que necesite una instancia de `PlacesExtractor` ya que como resultado de la función `scrap_zip_code`
-        se devuelve una lista de diccionarios, los que contienen los parámetros para instanciar los scrappers de los
-        locales comerciales (`PlacesExtractor`)
+        los campos que necesite una instancia de `PlacesExtractor` ya que por cada local encontrado se publica un
+        diccionario con los parámetros para instanciar los scrappers de los locales comerciales (`PlacesExtractor`)
 
     Returns
     -------
-    list
-        lista da diccionarios cuyas claves y valores serán los argumentos para instanciar objetos de `PlacesExtractor`
+    int
+        número de locales comerciales encontrados
     """
     postal_code = arguments.get("postal_code")
     driver_location = arguments.get("driver_location")
@@ -130,30 +250,43 @@ def scrap_zip_code(arguments):
     output_config = arguments.get("output_config")
     extraction_date = arguments.get("extraction_date")
     places_types = arguments.get("places_types")
-    executors = arguments.get("executors")
+    driver_pool_config = arguments.get("driver_pool")
     scraper = OptimizedResultsExtractor(driver_location=driver_location,
                                         postal_code=postal_code,
                                         places_types=places_types,
                                         num_pages=arguments.get("num_pages"),
-                                        base_url=arguments.get("base_url"))
-    results = scraper.scrap()
-    parsed_results = [{"url": place_found.get("url"),
-                       "place_name": place_found.get("name"),
-                       "place_address": place_found.get("address"),
-                       "postal_code": postal_code,
-                       "driver_location": driver_location,
-                       "num_reviews": num_reviews,
-                       "output_config": output_config,
-                       "places_types": places_types,
-                       "extraction_date": extraction_date} for place_found in results]
-    with Pool(processes=executors) as pool:
-        places_results = pool.map(func=scrap_place, iterable=iter(parsed_results))
-    return places_results
+                                        base_url=arguments.get("base_url"),
+                                        driver_pool=get_worker_driver_pool(driver_pool_config),
+                                        resource_blocking=arguments.get("resource_blocking"),
+                                        latency_tracker=get_latency_tracker(arguments.get("timeouts")),
+                                        http_fetch=arguments.get("http_fetch"),
+                                        session_profile=get_session_profile(arguments.get("session")))
+    total_places = 0
+    for page_places in scraper.iter_pages():
+        for place_found in page_places:
+            emit({"url": place_found.get("url"),
+                  "place_name": place_found.get("name"),
+                  "place_address": place_found.get("address"),
+                  "postal_code": postal_code,
+                  "driver_location": driver_location,
+                  "num_reviews": num_reviews,
+                  "output_config": output_config,
+                  "places_types": places_types,
+                  "driver_pool": driver_pool_config,
+                  "resource_blocking": arguments.get("resource_blocking"),
+                  "session": arguments.get("session"),
+                  "incremental_reviews": arguments.get("incremental_reviews"),
+                  "extraction_engine": arguments.get("extraction_engine"),
+                  "http_fetch": arguments.get("http_fetch"),
+                  "timeouts": arguments.get("timeouts"),
+                  "extraction_date": extraction_date})
+        total_places += len(page_places)
+    return total_places
 
 
 def scrap_place(arguments):
     """ Función que crea una instancia de `PlacesExtractor` y ejecuta su función `scrap`. Esta función (`scrap_place`)
-    es llamada por el pool de procesos para paralelizar la extracción de los locales comerciales.
+    es llamada por el planificador de tareas para paralelizar la extracción de los locales comerciales.
 
     Parameters
     ----------
@@ -175,6 +308,7 @@ def scrap_place(arguments):
     postal_code = arguments.get("postal_code")
     extraction_date = arguments.get("extraction_date")
     places_types = arguments.get("places_types")
+    extraction_engine = arguments.get("extraction_engine") or "dom"
     scraper = PlacesExtractor(driver_location=driver_location,
                               url=url,
                               place_name=place_name,
@@ -183,7 +317,14 @@ def scrap_place(arguments):
                               output_config=output_config,
                               postal_code=postal_code,
                               places_types=places_types,
-                              extraction_date=extraction_date)
+                              extraction_date=extraction_date,
+                              driver_pool=get_worker_driver_pool(arguments.get("driver_pool"), extraction_engine),
+                              resource_blocking=arguments.get("resource_blocking"),
+                              latency_tracker=get_latency_tracker(arguments.get("timeouts")),
+                              incremental_reviews=arguments.get("incremental_reviews", False),
+                              extraction_engine=extraction_engine,
+                              http_fetch=arguments.get("http_fetch"),
+                              session_profile=get_session_profile(arguments.get("session")))
     results = False
     if arguments.get("is_recovery") and arguments.get("place_id"):
         results = scraper.recover(place_id=arguments.get("place_id"))
@@ -199,24 +340,52 @@ def extraction(logger=None, execution_config=None, today_date=None):
     output_config = execution_config.get("output_config")
     zip_config = get_zip_execution_obj_config(input_config)
     logger.info("zip codes to extract url: {zip_config}".format(zip_config=zip_config))
-    # se construye la lista de objetos que serán los argumentos para la llamada a la función `scrap_zip_code` (
+    # los códigos postales con más locales esperados se ejecutan primero para que no alarguen el final de la ejecución
+    cost_model = get_zip_cost_model(execution_config, today_date)
+    if cost_model and isinstance(zip_config, list):
+        zip_config = cost_model.sort(zip_config)
+    # se construyen bajo demanda los objetos que serán los argumentos para la llamada a la función `scrap_zip_code` (
     # extrae las urls de los locales comerciales) por cada uno de los procesos que formen el pool de procesos.
-    zip_arguments_list = [{"driver_location": execution_config.get("driver_path"),
+    zip_arguments_list = ({"driver_location": execution_config.get("driver_path"),
                            "postal_code": zip_info.get("postal_code"),
                            "places_types": zip_info.get("types"),
                            "num_pages": execution_config.get("results_pages"),
                            "base_url": zip_info.get("base_url"),
                            "num_reviews": execution_config.get("num_reviews"),
                            "output_config": execution_config.get("output_config"),
-                           "executors": execution_config.get("place_executors", 3),
+                           "driver_pool": execution_config.get("driver_pool"),
+                           "resource_blocking": execution_config.get("resource_blocking"),
+                           "session": execution_config.get("session"),
+                           "incremental_reviews": execution_config.get("incremental_reviews", False),
+                           "extraction_engine": execution_config.get("extraction_engine"),
+                           "http_fetch": execution_config.get("http_fetch"),
+                           "timeouts": execution_config.get("timeouts"),
                            "extraction_date": today_date.isoformat()
-                           } for zip_info in zip_config]
-    with GmapsProcessPool(processes=execution_config.get("executors")) as pool:
-        zip_results = pool.map(func=scrap_zip_code, iterable=iter(zip_arguments_list))
-    # zip_results será el resultado de la ejecución de todos los procesos, por lo cual será de tipo list de list, y
-    # es necesario aplanarlo
-    places_argument_list = list(itertools.chain.from_iterable(zip_results))
-    logger.info("there have been found -{total}- places".format(total=len(places_argument_list)))
+                           } for zip_info in zip_config)
+    # un único planificador con `executors` tareas a la vez ejecuta tanto la búsqueda por código postal como la
+    # extracción de los locales encontrados. Cada tarea usa un navegador, a los que se suman los que mantengan
+    # arrancados los pools de drivers de cada proceso: `executors × (1 + pools × max(size, standby))` como máximo. Los
+    # locales tienen prioridad sobre los códigos postales para que se extraigan en cuanto se encuentran en lugar de
+    # acumularse en la cola
+    scheduler = WorkScheduler.from_config(handlers={"zip": scrap_zip_code, "place": scrap_place},
+                                          slots=execution_config.get("executors"),
+                                          config=execution_config.get("scheduler"),
+                                          priorities={"place": 0, "zip": 1},
+                                          spawns={"zip": "place"},
+                                          # el ritmo de peticiones se comparte entre todos los procesos del pool
+                                          initializer=set_rate_limiter,
+                                          initargs=(RateLimiter.from_config(execution_config.get("pacing")),))
+    scheduler.feed("zip", zip_arguments_list, total=len(zip_config))
+    # los resultados se procesan a medida que termina cada tarea y sólo se mantienen los contadores
+    total_places = 0
+    extracted_places = 0
+    for kind, is_success, result in scheduler.iter_completed():
+        if kind == "zip" and is_success:
+            total_places += result
+        elif kind == "place" and is_success and result:
+            extracted_places += 1
+    logger.info("there have been found -{total}- places and -{extracted}- have been extracted".format(
+        total=total_places, extracted=extracted_places))
 
 
 def recovery(logger, execution_config, today_date, is_forced=False):
@@ -229,7 +398,7 @@ def recovery(logger, execution_config, today_date, is_forced=False):
     reader.auto_boot()
     executions = reader.recover_execution(date=recovery_date.isoformat(), is_forced=is_forced)
     reader.finish()
-    recovery_arguments_list = [{"driver_location": execution_config.get("driver_path"),
+    recovery_arguments_list = ({"driver_location": execution_config.get("driver_path"),
                                 "postal_code": exec_place.get("postal_code"),
                                 "output_config": output_config_obj,
                                 "extraction_date": recovery_date.isoformat(),
@@ -239,12 +408,26 @@ def recovery(logger, execution_config, today_date, is_forced=False):
                                 "num_reviews": execution_config.get("num_reviews"),
                                 "places_types": exec_place.get("places_types"),
                                 "place_id": int(exec_place.get("commercial_premise_id")),
+                                "driver_pool": execution_config.get("driver_pool"),
+                                "resource_blocking": execution_config.get("resource_blocking"),
+                                "session": execution_config.get("session"),
+                                "incremental_reviews": execution_config.get("incremental_reviews", False),
+                                "extraction_engine": execution_config.get("extraction_engine"),
+                                "http_fetch": execution_config.get("http_fetch"),
+                                "timeouts": execution_config.get("timeouts"),
                                 "is_recovery": True
-                                } for exec_place in executions]
+                                } for exec_place in executions)
 
-    with Pool(processes=execution_config.get("recovery_executors", None)) as pool:
-        places_results = pool.map(func=scrap_place, iterable=iter(recovery_arguments_list))
-    return places_results
+    scheduler = WorkScheduler.from_config(handlers={"place": scrap_place},
+                                          slots=execution_config.get("recovery_executors",
+                                                                     execution_config.get("executors")),
+                                          config=execution_config.get("scheduler"),
+                                          initializer=set_rate_limiter,
+                                          initargs=(RateLimiter.from_config(execution_config.get("pacing")),))
+    scheduler.feed("place", recovery_arguments_list, total=len(executions))
+    recovered_places = sum([1 for _, is_success, result in scheduler.iter_completed() if is_success and result])
+    logger.info("-{recovered}- places have been recovered".format(recovered=recovered_places))
+    return recovered_places
 
 
 def extract():
@@ -268,6 +451,8 @@ def extract():
     # si el fichero de configuración que se ha pasado a la ejecución contiene las claves requeridas se procede a la
     # ejecución
     if validate_required_keys(keys=required_keys, obj=execution_config):
+        # la sesión se captura una única vez, antes de arrancar los procesos que construyen los drivers
+        bootstrap_session_profile(logger, execution_config)
         if execution_config.get("operation", "") == "recovery":
             is_forced = execution_config.get("forced_recovery", False)
             recovery(logger=logger, execution_config=execution_config, today_date=today_date, is_forced=is_forced)
@@ -3,15 +3,25 @@ import threading
 import time
 
 import selenium
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException, \
+    WebDriverException
 from selenium.webdriver.common.by import By
 
-from gmaps.commons.commons import validate_required_keys
+from gmaps.commons.commons import validate_required_keys, normalize_text
+from gmaps.commons.driver.capture import NetworkCapture, enable_performance_log
+from gmaps.commons.fetcher.http import get_http_fetcher, parse_app_initialization_state
+from gmaps.commons.fetcher.routing import get_field_router
 from gmaps.commons.extractor.extractor import AbstractGMapsExtractor
+from gmaps.commons.extractor.landing import BlockedPageException
+from gmaps.commons.extractor.waits import network_idle, spinner_stable, all_of, any_of
+from gmaps.commons.metrics.metrics import get_metrics
 from selenium.webdriver.support import expected_conditions as ec
 
 from gmaps.commons.writer.writer import PrinterWriter
-from gmaps.places.writer import PlaceDbWriter, PlaceFileWriter
+from gmaps.places.payload import parse_payload, decode_place, decode_place_from_state
+from gmaps.places.reviews import ReviewCollector
+from gmaps.places.writer import PlaceDbWriter, PlaceFileWriter, get_commercial_premise_hash, \
+    get_comment_fingerprint
 
 
 class PlacesExtractor(AbstractGMapsExtractor):
@@ -29,6 +39,19 @@ class PlacesExtractor(AbstractGMapsExtractor):
         url del local comercial del que vamos a extraer información
     _num_reviews
         número de comentarios/reviews que se quiere extraer para este local comercial
+    _extraction_engine
+        motor de extracción: `dom` lee la información de los elementos renderizados y `network` de las respuestas que
+        descarga la página
+    _network_capture
+        captura de las respuestas de red de la página del local comercial cuando el motor es `network`
+    _place_payload_pattern
+        fragmento de la url de la respuesta que contiene los datos del local comercial
+    _http_fetcher
+        descarga HTTP sin navegador de la página del local comercial. None si no está activada
+    _field_router
+        router que decide, por la tasa de éxito de cada campo, si se intenta primero la descarga HTTP
+    _incremental_reviews
+        si es True sólo se extraen los comentarios posteriores al último comentario ya registrado del local comercial
     _INDEX_TO_DAY
         atributo de ayuda para traducir de número a día de la semana debido al formato en el que lo hace la plataforma
         de google maps
@@ -51,6 +74,8 @@ class PlacesExtractor(AbstractGMapsExtractor):
     _occupancy_container_elements_xpath_query
         consulta de xpath para obtener el elemento padre del elemento que contiene la ocupación por horas del local
         comercial
+    _popular_times_css_class
+        clase css de la sección de ocupación por horas del local comercial
     _total_votes_xpath
         consulta de xpath para obtener el número total de votos del local comercial
     _address_xpath
@@ -65,6 +90,16 @@ class PlacesExtractor(AbstractGMapsExtractor):
         consulta de xpath para obtener el estilo del local comercial
     _review_css_class
         consulta de xpath para obtener los elementos de reviews
+    _result_name_xpath
+        consulta de xpath, relativa a cada resultado del listado, para obtener el nombre del local comercial
+    _result_address_xpath
+        consulta de xpath, relativa a cada resultado del listado, para obtener la dirección del local comercial
+    _sort_reviews_button_xpath
+        consulta de xpath para obtener el botón de ordenar los comentarios
+    _sort_newest_option_xpath
+        consulta de xpath para obtener la opción de ordenar los comentarios de más reciente a más antiguo
+    _loading_spinner_xpath
+        consulta de xpath para obtener el indicador de carga que se muestra mientras se cargan más comentarios
     _thread_local
         nombre del thread local (en desuso)
     _thread_driver_id
@@ -95,9 +130,17 @@ class PlacesExtractor(AbstractGMapsExtractor):
     _get_occupancy(external_driver)
         función que obtiene la ocupación por día
     _get_place_info(provided_driver)
-        función que extrae la información general del local comercial
-    _get_comments(place_name, sleep_time, external_driver)
+        función que extrae la información general del local comercial con el motor de extracción configurado
+    _get_place_info_from_dom(driver)
+        función que extrae la información general del local comercial de los elementos renderizados
+    _get_place_info_from_network(driver)
+        función que extrae la información general del local comercial de las respuestas de red de la página
+    _scrap_http()
+        función que extrae la información del local comercial sin navegador, descargando la página por HTTP
+    _get_comments(place_name, sleep_time, external_driver, known_fingerprints, comments)
         función que extrae los comentarios para el local comercial
+    found_place_in_list(provided_driver)
+        función que busca el local comercial en el listado de resultados y devuelve su índice
     _scrap(provided_driver)
         función auxiliar que contiene la lógica de realizar el scrapping en caso de que la url de de búsqueda nos
         redirija a una página de resultados en lugar de la página del local comercial.
@@ -110,8 +153,13 @@ class PlacesExtractor(AbstractGMapsExtractor):
         correspondiente que se haya configurado para la ejecución.
     """
 
+    _EXTRACTION_ENGINES = ["dom", "network"]
+    _HTTP_REQUIRED_FIELDS = ["name", "address", "score", "opening_hours", "comments"]
+
     def __init__(self, driver_location=None, url=None, place_address=None, place_name=None, num_reviews=None,
-                 output_config=None, postal_code=None, places_types=None, extraction_date=None):
+                 output_config=None, postal_code=None, places_types=None, extraction_date=None, driver_pool=None,
+                 resource_blocking=None, latency_tracker=None, incremental_reviews=False, extraction_engine="dom",
+                 http_fetch=None, session_profile=None):
         """Constructor de la clase
 
         Parameters
@@ -132,13 +180,47 @@ class PlacesExtractor(AbstractGMapsExtractor):
             lista de tipos de local comercial. Establecido en la configuración de la ejecución del programa
         extraction_date : str
             fecha de ejecución del programa
+        driver_pool : gmaps.commons.driver.pool.DriverPool
+            pool de drivers del que tomar prestado el driver en lugar de arrancar uno nuevo
+        resource_blocking : str or dict
+            preset o configuración del perfil de bloqueo de recursos del navegador
+        latency_tracker : gmaps.commons.extractor.latency.LatencyTracker
+            tracker de latencias usado para calibrar los tiempos de espera
+        incremental_reviews : bool
+            si es True sólo se extraen los comentarios publicados desde la última ejecución
+        extraction_engine : str
+            motor de extracción de la información del local comercial: `dom` o `network`
+        http_fetch : dict
+            configuración de la descarga HTTP sin navegador. Si está activada, el driver sólo se arranca cuando la
+            descarga HTTP no consigue todos los campos requeridos
+        session_profile : gmaps.commons.driver.session.SessionProfile
+            sesión (cookies del consentimiento aceptado e idioma) que se inyecta en el driver al construirlo
+
+        Raises
+        ------
+        ValueError
+            si el motor de extracción no está soportado
         """
-        super().__init__(driver_location, output_config)
+        super().__init__(driver_location, output_config, driver_pool=driver_pool, resource_blocking=resource_blocking,
+                         latency_tracker=latency_tracker, session_profile=session_profile)
         self.logger = logging.getLogger(self.__class__.__name__)
         self._place_name = place_name
         self._place_address = place_address
         self._url = url
         self._num_reviews = num_reviews
+        self._incremental_reviews = incremental_reviews
+        if extraction_engine not in self._EXTRACTION_ENGINES:
+            raise ValueError("extraction engine -{engine}- is not supported. supported engines: {engines}".format(
+                engine=extraction_engine, engines=self._EXTRACTION_ENGINES))
+        self._extraction_engine = extraction_engine
+        self._network_capture = None
+        self._place_payload_pattern = "/maps/preview/place"
+        if self._extraction_engine == "network":
+            enable_performance_log(self._default_capabilities)
+        self._http_fetcher = get_http_fetcher(http_fetch)
+        self._field_router = get_field_router("place", http_fetch, self._HTTP_REQUIRED_FIELDS) \
+            if self._http_fetcher else None
+        self._lazy_driver = self._http_fetcher is not None
         self._INDEX_TO_DAY = {
             "0": "domingo",
             "*0": "domingo",
@@ -165,6 +247,7 @@ class PlacesExtractor(AbstractGMapsExtractor):
         self._place_name_xpath = "//*[@id='pane']/div/div[@tabindex='-1']/div/div//h1"
         self._place_score_xpath = "//*[@id='pane']/div/div[@tabindex='-1']//span[@class='section-star-display']"
         self._occupancy_container_elements_xpath_query = "//div[contains(@class, 'section-popular-times-container')]/div"
+        self._popular_times_css_class = "section-popular-times"
         self._total_votes_xpath = "//*[@id='pane']/div/div[@tabindex='-1']/div/div/div[@class='section-hero-header-title']//span[@class='section-rating-term-list']//button"
         self._address_xpath = "//*[@id='pane']/div/div[@tabindex='-1']/div/div/div[@data-section-id='ad']//span[@class='widget-pane-link']"
         self._see_all_reviews_button = "//*[@id='pane']/div/div[1]/div/div/div/div/div[@jsaction='pane.reviewlist.goToReviews']/button"
@@ -173,6 +256,11 @@ class PlacesExtractor(AbstractGMapsExtractor):
         self._style = "//*[@id='pane']/div/div[1]/div/div//button/div//div[@class='section-editorial-attribute-container']"
         # self._review_css_class = "section-review-review-content"
         self._review_css_class = "section-review-content"
+        self._result_name_xpath = "div[@class='section-result-text-content']//h3/span"
+        self._result_address_xpath = "div[@class='section-result-text-content']//span[contains(@class, 'section-result-location')]"
+        self._sort_reviews_button_xpath = "//button[@data-value='Ordenar' or @data-value='Sort']"
+        self._sort_newest_option_xpath = "//div[@id='action-menu']/div[@data-index='1']"
+        self._loading_spinner_xpath = "//div[contains(@class, 'section-loading')]"
         self._review_publish_date = "//span[@class='section-review-publish-date']"
         self._review_content_xpath = "//span[@class='section-review-text']"
         self._thread_local = threading.local()
@@ -282,11 +370,20 @@ class PlacesExtractor(AbstractGMapsExtractor):
         driver = external_driver if external_driver else self.get_driver()
         occupancy = None
         occupancy_obj = {}
+        if not self._probe_occupancy(driver):
+            # el local no tiene ocupación por horas: se evita esperar el tiempo máximo hasta el `TimeoutException`
+            metrics = get_metrics()
+            metrics.incr("occupancy.skipped")
+            metrics.observe("occupancy.wait_avoided_seconds", self.get_wait_timeout("place_occupancy"))
+            self.logger.info("-{place}-: there is no occupancy section, skipping occupancy wait".format(
+                place=self._place_name))
+            return occupancy_obj
+        get_metrics().incr("occupancy.probed")
         try:
             xpath_query = "//*[@id='pane']/div/div//div[@class='section-popular-times']/div[@class='section-popular-times-container']"
-            driver.wait.until(
-                ec.visibility_of_all_elements_located((By.XPATH, xpath_query)))
-            occupancy = driver.find_element_by_class_name('section-popular-times')
+            self.wait_until("place_occupancy", ec.visibility_of_all_elements_located((By.XPATH, xpath_query)),
+                            external_driver=driver)
+            occupancy = driver.find_element_by_class_name(self._popular_times_css_class)
             if occupancy:
                 days_occupancy_container = occupancy.find_elements_by_xpath(
                     self._occupancy_container_elements_xpath_query)
@@ -303,11 +400,37 @@ class PlacesExtractor(AbstractGMapsExtractor):
                                                                                                url=self._url))
         return occupancy_obj
 
+    def _probe_occupancy(self, driver):
+        """Comprueba con una única llamada al navegador si la página del local comercial tiene, o va a tener, la
+        sección de ocupación por horas. La sección se renderiza junto con el resto del panel del local, por lo que si el
+        panel ya está cargado y la sección no existe, no va a aparecer.
+
+        Arguments
+        ---------
+        driver : webdriver.Chrome
+            driver con la página del local comercial cargada
+
+        Returns
+        -------
+        bool
+            True si hay que esperar a la sección de ocupación, False si el local no tiene ocupación por horas
+        """
+        script = """
+            var paneLoaded = document.evaluate(arguments[0], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE,
+                null).singleNodeValue !== null;
+            return !paneLoaded || document.getElementsByClassName(arguments[1]).length > 0;
+        """
+        try:
+            return bool(driver.execute_script(script, self._place_name_xpath, self._popular_times_css_class))
+        except WebDriverException as e:
+            self.logger.debug("-{place}-: occupancy probe failed: {error}".format(place=self._place_name, error=str(e)))
+            return True
+
     def _get_elements_match(self, provided_driver=None):
         driver = provided_driver if provided_driver else self.get_driver()
         xpath_query = "//*[@id='pane']/div/div[1]/div/div//button//div[@class='ugiz4pqJLAG__primary-text gm2-body-2']"
-        driver.wait.until(
-            ec.visibility_of_all_elements_located((By.XPATH, xpath_query)))
+        self.wait_until("place_info", ec.visibility_of_all_elements_located((By.XPATH, xpath_query)),
+                        external_driver=driver)
         likely_match = driver.find_elements_by_xpath(xpath_query)
         elements = {}
         self.logger.info("-{place}-: likely match found: {found}".format(place=self._place_name, found=len(likely_match)))
@@ -329,8 +452,9 @@ class PlacesExtractor(AbstractGMapsExtractor):
 
 
     def _get_place_info(self, provided_driver=None):
-        """Función que extrae la información general del local comercial. Así también se llama a las funciones para
-        obtener la ocupación y los comentarios
+        """Función que extrae la información general del local comercial con el motor de extracción configurado. Así
+        también se obtienen la ocupación y los comentarios. Si el motor `network` no encuentra los datos del local en
+        las respuestas de red, se extrae la información del DOM.
 
         Arguments
         ---------
@@ -344,28 +468,197 @@ class PlacesExtractor(AbstractGMapsExtractor):
 
         """
         driver = provided_driver if provided_driver else self.get_driver()
+        if self._extraction_engine == "network":
+            place_info = self._get_place_info_from_network(driver)
+            if place_info:
+                get_metrics().incr("place.engine.network")
+                return place_info
+            get_metrics().incr("place.engine.fallback")
+            self.logger.warning("-{place}-: place payload not captured, extracting info from rendered page".format(
+                place=self._place_name))
+        return self._get_place_info_from_dom(driver)
+
+    def _start_network_capture(self, driver):
+        """Inicia la captura de las respuestas de red de la página antes de navegar, si el motor es `network`."""
+        if self._extraction_engine != "network":
+            return
+        self._network_capture = NetworkCapture(driver, [self._place_payload_pattern])
+        self._network_capture.reset()
+
+    def _get_place_info_from_network(self, driver):
+        """Función que extrae la información general del local comercial de la respuesta de `/maps/preview/place` que
+        descarga la página, sin esperar a que se renderice ninguna sección. Si la respuesta no contiene suficientes
+        comentarios se completan con los de la vista de comentarios.
+
+        Arguments
+        ---------
+        driver : webdriver.Chrome
+            driver que se usará para extraer la información del local comercial
+
+        Returns
+        -------
+        dict
+            información del local comercial con el mismo formato que `_get_place_info_from_dom` o None si no se ha
+            capturado la respuesta con los datos del local
+        """
+        capture = self._network_capture
+        if not capture or capture.driver is not driver:
+            return None
+        self.wait_for(capture.response_finished(self._place_payload_pattern),
+                      timeout=self.get_wait_timeout("place_payload"), external_driver=driver)
+        place = None
+        for body in reversed(capture.get_bodies(self._place_payload_pattern)):
+            place = decode_place(parse_payload(body))
+            if place:
+                break
+        if not place:
+            return None
+        comments, known_fingerprints, is_complete = self._get_payload_comments(place)
+        if not is_complete:
+            # la respuesta sólo incluye los primeros comentarios: se conservan y sólo se obtienen los que faltan de la
+            # vista de comentarios
+            comments = self._get_comments(self._place_name, self.sleep_m, external_driver=driver,
+                                          known_fingerprints=known_fingerprints, comments=comments)
+        self.logger.info("-{place}-: info retrieved for place from network payload".format(place=self._place_name))
+        return self._build_payload_place_info(place, comments, driver.current_url, known_fingerprints)
+
+    def _get_payload_comments(self, place):
+        """Obtiene los comentarios incluidos en los datos decodificados del local comercial, descartando los ya
+        registrados si la extracción es incremental.
+
+        Los comentarios de los datos están completos si incluyen `_num_reviews` comentarios antes de descartar los ya
+        registrados o si incluyen alguno ya registrado. En modo incremental el número de comentarios nuevos casi
+        siempre es menor que `_num_reviews`, por lo que no sirve para decidir si faltan comentarios.
+
+        Returns
+        -------
+        tuple
+            lista de comentarios nuevos, como máximo `_num_reviews`, huellas de los comentarios ya registrados (None si
+            la extracción no es incremental) y True si los comentarios de los datos están completos
+        """
+        known_fingerprints = None
+        if self._incremental_reviews and self._writer:
+            known_fingerprints = self._writer.get_comment_fingerprints(
+                get_commercial_premise_hash(place.get("name"), place.get("address")))
+        payload_comments = place.get("comments") or []
+        comments = [comment for comment in payload_comments if not known_fingerprints or
+                    get_comment_fingerprint(comment.get("author"), comment.get("content")) not in known_fingerprints]
+        is_complete = len(payload_comments) >= self._num_reviews or len(comments) < len(payload_comments)
+        return comments[:self._num_reviews], known_fingerprints, is_complete
+
+    def _build_payload_place_info(self, place, comments, current_url, known_fingerprints=None):
+        """Completa los datos decodificados del local comercial con la información de la ejecución, con el mismo formato
+        que `_get_place_info_from_dom`."""
+        place_info = {key: value for key, value in place.items() if value is not None}
+        place_info.update({
+            "comments": comments,
+            "zip_code": self._postal_code,
+            "date": self._extraction_date,
+            "execution_places_types": self._places_types,
+            "extractor_url": self._url,
+            "current_url": current_url
+        })
+        self._set_incremental_reviews(place_info, known_fingerprints)
+        return place_info
+
+    def _set_incremental_reviews(self, place_info, known_fingerprints=None):
+        """Marca la información del local comercial como extracción incremental de comentarios. Las huellas de los
+        comentarios ya registrados se guardan en `known_comment_fingerprints` para que el `writer` no las vuelva a
+        consultar al filtrar los comentarios, como lista para que la información se pueda serializar en json."""
+        if self._incremental_reviews:
+            place_info["incremental_reviews"] = True
+            if known_fingerprints is not None:
+                place_info["known_comment_fingerprints"] = sorted(known_fingerprints)
+
+    def _scrap_http(self):
+        """Función que extrae la información del local comercial sin navegador: descarga la página por HTTP y decodifica
+        el estado inicial que incluye el html. Sólo se intenta si el router lo indica por la tasa de éxito de los campos
+        requeridos, y el resultado sólo se usa si se consiguen todos ellos.
+
+        Returns
+        -------
+        dict
+            información del local comercial con el mismo formato que `_get_place_info` o None si hay que extraerla
+            con Selenium
+        """
+        if not self._http_fetcher or not self._field_router.use_http():
+            return None
+        metrics = get_metrics()
+        self.pace("place")
+        init_time = time.time()
+        current_url, html = self._http_fetcher.fetch(self._url)
+        if html is None:
+            # la descarga ha fallado: no hay url que clasificar ni estado que decodificar
+            self._field_router.record({field: False for field in self._field_router.required_fields})
+            metrics.incr("http.place.fallback")
+            self.logger.info("-{place}-: http fetch failed, falling back to selenium".format(place=self._place_name))
+            return None
+        self.check_landing(url=current_url)
+        place = decode_place_from_state(parse_app_initialization_state(html), self._place_name)
+        comments, known_fingerprints, is_complete = self._get_payload_comments(place) if place else ([], None, False)
+        found_fields = {field: bool(place and place.get(field)) for field in self._field_router.required_fields}
+        if "comments" in found_fields:
+            found_fields["comments"] = is_complete
+        self._field_router.record(found_fields)
+        missing = [field for field, found in found_fields.items() if not found]
+        if missing:
+            metrics.incr("http.place.fallback")
+            self.logger.info("-{place}-: fields -{fields}- not found by http, falling back to selenium".format(
+                place=self._place_name, fields=missing))
+            return None
+        metrics.incr("http.place.success")
+        metrics.observe("http.place.seconds", time.time() - init_time)
+        self.logger.info("-{place}-: info retrieved for place by http".format(place=self._place_name))
+        return self._build_payload_place_info(place, comments, current_url, known_fingerprints)
+
+    def _get_place_info_from_dom(self, driver):
+        """Función que extrae la información general del local comercial de los elementos renderizados en la página.
+        Así también se llama a las funciones para obtener la ocupación y los comentarios
+
+        Arguments
+        ---------
+        driver : webdriver.Chrome
+            driver que se usará para extraer la información del local comercial
+
+        Returns
+        -------
+        dict
+            devuelve la información completa del local comercial en un diccionario de python
+        """
         elements = self._get_elements_match(provided_driver=driver)
-        # extract basic info
-        name_obj = self.get_obj_text(xpath_query=self._place_name_xpath, external_driver=driver)
+        # extract basic info: todos los campos opcionales se resuelven en una única llamada al navegador
+        fields = self.probe_fields({
+            "name": self._place_name_xpath,
+            "score": self._place_score_xpath,
+            "total_scores": self._total_votes_xpath,
+            "opening_hours": {"xpath": self._openning_hours_xpath_selector, "attributes": ["aria-label"]},
+            "opening_hours_aux": {"xpath": self._openning_hours_xpath_selector_aux, "attributes": ["aria-label"]},
+            "price_range": self._price_range,
+            "style": self._style,
+            "premise_type": self._premise_type
+        }, external_driver=driver)
+        field_text = {name: field.get("text") if field else None for name, field in fields.items()}
+        name_obj = field_text.get("name")
         name_val = name_obj if name_obj else self._place_name
-        score_obj = self.get_obj_text(xpath_query=self._place_score_xpath, external_driver=driver)
-        total_score_obj = self.get_obj_text(xpath_query=self._total_votes_xpath, external_driver=driver)
+        score_obj = field_text.get("score")
+        total_score_obj = field_text.get("total_scores")
         total_score_val = total_score_obj.replace("(", "").replace(")", "") if total_score_obj else total_score_obj
-        # address_obj = self.get_obj_text(xpath_query=self._address_xpath, external_driver=driver)
-        # address_obj_val = address_obj if address_obj else self._place_address
-        # coords_obj = self.get_obj_text(xpath_query=self._coords_xpath_selector, external_driver=driver)
-        # telephone_obj = self.get_obj_text(xpath_query=self._telephone_xpath_selector, external_driver=driver)
-        opening_obj_el = self.get_info_obj(xpath_query=self._openning_hours_xpath_selector, external_driver=driver)
-        opening_obj = opening_obj_el if opening_obj_el else self.get_info_obj(xpath_query=self._openning_hours_xpath_selector_aux, external_driver=driver)
-        price_range = self.get_obj_text(xpath_query=self._price_range, external_driver=driver)
-        style = self.get_obj_text(xpath_query=self._style, external_driver=driver)
-        premise_type = self.get_obj_text(xpath_query=self._premise_type, external_driver=driver)
-        opening_value = opening_obj.get_attribute("aria-label").split(",") if opening_obj else []
+        opening_obj = fields.get("opening_hours") if fields.get("opening_hours") else fields.get("opening_hours_aux")
+        price_range = field_text.get("price_range")
+        style = field_text.get("style")
+        premise_type = field_text.get("premise_type")
+        opening_value = opening_obj.get("aria-label").split(",") if opening_obj and opening_obj.get("aria-label") else []
         occupancy_obj = self._get_occupancy(external_driver=driver)
+        known_fingerprints = None
+        if self._incremental_reviews and self._writer:
+            # comentarios ya registrados en ejecuciones anteriores para el local comercial
+            known_fingerprints = self._writer.get_comment_fingerprints(
+                get_commercial_premise_hash(name_val, elements.get("address")))
         # se checkea si el local ya existe
         # is_registered = self._writer.is_registered({"name": self._place_name, "date": self._extraction_date,
         #                                             "address": address_obj})
-        comments_list = self._get_comments(self._place_name, self.sleep_m, external_driver=driver)
+        comments_list = self._get_comments(self._place_name, self.sleep_m, external_driver=driver,
+                                           known_fingerprints=known_fingerprints)
         # if is_registered:
         #     self.logger.warning("the place: -{name}- for date: -{date}- located in -{addr}-is already processed"
         #     .format(name=self._place_name, date=self._extraction_date, addr=address_obj))
@@ -390,6 +683,7 @@ class PlacesExtractor(AbstractGMapsExtractor):
             "extractor_url": self._url,
             "current_url": driver.current_url
         }
+        self._set_incremental_reviews(place_info, known_fingerprints)
         place_info.update(elements)
         self.logger.info("-{place}-: info retrieved for place".format(place=self._place_name))
         return place_info
@@ -409,18 +703,26 @@ class PlacesExtractor(AbstractGMapsExtractor):
         finally:
             return comment_formatted
 
-    def _get_comments(self, place_name=None, sleep_time=None, external_driver=None):
-        """Función que extrae los comentarios para el local comercial.
+    def _get_comments(self, place_name=None, sleep_time=None, external_driver=None, known_fingerprints=None,
+                      comments=None):
+        """Función que extrae los comentarios para el local comercial. En modo incremental (`known_fingerprints`) los
+        comentarios se ordenan de más reciente a más antiguo y la extracción se detiene en el primer comentario ya
+        registrado. Si se proporcionan comentarios ya extraídos (`comments`), se conservan y sólo se extraen los que
+        faltan hasta `_num_reviews`, descartando los que se vuelvan a renderizar.
 
         Arguments
         ---------
         place_name : str
             nombre del local comercial
         sleep_time : int
-            tiempo de espera para que el driver renderice los elementos de la web
+            tiempo máximo de espera para que el driver renderice nuevos comentarios
         external_driver : webdriver.Chrome
             driver que se usará para hacer la extracción de los comentarios en caso de ser provisto, en caso contrario
             se usará el asociado a la instancia de la clase
+        known_fingerprints : set
+            huellas de los comentarios ya registrados para el local comercial. None para extraer todos los comentarios
+        comments : list
+            comentarios ya extraídos del local comercial, por ejemplo de la respuesta de red. Opcional
 
         Returns
         -------
@@ -430,35 +732,122 @@ class PlacesExtractor(AbstractGMapsExtractor):
         # get all reviews button
         driver = external_driver if external_driver else self.get_driver()
         self.logger.info("-{place}-: trying to retrieve comments".format(place=place_name))
-        button_see_all_reviews = self.get_info_obj(self._see_all_reviews_button)
-        reviews_elements_list = driver.find_elements_by_class_name(self._review_css_class)
-        if len(reviews_elements_list) < self._num_reviews and button_see_all_reviews:
+        is_incremental = known_fingerprints is not None
+        initial_comments = list(comments) if comments else []
+        seen_fingerprints = {get_comment_fingerprint(comment.get("author"), comment.get("content"))
+                             for comment in initial_comments}
+        # el observer recolecta los comentarios a medida que se renderizan, de forma que en cada iteración sólo se leen
+        # los comentarios nuevos
+        collector = ReviewCollector(driver, self._review_css_class)
+        collector.install()
+        button_see_all_reviews = self.get_info_obj(self._see_all_reviews_button, external_driver=driver)
+        comments, _ = self._drain_comments(collector, list(initial_comments), known_fingerprints,
+                                           seen_fingerprints=seen_fingerprints)
+        # en modo incremental siempre se accede a la vista de comentarios porque la vista del local no los muestra
+        # ordenados por fecha
+        if (len(comments) < self._num_reviews or is_incremental) and button_see_all_reviews:
             self.logger.debug("-{place}-: all reviews button has been found".format(place=place_name))
             # change page to next comments and iterate
+            self.pace("reviews")
             driver.execute_script("arguments[0].click();", button_see_all_reviews)
-            driver.wait.until(ec.url_changes(driver.current_url))
-            self.force_sleep(sleep_time)
-            aux_reviews = driver.find_elements_by_class_name(self._review_css_class)
+            self.wait_until("reviews_open", ec.url_changes(driver.current_url), external_driver=driver)
+            # sólo se puede detener la extracción en el primer comentario conocido si están ordenados por fecha
+            stop_at_known = is_incremental and self._sort_reviews_by_newest(driver, sleep_time)
+            # se descartan los comentarios de la vista del local y se recolectan los de la vista de comentarios
+            collector.install()
+            comments = list(initial_comments)
+            self.wait_for(collector.has_pending, timeout=sleep_time, external_driver=driver)
             have_finished = False
             while not have_finished:
-                # iterates appending comments until it reaches the `self._num_reviews` or the found comments don't
-                # change between iterations
-                previous_iteration_found = len(aux_reviews)
-                last_review = aux_reviews[-1]
-                driver.execute_script("arguments[0].scrollIntoView(true);", last_review)
-                self.force_sleep(sleep_time)
-                aux_reviews = driver.find_elements_by_class_name(self._review_css_class)
-                have_finished = previous_iteration_found == len(aux_reviews) or len(aux_reviews) >= self._num_reviews
-            # At this point the last `self._num_reviews` reviews must be shown
+                # iterates appending comments until it reaches the `self._num_reviews`, a known comment or no new
+                # comments are rendered after scrolling to the last one
+                comments, found_known = self._drain_comments(collector, comments, known_fingerprints, stop_at_known,
+                                                             seen_fingerprints)
+                have_finished = found_known or len(comments) >= self._num_reviews
+                if not have_finished:
+                    # cada desplazamiento al último comentario solicita una nueva página de comentarios
+                    self.pace("reviews")
+                    have_finished = not collector.scroll_to_last()
+                if found_known:
+                    self.logger.info("-{place}-: known comment reached, stopping incremental extraction".format(
+                        place=place_name))
+                if not have_finished:
+                    # se espera a que se rendericen nuevos comentarios o a que la página deje de cargar sin añadir
+                    # ninguno
+                    self.wait_for(any_of(collector.has_pending,
+                                         all_of(spinner_stable((By.XPATH, self._loading_spinner_xpath)),
+                                                network_idle())),
+                                  timeout=sleep_time, external_driver=driver)
+                    have_finished = not collector.has_pending()
             self.logger.debug("-{place}-: retrieving comment bucle has finished".format(place=place_name))
 
-        # extract content of each element
-        reviews_elements_list = driver.find_elements_by_class_name(self._review_css_class)
-        comments = [self._get_formatted_comments(elem.text) for elem in reviews_elements_list]
         self.logger.info("-{place}-: found -{total_reviews}- comments.".format(total_reviews=len(comments),
                                                                                place=place_name))
         return comments
 
+    def _drain_comments(self, collector, comments, known_fingerprints=None, stop_at_known=False,
+                        seen_fingerprints=None):
+        """Lee los comentarios nuevos del recolector y los añade con formato a `comments`, descartando los que ya están
+        registrados o extraídos.
+
+        Arguments
+        ---------
+        collector : gmaps.places.reviews.ReviewCollector
+            recolector de comentarios instalado en la página
+        comments : list
+            comentarios ya extraídos
+        known_fingerprints : set
+            huellas de los comentarios ya registrados
+        stop_at_known : bool
+            si es True se deja de leer en el primer comentario ya registrado
+        seen_fingerprints : set
+            huellas de los comentarios ya extraídos, que se descartan sin detener la lectura
+
+        Returns
+        -------
+        tuple
+            lista de comentarios actualizada y True si se ha alcanzado un comentario ya registrado
+        """
+        # los comentarios descartados no cuentan para el límite, por lo que se sigue leyendo mientras queden pendientes
+        while len(comments) < self._num_reviews:
+            reviews = collector.drain(limit=self._num_reviews - len(comments))
+            if not reviews:
+                break
+            for review in reviews:
+                comment = self._get_formatted_comments(review.get("text"))
+                fingerprint = get_comment_fingerprint(comment.get("author"), comment.get("content"))
+                if seen_fingerprints and fingerprint in seen_fingerprints:
+                    continue
+                if known_fingerprints and fingerprint in known_fingerprints:
+                    if stop_at_known:
+                        return comments, True
+                    continue
+                comments.append(comment)
+        return comments, False
+
+    def _sort_reviews_by_newest(self, driver, sleep_time=None):
+        """Ordena los comentarios de la vista de comentarios de más reciente a más antiguo.
+
+        Returns
+        -------
+        bool
+            True si se han ordenado los comentarios, False en caso contrario
+        """
+        sort_button = self.wait_for(ec.element_to_be_clickable((By.XPATH, self._sort_reviews_button_xpath)),
+                                    timeout=sleep_time, external_driver=driver)
+        if sort_button:
+            self.pace("reviews")
+            driver.execute_script("arguments[0].click();", sort_button)
+            newest_option = self.wait_for(ec.element_to_be_clickable((By.XPATH, self._sort_newest_option_xpath)),
+                                          timeout=sleep_time, external_driver=driver)
+            if newest_option:
+                driver.execute_script("arguments[0].click();", newest_option)
+                self.wait_for(network_idle(), timeout=sleep_time, external_driver=driver)
+                return True
+        self.logger.warning("-{place}-: reviews could not be sorted by newest, all reviews will be checked".format(
+            place=self._place_name))
+        return False
+
     def _force_scrap(self, provided_driver=None):
         """Función auxiliar que contiene la lógica de realizar el scrapping en caso de que la url de de búsqueda nos
         redirija a una página de resultados en lugar de la página del local comercial.
@@ -485,23 +874,19 @@ class PlacesExtractor(AbstractGMapsExtractor):
             "extractor_url": self._url
         }
         try:
+            # si la página actual es de consentimiento o captcha no tiene sentido esperar a los resultados
+            self.check_landing(external_driver=driver)
             # self.force_sleep(self.sleep_xs)
             # búsqueda del local comercial en el listado de resultados: `self.shared_result_elements_xpath_query`
-            driver.wait.until(
-                ec.visibility_of_all_elements_located((By.XPATH, self.shared_result_elements_xpath_query)))
-            page_elements = driver.find_elements_by_xpath(self.shared_result_elements_xpath_query)
-            place_obj = self.found_place_in_list(page_elements)
-            # places_objs = {place.text.split("\n")[0]: place for place in page_elements}
-            # if self._place_name in places_objs.keys():
-            if place_obj:
+            self.wait_until("place_results", ec.visibility_of_all_elements_located(
+                (By.XPATH, self.shared_result_elements_xpath_query)), external_driver=driver)
+            place_index = self.found_place_in_list(driver)
+            if place_index is not None and self._click_result(driver, place_index):
                 # el nombre del local comercial se encuentra en los resultados y se procede a clickar sobre él y extraer
                 # la información una vez se haya cargado la página del local comercial
                 self.logger.info("-{place}-: found in search list due to ambiguous name nearby".format(
                     place=self._place_name))
-                # found_place = places_objs.get(self._place_name)
-                found_place = place_obj
-                driver.execute_script("arguments[0].click();", found_place)
-                driver.wait.until(ec.url_changes(self._url))
+                self.wait_until("place_click", ec.url_changes(self._url), external_driver=driver)
                 self.logger.debug("-{place}-: place clicked, current url: {url}".format(place=self._place_name,
                                                                                         url=driver.current_url))
                 # self.force_sleep(self.sleep_m)
@@ -519,22 +904,21 @@ class PlacesExtractor(AbstractGMapsExtractor):
                     coords=new_url_parts[-1]
                 )
                 self.logger.warning("-{place}-: will be forced to url: {url}".format(place=self._place_name, url=new_url))
+                self.pace("search")
                 driver.get(new_url)
+                self.check_landing(external_driver=driver)
                 try:
-                    driver.wait.until(
-                        ec.visibility_of_all_elements_located((By.XPATH, self.shared_result_elements_xpath_query)))
-                    page_elements = driver.find_elements_by_xpath(self.shared_result_elements_xpath_query)
-                    place_obj = self.found_place_in_list(page_elements)
-                    if place_obj:
+                    self.wait_until("place_results", ec.visibility_of_all_elements_located(
+                        (By.XPATH, self.shared_result_elements_xpath_query)), external_driver=driver)
+                    current_url = driver.current_url
+                    place_index = self.found_place_in_list(driver)
+                    if place_index is not None and self._click_result(driver, place_index):
                         # el nombre del local comercial se encuentra en los resultados y se procede a clickar sobre él y extraer
                         # la información una vez se haya cargado la página del local comercial
                         self.logger.debug("-{place}-: found in search list in -{url}-".format(
                             place=self._place_name, url=new_url))
-                        # found_place = places_objs.get(self._place_name)
-                        found_place = place_obj
-                        driver.execute_script("arguments[0].click();", found_place)
-                        driver.wait.until(ec.url_changes(driver.current_url))
-                        self.force_sleep(self.sleep_m)
+                        self.wait_until("place_click", ec.url_changes(current_url), external_driver=driver)
+                        self.wait_for(network_idle(), timeout=self.sleep_m, external_driver=driver)
                         place_info = self._get_place_info(provided_driver=driver)
                 except TimeoutException as te:
                     current_url = driver.current_url
@@ -543,6 +927,7 @@ class PlacesExtractor(AbstractGMapsExtractor):
                                             .format(place=self._place_name, url=new_url, c_url=current_url))
                         place_info = self._get_place_info(provided_driver=driver)
         except StaleElementReferenceException as sere:
+            get_metrics().incr("errors.stale_element")
             # se ha detectado un error tratando de acceder a algún elemento del DOM de la página y se vuelve a intentar
             # extraer la información sin volver a procesar ninguna URL. Llamada recursiva a _scrap
             self.logger.error(str(sere))
@@ -573,6 +958,9 @@ class PlacesExtractor(AbstractGMapsExtractor):
                 else:
                     self.logger.warning("-{place}-: aborting retrying to force scraping due to max retries reached".format(
                             place=self._place_name))
+        except BlockedPageException as bpe:
+            # la extracción se reintentará más tarde: `scrap` propaga el bloqueo con `raise_if_blocked`
+            self.logger.warning("-{place}-: {error}".format(place=self._place_name, error=str(bpe)))
         except Exception as e:
             # error no controlado durante la extracción de la información. Se sale de la ejecución sin forzar la
             # extracción de la información
@@ -607,7 +995,6 @@ class PlacesExtractor(AbstractGMapsExtractor):
         """
         logging.info("-{name}-: scrapping process for place with url -{url}- is starting".format(
             name=self._place_name, url=self._url))
-        driver = provided_driver if provided_driver else self.get_driver()
         init_time = time.time()
         place_info = None
         result_to_return = None
@@ -621,8 +1008,17 @@ class PlacesExtractor(AbstractGMapsExtractor):
                     name=self._place_name, date=self._extraction_date, address=self._place_address))
                 result_to_return = {"is_registered": True}
             else:
-                place_info = self._scrap(driver)
+                # el driver sólo se arranca si la descarga HTTP no está activada o no consigue los campos requeridos
+                place_info = self._scrap_http()
+                if not place_info:
+                    place_info = self._scrap(provided_driver if provided_driver else self.get_driver())
+                self.raise_if_blocked()
+                if place_info:
+                    # el modelo de coste de los códigos postales aprende de la duración de cada extracción
+                    place_info["extraction_seconds"] = time.time() - init_time
                 result_to_return = self.export_data(place_info)
+        except BlockedPageException:
+            raise
         except Exception as e:
             self.logger.error("-{name}-: error during reviews extraction: {error}".format(name=self._place_name,
                                                                                           error=str(e)))
@@ -658,13 +1054,17 @@ class PlacesExtractor(AbstractGMapsExtractor):
         """
         logging.info("-{name}-: recovery process for place with url -{url}- is starting".format(
             name=self._place_name, url=self._url))
-        driver = provided_driver if provided_driver else self.get_driver()
         init_time = time.time()
         result_to_return = None
         try:
-            place_info = self._scrap(driver)
+            place_info = self._scrap_http()
+            if not place_info:
+                place_info = self._scrap(provided_driver if provided_driver else self.get_driver())
+            self.raise_if_blocked()
             place_info["commercial_premise_id"] = place_id
             result_to_return = self.export_data(data=place_info, is_update=True)
+        except BlockedPageException:
+            raise
         except Exception as e:
             self.logger.error("-{name}-: error during recovery process: {error}".format(name=self._place_name,
                                                                                         error=str(e)))
@@ -681,10 +1081,16 @@ class PlacesExtractor(AbstractGMapsExtractor):
         place_info = None
         try:
             # empieza el proceso de extracción
+            self.pace("place")
+            init_time = time.time()
+            self._start_network_capture(driver)
             driver.get(self._url)
-            driver.wait.until(ec.url_changes(self._url))
+            self.wait_until("place_redirect", ec.url_changes(self._url), external_driver=driver)
+            self.check_landing(external_driver=driver)
+            page_ready_time = time.time() - init_time
             # self.force_sleep(self.sleep_m)
             place_info = self._get_place_info(provided_driver=driver)
+            self._record_page_stats(driver, page_ready_time)
         except TimeoutException as te:
             # en caso de un error de debido a la demora en la carga de la página web, se registra en los logs el error y
             # se vuelve a intentar la extracción llamando a la función  `_scrap`
@@ -696,6 +1102,7 @@ class PlacesExtractor(AbstractGMapsExtractor):
             self.logger.warning("-{place}-: forcing to look up information again".format(place=self._place_name))
             place_info = self._force_scrap(provided_driver=driver)
         except StaleElementReferenceException as sere:
+            get_metrics().incr("errors.stale_element")
             # en caso de un error de debido a inconsistencia en el DOM de la página web, se registra en los logs el
             # error y se vuelve a intentar la extracción llamando a la función  `_scrap`
             self.logger.warning(
@@ -704,29 +1111,109 @@ class PlacesExtractor(AbstractGMapsExtractor):
                     name=self._place_name,
                     url=self._url
                 ))
-            self.force_sleep(self.sleep_m)
+            self.wait_for(network_idle(), timeout=self.sleep_m, external_driver=driver)
             self.logger.warning("-{name}-: forcing to look up information again".format(name=self._place_name))
             place_info = self._force_scrap(provided_driver=driver)
         finally:
             return place_info
 
-    def found_place_in_list(self, page_elements):
+    def _record_page_stats(self, driver, page_ready_time):
+        """Registra en las métricas y en los logs el tiempo hasta que la página del local comercial estuvo lista y los
+        bytes transferidos por la página. Permite medir el efecto del perfil de bloqueo de recursos.
+
+        Arguments
+        ---------
+        driver : webdriver.Chrome
+            driver con la página del local comercial cargada
+        page_ready_time : float
+            segundos transcurridos desde la navegación hasta que la página del local comercial estuvo lista
+        """
+        stats = self.get_page_transfer_stats(external_driver=driver)
+        metrics = get_metrics()
+        metrics.observe("place.page_ready_seconds", page_ready_time)
+        if stats.get("transfer_bytes") is not None:
+            metrics.observe("place.transfer_bytes", stats.get("transfer_bytes"))
+            metrics.observe("place.resources", stats.get("resources", 0))
+        self.logger.info("-{place}-: page ready in -{elapsed:.2f}- seconds, -{bytes}- bytes transferred in -{resources}- "
+                         "resources".format(place=self._place_name, elapsed=page_ready_time,
+                                            bytes=stats.get("transfer_bytes"), resources=stats.get("resources")))
+
+    def _get_result_cards(self, driver):
+        """Obtiene en una única llamada al navegador el nombre y la dirección de todos los resultados del listado.
+
+        Returns
+        -------
+        list
+            lista de diccionarios con el índice, el nombre y la dirección de cada resultado
+        """
+        script = """
+            var cards = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            var text = function(xpath, card) {
+                var element = document.evaluate(xpath, card, null, XPathResult.FIRST_ORDERED_NODE_TYPE,
+                    null).singleNodeValue;
+                return element === null ? '' : (element.innerText || '');
+            };
+            var records = [];
+            for (var i = 0; i < cards.snapshotLength; i++) {
+                var card = cards.snapshotItem(i);
+                records.push({index: i, name: text(arguments[1], card), address: text(arguments[2], card)});
+            }
+            return records;
+        """
+        return driver.execute_script(script, self.shared_result_elements_xpath_query, self._result_name_xpath,
+                                     self._result_address_xpath) or []
+
+    def found_place_in_list(self, provided_driver=None):
+        """Busca el local comercial en el listado de resultados de la página actual. Los resultados se obtienen en una
+        única llamada al navegador y se indexan por nombre normalizado (sin tildes, mayúsculas ni espacios duplicados),
+        de forma que la búsqueda no requiere ninguna llamada adicional por resultado.
+
+        Arguments
+        ---------
+        provided_driver : webdriver.Chrome
+            driver sobre el que se buscará el local comercial. En caso de no estar definido se usará el de la instancia
+
+        Returns
+        -------
+        int
+            índice del local comercial en el listado de resultados
+        None
+            en caso de que el local comercial no se encuentre en el listado
+        """
+        driver = provided_driver if provided_driver else self.get_driver()
         self.logger.info("Looking for: -{name}- and -{address} in url: -{url}-".format(
             name=self._place_name, address=self._place_address, url=self._url))
-        for place in page_elements:
-            splitted = place.text.split("\n")
-            name = place.find_element_by_xpath("div[@class='section-result-text-content']//h3/span").text
-            address = place.find_element_by_xpath(
-                "div[@class='section-result-text-content']//span[contains(@class, 'section-result-location')]").text
-            if name == self._place_name and self._place_address in address:
-                self.logger.debug("Found: -{name}- and -{address}".format(name=self._place_name,
-                                                                          address=self._place_address))
-                self.logger.debug("In list has been found: -{name}- and -{address}".format(name=name, address=address))
-
-                self.logger.debug("-{place}-: found in search list due to ambiguous name nearby with {address}"
-                                  .format(address=address, place=self._place_name))
-                return place
+        cards_by_name = {}
+        for card in self._get_result_cards(driver):
+            cards_by_name.setdefault(normalize_text(card.get("name")), []).append(card)
+        address = normalize_text(self._place_address)
+        for card in cards_by_name.get(normalize_text(self._place_name), []):
+            if address in normalize_text(card.get("address")):
+                self.logger.debug("In list has been found: -{name}- and -{address}- at index -{index}-".format(
+                    name=card.get("name"), address=card.get("address"), index=card.get("index")))
+                return card.get("index")
 
         self.logger.warning("Not found: -{name}- and -{address}".format(
             name=self._place_name, address=self._place_address))
         return None
+
+    def _click_result(self, driver, index):
+        """Hace click sobre el resultado del listado que ocupa la posición `index`. El click navega a la página del
+        local comercial, por lo que se limita su ritmo igual que el acceso directo a la url del local.
+
+        Returns
+        -------
+        bool
+            True si el resultado existía y se ha hecho click sobre él, False en caso contrario
+        """
+        script = """
+            var cards = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            var card = cards.snapshotItem(arguments[1]);
+            if (card === null) {
+                return false;
+            }
+            card.click();
+            return true;
+        """
+        self.pace("place")
+        return bool(driver.execute_script(script, self.shared_result_elements_xpath_query, index))
@@ -0,0 +1,243 @@
+"""
+Decodificación de los datos de un local comercial a partir de las respuestas que descarga Google Maps
+(`/maps/preview/place`) o del estado inicial (`APP_INITIALIZATION_STATE`) incluido en el html. Las respuestas son
+listas json anidadas sin claves, por lo que los campos se localizan por su posición. Las posiciones están centralizadas
+en `PLACE_FIELDS_PATHS` y `REVIEW_FIELDS_PATHS` para poder ajustarlas si cambia el formato, y cualquier posición que no
+exista se devuelve como None en lugar de lanzar una excepción.
+
+Los valores se devuelven con el mismo formato que los extraídos del DOM para que los `writer` no cambien.
+"""
+import json
+import logging
+
+from gmaps.commons.commons import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# prefijo anti-xssi que Google antepone a las respuestas json
+_XSSI_PREFIX = ")]}'"
+
+# posición de los datos del local comercial dentro de la respuesta de `/maps/preview/place`
+PLACE_ROOT_PATH = [6]
+
+# posición, dentro del estado inicial de la página, de la respuesta del local comercial y de la de búsqueda
+STATE_PLACE_PATH = [3, 6]
+STATE_SEARCH_PATH = [3, 2]
+
+# posición de los resultados dentro de la respuesta de búsqueda y de los datos del local dentro de cada resultado
+SEARCH_RESULTS_PATH = [0, 1]
+SEARCH_RESULT_PLACE_PATH = [14]
+
+PLACE_FIELDS_PATHS = {
+    "name": [11],
+    "address": [39],
+    "score": [4, 7],
+    "total_scores": [4, 8],
+    "price_range": [4, 2],
+    "premise_type": [13, 0],
+    "telephone_number": [178, 0, 0],
+    "latitude": [9, 2],
+    "longitude": [9, 3],
+    "opening_hours": [34, 1],
+    "occupancy": [84, 0],
+    "reviews": [52, 0]
+}
+
+REVIEW_FIELDS_PATHS = {
+    "author": [0, 1],
+    "publish_date": [1],
+    "content": [3],
+    "reviews_by_author": [12, 1, 1]
+}
+
+# índice del día en la ocupación por horas de la respuesta (1 = lunes)
+_INDEX_TO_DAY = {1: "lunes", 2: "martes", 3: "miercoles", 4: "jueves", 5: "viernes", 6: "sabado", 7: "domingo"}
+
+# mismo formato que el atributo `aria-label` de las barras de ocupación, que es el que interpreta el writer
+_OCCUPANCY_TEMPLATE = "Nivel de ocupación: {percentage}\xa0% (hora: {hour})."
+
+
+def dig(obj, path):
+    """Devuelve el valor de `obj` en la posición `path` o None si alguna de las posiciones no existe.
+
+    Parameters
+    ----------
+    obj : list
+        lista json anidada
+    path : list
+        índices que se recorren sucesivamente
+
+    Returns
+    -------
+    object
+        valor encontrado o None
+    """
+    for index in path:
+        if not isinstance(obj, list) or not -len(obj) <= index < len(obj):
+            return None
+        obj = obj[index]
+    return obj
+
+
+def parse_payload(body):
+    """Convierte el cuerpo de una respuesta de Google Maps en una lista json, eliminando el prefijo anti-xssi.
+
+    Returns
+    -------
+    list
+        contenido de la respuesta o None si no es un json válido
+    """
+    if not body or not isinstance(body, str):
+        return None
+    body = body.strip()
+    if body.startswith(_XSSI_PREFIX):
+        body = body[len(_XSSI_PREFIX):]
+    try:
+        return json.loads(body)
+    except ValueError:
+        logger.warning("payload is not valid json, it will be ignored")
+        return None
+
+
+def _format_number(value, decimal_separator=","):
+    if value is None:
+        return None
+    return str(value).replace(".", decimal_separator)
+
+
+def _decode_opening_hours(days):
+    if not isinstance(days, list):
+        return []
+    opening_hours = []
+    for day in days:
+        hours = dig(day, [1])
+        if dig(day, [0]) and isinstance(hours, list):
+            opening_hours.append("{day} {hours}".format(day=dig(day, [0]), hours=" y ".join(map(str, hours))))
+    return opening_hours
+
+
+def _decode_occupancy(days):
+    if not isinstance(days, list):
+        return {}
+    occupancy = {}
+    for day in days:
+        day_name = _INDEX_TO_DAY.get(dig(day, [0]))
+        hours = dig(day, [1])
+        if not day_name or not isinstance(hours, list):
+            continue
+        occupancy[day_name] = [_OCCUPANCY_TEMPLATE.format(hour=dig(hour, [0]), percentage=dig(hour, [1]))
+                               for hour in hours if dig(hour, [0]) is not None and dig(hour, [1]) is not None]
+    return occupancy
+
+
+def decode_review(review):
+    """Decodifica un comentario con el mismo formato que `PlacesExtractor._get_formatted_comments`.
+
+    Returns
+    -------
+    dict
+        comentario con las claves `raw_content`, `author`, `reviews_by_author`, `publish_date` y `content`
+    """
+    comment = {key: dig(review, path) for key, path in REVIEW_FIELDS_PATHS.items()}
+    comment = {key: str(value) if value is not None else "" for key, value in comment.items()}
+    comment["raw_content"] = "\n".join([comment.get("author"), comment.get("reviews_by_author"),
+                                        comment.get("publish_date"), comment.get("content")])
+    return comment
+
+
+def decode_place(payload, root_path=None):
+    """Decodifica la información del local comercial de la respuesta de `/maps/preview/place`.
+
+    Parameters
+    ----------
+    payload : list
+        respuesta ya convertida con `parse_payload`
+    root_path : list
+        posición de los datos del local dentro de `payload`. Por defecto `PLACE_ROOT_PATH`
+
+    Returns
+    -------
+    dict
+        información del local comercial con el mismo formato que la extraída del DOM o None si la respuesta no
+        contiene los datos de un local comercial
+    """
+    place = dig(payload, PLACE_ROOT_PATH if root_path is None else root_path)
+    if not isinstance(place, list):
+        return None
+    fields = {key: dig(place, path) for key, path in PLACE_FIELDS_PATHS.items()}
+    if not fields.get("name"):
+        return None
+    latitude = fields.get("latitude")
+    longitude = fields.get("longitude")
+    reviews = fields.get("reviews") if isinstance(fields.get("reviews"), list) else []
+    return {
+        "name": fields.get("name"),
+        "address": fields.get("address"),
+        "score": _format_number(fields.get("score")),
+        "total_scores": str(fields.get("total_scores")) if fields.get("total_scores") is not None else None,
+        "price_range": fields.get("price_range"),
+        "premise_type": fields.get("premise_type"),
+        "telephone_number": fields.get("telephone_number"),
+        "coordinates": "{lat}, {long}".format(lat=latitude, long=longitude) if latitude and longitude else None,
+        "opening_hours": _decode_opening_hours(fields.get("opening_hours")),
+        "occupancy": _decode_occupancy(fields.get("occupancy")),
+        "comments": [decode_review(review) for review in reviews]
+    }
+
+
+def decode_search_results(payload):
+    """Decodifica los locales comerciales de una respuesta de búsqueda.
+
+    Parameters
+    ----------
+    payload : list
+        respuesta de búsqueda ya convertida con `parse_payload`
+
+    Returns
+    -------
+    list
+        información de cada local comercial encontrado con el formato de `decode_place`
+    """
+    results = dig(payload, SEARCH_RESULTS_PATH)
+    if not isinstance(results, list):
+        return []
+    places = [decode_place(result, SEARCH_RESULT_PLACE_PATH) for result in results]
+    return [place for place in places if place]
+
+
+def decode_search_results_from_state(state):
+    """Decodifica los locales comerciales de la búsqueda incluida en el estado inicial de la página.
+
+    Returns
+    -------
+    list
+        información de cada local comercial encontrado con el formato de `decode_place`
+    """
+    return decode_search_results(parse_payload(dig(state, STATE_SEARCH_PATH)))
+
+
+def decode_place_from_state(state, place_name=None):
+    """Decodifica la información del local comercial del estado inicial de la página. Si la página es un listado de
+    resultados en lugar de la página del local, se devuelve el resultado con el mismo nombre o el único resultado.
+
+    Parameters
+    ----------
+    state : list
+        estado inicial de la página (`APP_INITIALIZATION_STATE`)
+    place_name : str
+        nombre del local comercial que se busca
+
+    Returns
+    -------
+    dict
+        información del local comercial con el formato de `decode_place` o None si no se encuentra
+    """
+    place = decode_place(parse_payload(dig(state, STATE_PLACE_PATH)))
+    if place:
+        return place
+    places = decode_search_results_from_state(state)
+    if len(places) == 1:
+        return places[0]
+    name = normalize_text(place_name)
+    matches = [place for place in places if normalize_text(place.get("name")) == name]
+    return matches[0] if len(matches) == 1 else None
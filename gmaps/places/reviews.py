@@ -0,0 +1,152 @@
+"""
+Recolección incremental de los comentarios de un local comercial. Un `MutationObserver` instalado en la página guarda en
+un buffer los comentarios que se van renderizando, de forma que en cada iteración del scroll sólo se leen los
+comentarios nuevos en lugar de volver a consultar todos los comentarios de la página.
+"""
+import logging
+
+# instala (o reinicia) el observer. Los nodos se guardan en `window.__gmapsReviews.pending` hasta que se leen desde
+# python y se recuerdan en un WeakSet para no devolver dos veces el mismo comentario
+_INSTALL_SCRIPT = """
+    var reviewClass = arguments[0];
+    var state = window.__gmapsReviews;
+    if (state && state.observer) {
+        state.observer.disconnect();
+    }
+    state = window.__gmapsReviews = {seen: new WeakSet(), pending: [], last: null, total: 0};
+    var collect = function(node) {
+        if (node.nodeType !== Node.ELEMENT_NODE) {
+            return;
+        }
+        var found = node.classList.contains(reviewClass) ? [node] : [];
+        found = found.concat(Array.prototype.slice.call(node.getElementsByClassName(reviewClass)));
+        found.forEach(function(review) {
+            if (!state.seen.has(review)) {
+                state.seen.add(review);
+                state.pending.push(review);
+            }
+        });
+    };
+    state.observer = new MutationObserver(function(mutations) {
+        mutations.forEach(function(mutation) {
+            mutation.addedNodes.forEach(collect);
+        });
+    });
+    collect(document.body);
+    state.observer.observe(document.body, {childList: true, subtree: true});
+    return state.pending.length;
+"""
+
+# devuelve los comentarios pendientes de leer y vacía el buffer. El texto se lee en este momento y no al detectar el
+# nodo para que el comentario esté completamente renderizado
+_DRAIN_SCRIPT = """
+    var state = window.__gmapsReviews;
+    if (!state) {
+        return null;
+    }
+    var limit = arguments[0];
+    var nodes = state.pending.splice(0, limit === null ? state.pending.length : limit);
+    return nodes.filter(function(node) {
+        return node.isConnected;
+    }).map(function(node) {
+        state.last = node;
+        state.total += 1;
+        return {index: state.total - 1, text: node.innerText || ''};
+    });
+"""
+
+_PENDING_SCRIPT = """
+    var state = window.__gmapsReviews;
+    return state ? state.pending.length : -1;
+"""
+
+_SCROLL_SCRIPT = """
+    var state = window.__gmapsReviews;
+    if (!state || !state.last || !state.last.isConnected) {
+        return false;
+    }
+    state.last.scrollIntoView(true);
+    return true;
+"""
+
+
+class ReviewCollector:
+    """Recolector incremental de comentarios sobre un driver. Se instala con `install` y en cada iteración se leen con
+    `drain` únicamente los comentarios renderizados desde la lectura anterior.
+
+    ...
+    Attributes
+    ----------
+    logger : logging.Logger
+        logger de la clase
+    driver : webdriver.Chrome
+        driver sobre el que se recolectan los comentarios
+    review_css_class : str
+        clase css de los elementos de comentario
+    total : int
+        número de comentarios leídos desde la última instalación
+
+    Methods
+    -------
+    install()
+        instala el observer en la página, descartando los comentarios recolectados previamente
+    drain(limit=None)
+        devuelve los comentarios renderizados desde la lectura anterior
+    scroll_to_last()
+        hace scroll hasta el último comentario leído para forzar la carga de más comentarios
+    """
+
+    def __init__(self, driver, review_css_class):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.driver = driver
+        self.review_css_class = review_css_class
+        self.total = 0
+
+    def install(self):
+        """Instala el observer en la página actual. Los comentarios que ya estén renderizados quedan pendientes de
+        leer.
+
+        Returns
+        -------
+        int
+            número de comentarios ya renderizados en la página
+        """
+        self.total = 0
+        return self.driver.execute_script(_INSTALL_SCRIPT, self.review_css_class)
+
+    def drain(self, limit=None):
+        """Devuelve los comentarios renderizados desde la lectura anterior. Si la página ha navegado y el observer se
+        ha perdido, se vuelve a instalar.
+
+        Parameters
+        ----------
+        limit : int
+            número máximo de comentarios que se leen. Los restantes quedan pendientes para la siguiente lectura
+
+        Returns
+        -------
+        list
+            lista de diccionarios con el índice y el texto de cada comentario nuevo
+        """
+        records = self.driver.execute_script(_DRAIN_SCRIPT, limit)
+        if records is None:
+            self.logger.debug("review observer is not installed in current page, installing it")
+            self.install()
+            records = self.driver.execute_script(_DRAIN_SCRIPT, limit) or []
+        self.total += len(records)
+        return records
+
+    def has_pending(self, driver=None):
+        """Condición de espera que se cumple cuando hay comentarios nuevos pendientes de leer o el observer se ha
+        perdido por una navegación."""
+        return (driver if driver else self.driver).execute_script(_PENDING_SCRIPT) != 0
+
+    def scroll_to_last(self):
+        """Hace scroll hasta el último comentario leído para que la página cargue los siguientes.
+
+        Returns
+        -------
+        bool
+            True si se ha hecho scroll, False si no hay ningún comentario leído en la página
+        """
+        return bool(self.driver.execute_script(_SCROLL_SCRIPT))
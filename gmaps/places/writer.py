@@ -3,12 +3,39 @@ import json
 import logging
 import os
 
-import psycopg2
 from psycopg2._psycopg import IntegrityError
 
+from gmaps.commons.commons import normalize_text
+from gmaps.commons.db.connection_pool import get_connection_pool
 from gmaps.commons.writer.writer import DbWriter, FileWriter
 
 
+def get_commercial_premise_hash(name=None, address=None):
+    """Función que calcula el identificador `hash_commercial_premise` de un local comercial a partir de su nombre y su
+    dirección.
+
+    Returns
+    -------
+    str
+        hash sha256 del nombre y la dirección o None si falta alguno de los dos
+    """
+    return hashlib.sha256((name + address).encode()).hexdigest() if address and name else None
+
+
+def get_comment_fingerprint(author=None, content=None):
+    """Función que calcula la huella de un comentario a partir de su autor y su contenido normalizados, de forma que el
+    mismo comentario extraído en distintas ejecuciones tenga la misma huella aunque cambie su fecha relativa de
+    publicación (`hace 2 días`, `hace una semana`...).
+
+    Returns
+    -------
+    str
+        hash sha256 del autor y el contenido del comentario
+    """
+    fingerprint = "{author}\n{content}".format(author=normalize_text(author), content=normalize_text(content))
+    return hashlib.sha256(fingerprint.encode()).hexdigest()
+
+
 class PlaceDbWriter(DbWriter):
     """Clase que implementa gmaps.commons.writer.writer.DbWriter con la lógica para registrar la información de los
     locales comerciales en la base de datos que se haya establecido como soporte de salida en la configuración de la
@@ -25,26 +52,34 @@ class PlaceDbWriter(DbWriter):
     logger : logging.Logger
         logger de la clase
     db
-        referencia a la conexión a la base de datos
+        referencia a la conexión a la base de datos, prestada por el pool de conexiones del proceso
+    _pool_config : dict
+        configuración del pool de conexiones (`pool` en la configuración de la base de datos)
     _commercial_premise_query : str
         query para hacer las insercciónes en la tabla `commercial_premise`
     _commercial_premise_comments_query : str
         query para hacer las insercciónes en la tabla `commercial_premise_comments`
     _commercial_premise_occupation_query : str
         query para hacer las insercciónes en la tabla `commercial_premise_occupation`
+    _commercial_premise_extraction_time_query : str
+        query para hacer las insercciónes en la tabla `commercial_premise_extraction_time`
     _find_place_query : str
         query para comprobar si en la base de datos ya existe el local comerical
+    _find_comments_query : str
+        query para obtener los comentarios ya registrados de un local comercial
 
     Methods
     -------
     auto_boot()
-        función encargada de abrir la conexión a la base de datos
+        función encargada de tomar prestada una conexión del pool de conexiones del proceso
     finish()
-        función encargada de cerrar la conexión a la base de datos
+        función encargada de devolver la conexión al pool de conexiones del proceso
     decompose_occupancy_data(occupancy_levels)
         función auxiliar para la construcción del objeto de ocupación por horas para registrarlo en la base de datos
     is_registered(name, date)
         ejecuta la query para comprobar si el local comercial ha sido registrado para la fecha pasada por argumento
+    get_comment_fingerprints(hash_commercial_premise)
+        obtiene las huellas de los comentarios ya registrados para el local comercial
     write(element)
         escribe la información de element en la base de datos, en las distintas tablas
     """
@@ -62,6 +97,7 @@ class PlaceDbWriter(DbWriter):
         self.db_name = config.get("database")
         self.logger = logging.getLogger(self.__class__.__name__)
         self.db = None
+        self._pool_config = config.get("pool")
         self._commercial_premise_query = """
                     INSERT INTO commercial_premise 
                         (name, 
@@ -125,9 +161,17 @@ class PlaceDbWriter(DbWriter):
                     )
                     VALUES (%s, %s, %s, %s, %s, %s)
                 """
+        self._commercial_premise_extraction_time_query = """
+                    INSERT INTO commercial_premise_extraction_time
+                    (commercial_premise_id, seconds, date, hash_commercial_premise)
+                    VALUES (%s, %s, %s, %s)
+                """
         self._find_place_query = """
         SELECT id FROM commercial_premise WHERE name = %s and date = %s and address like %s
         """
+        self._find_comments_query = """
+        SELECT author, content FROM commercial_premise_comments WHERE hash_commercial_premise = %s
+        """
 
         self._delete_place_query = """
             DELETE FROM commercial_premise WHERE id = %s
@@ -135,17 +179,18 @@ class PlaceDbWriter(DbWriter):
         self.auto_boot()
 
     def auto_boot(self):
-        """Función encargada de abrir la conexión a la base de datos."""
-        self.db = psycopg2.connect(
-            host=self.host,
-            user=self.db_user,
-            password=self.db_pass,
-            database=self.db_name
-        )
+        """Función encargada de tomar prestada una conexión del pool de conexiones del proceso. Si la instancia ya
+        tiene una conexión, no hace nada."""
+        if self.db is None:
+            self.db = get_connection_pool(self.host, self.db_name, self.db_user, self.db_pass,
+                                          self._pool_config).acquire()
 
     def finish(self):
-        """Función encargada de cerrar la conexión a la base de datos."""
-        self.db.close()
+        """Función encargada de devolver la conexión a la base de datos al pool de conexiones del proceso."""
+        if self.db is not None:
+            get_connection_pool(self.host, self.db_name, self.db_user, self.db_pass, self._pool_config).release(
+                self.db)
+            self.db = None
 
     def decompose_occupancy_data(self, occupancy_levels):
         """Función auxiliar para la construcción del objeto de ocupación por horas para registrarlo en la base de datos.
@@ -195,8 +240,40 @@ class PlaceDbWriter(DbWriter):
             cursor.close()
             return is_registered
 
+    def get_comment_fingerprints(self, hash_commercial_premise):
+        """Obtiene las huellas de los comentarios ya registrados para el local comercial en cualquier fecha de
+        extracción.
+
+        Arguments
+        ---------
+        hash_commercial_premise : str
+            identificador del local comercial calculado con `get_commercial_premise_hash`
+
+        Returns
+        -------
+        set
+            huellas de los comentarios registrados, calculadas con `get_comment_fingerprint`
+        """
+        fingerprints = set()
+        if not hash_commercial_premise:
+            return fingerprints
+        cursor = self.db.cursor()
+        try:
+            cursor.execute(self._find_comments_query, (hash_commercial_premise,))
+            fingerprints = {get_comment_fingerprint(author, content) for author, content in cursor.fetchall()}
+        except Exception as e:
+            self.db.rollback()
+            self.logger.error("error retrieving comments for commercial premise -{hash}-".format(
+                hash=hash_commercial_premise))
+            self.logger.error(str(e))
+        finally:
+            cursor.close()
+        return fingerprints
+
     def write(self, element, is_update=False):
-        """Escribe la información de element en la base de datos, en las distintas tablas.
+        """Escribe la información de element en la base de datos, en las distintas tablas. Si el elemento se ha
+        extraído en modo incremental (`incremental_reviews`), sólo se registran los comentarios que no estén ya
+        registrados para el local comercial.
 
         Arguments
         ---------
@@ -231,7 +308,7 @@ class PlaceDbWriter(DbWriter):
         total_score = int(element.get("total_scores").replace(",", "").replace(".", "")) if element.get("total_scores") else None
         execution_places_types = element.get("execution_places_types", None)
         commercial_premise_gmaps_url = element.get("current_url", element.get("extractor_url"))
-        address_hash = hashlib.sha256((name+address).encode()).hexdigest() if address and name else None
+        address_hash = get_commercial_premise_hash(name, address)
         updatable_id = element.get("commercial_premise_id") if is_update else None
         gps_coords = commercial_premise_gmaps_url.split("!3d")[-1].split("!4d") if "/place/" in commercial_premise_gmaps_url else None
         lat = str(gps_coords[0]).replace(".", ",") if gps_coords is not None else None
@@ -291,6 +368,16 @@ class PlaceDbWriter(DbWriter):
                             place=name))
                 # Store comments
                 # (commercial_premise_id, author, publish_date, reviews_by_author, content, raw_content, date)
+                comments = element.get("comments", [])
+                if element.get("incremental_reviews"):
+                    # el extractor ya ha consultado las huellas de los comentarios registrados para el local comercial
+                    known_fingerprints = element.get("known_comment_fingerprints")
+                    known_fingerprints = set(known_fingerprints) if known_fingerprints is not None else \
+                        self.get_comment_fingerprints(address_hash)
+                    comments = [comment for comment in comments if get_comment_fingerprint(
+                        comment.get("author"), comment.get("content")) not in known_fingerprints]
+                    self.logger.info("-{place}-: -{new}- new comments out of -{total}- extracted".format(
+                        place=name, new=len(comments), total=len(element.get("comments", []))))
                 values = [(element_id[0],
                            comment.get("author", ""),
                            comment.get("publish_date", ""),
@@ -298,7 +385,7 @@ class PlaceDbWriter(DbWriter):
                            comment.get("content", ""),
                            comment.get("raw_content", ""),
                            date,
-                           address_hash) for comment in element.get("comments", [])]
+                           address_hash) for comment in comments]
                 self.logger.info("-{place}-: storing commercial premise comments in database".format(place=name))
                 try:
                     cursor.executemany(self._commercial_premise_comments_query, values)
@@ -326,6 +413,16 @@ class PlaceDbWriter(DbWriter):
                         self.logger.error(str(e))
                         self.logger.error("-{place}-: wrong values:".format(place=name))
                         self.logger.error(values)
+                # Store extraction time: lo usa el modelo de coste de los códigos postales
+                if element.get("extraction_seconds") is not None:
+                    values = (element_id[0], element.get("extraction_seconds"), date, address_hash)
+                    try:
+                        cursor.execute(self._commercial_premise_extraction_time_query, values)
+                        self.db.commit()
+                    except Exception as e:
+                        self.db.rollback()
+                        self.logger.error("-{place}-: error during storing extraction time".format(place=name))
+                        self.logger.error(str(e))
                 inserted = True
         except Exception as e:
             self.db.rollback()
@@ -0,0 +1,162 @@
+"""
+Circuit breaker de toda la ejecución frente a los bloqueos de Google. Cuando la proporción de tareas recientes que
+terminan en una página de consentimiento o de captcha supera un umbral, el planificador deja de despachar tareas durante
+un tiempo de espera que crece exponencialmente mientras los bloqueos continúan, en lugar de que cada proceso siga
+navegando y agravando el bloqueo.
+"""
+import collections
+import logging
+import time
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Circuit breaker con tres estados:
+
+    - `closed`: las tareas se despachan con normalidad y se registra si cada una ha sido bloqueada. Si, con al menos
+      `min_samples` tareas en la ventana, la proporción de bloqueos alcanza `threshold`, pasa a `open`.
+    - `open`: no se despacha ninguna tarea durante `backoff` segundos. Pasado ese tiempo, pasa a `half_open`.
+    - `half_open`: se despacha una única tarea de prueba. Si no es bloqueada, pasa a `closed` y la espera vuelve a su
+      valor inicial; si lo es, vuelve a `open` con la espera multiplicada por `backoff_factor`, hasta `max_backoff`.
+
+    Los finales de las tareas despachadas antes de abrirse el circuito no cambian el estado mientras está abierto.
+
+    ...
+    Attributes
+    ----------
+    logger : logging.Logger
+        logger de la clase
+    threshold : float
+        proporción de tareas bloqueadas a partir de la cual se abre el circuito
+    min_samples : int
+        número mínimo de tareas en la ventana para poder abrir el circuito
+    backoff : float
+        segundos de espera inicial con el circuito abierto
+    max_backoff : float
+        segundos de espera máxima con el circuito abierto
+    backoff_factor : float
+        factor por el que se multiplica la espera cada vez que la tarea de prueba es bloqueada
+    state : str
+        estado del circuito: `closed`, `open` o `half_open`
+    _window : collections.deque
+        indica, por cada una de las últimas tareas, si ha sido bloqueada
+    _current_backoff : float
+        segundos de espera de la apertura actual del circuito
+    _open_until : float
+        instante hasta el que el circuito permanece abierto
+    _probe_time : float
+        instante en que se despachó la tarea de prueba. None si no se ha despachado
+
+    Methods
+    -------
+    from_config(config)
+        construye el circuit breaker a partir de la configuración `scheduler.breaker` de la ejecución
+    record(is_blocked, is_probe=False)
+        registra el final de una tarea
+    allow()
+        indica si se puede despachar una tarea
+    get_wait()
+        devuelve los segundos que quedan hasta que se pueda despachar una tarea
+    """
+
+    def __init__(self, threshold=0.5, window=20, min_samples=5, backoff=60, max_backoff=1800, backoff_factor=2):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.threshold = threshold
+        self.min_samples = max(int(min_samples), 1)
+        self.backoff = backoff
+        self.max_backoff = max(max_backoff, backoff)
+        self.backoff_factor = backoff_factor
+        self.state = STATE_CLOSED
+        self._window = collections.deque(maxlen=max(int(window), self.min_samples))
+        self._current_backoff = backoff
+        self._open_until = None
+        self._probe_time = None
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Construye el circuit breaker a partir de la configuración.
+
+        Parameters
+        ----------
+        config : dict
+            diccionario con la clave `enabled` y las claves opcionales `threshold`, `window`, `min_samples`,
+            `backoff`, `max_backoff` y `backoff_factor`
+
+        Returns
+        -------
+        CircuitBreaker
+            circuit breaker configurado o None si no está activado
+        """
+        if not config or not config.get("enabled"):
+            return None
+        keys = ["threshold", "window", "min_samples", "backoff", "max_backoff", "backoff_factor"]
+        return cls(**{key: config.get(key) for key in keys if config.get(key) is not None})
+
+    def get_block_rate(self):
+        """Devuelve la proporción de tareas recientes bloqueadas."""
+        return sum(self._window) / len(self._window) if self._window else 0
+
+    def record(self, is_blocked, is_probe=False):
+        """Registra el final de una tarea.
+
+        Parameters
+        ----------
+        is_blocked : bool
+            True si la tarea ha terminado en una página de bloqueo
+        is_probe : bool
+            True si la tarea es la tarea de prueba despachada con el circuito medio abierto
+        """
+        if self.state == STATE_CLOSED:
+            self._window.append(bool(is_blocked))
+            if len(self._window) >= self.min_samples and self.get_block_rate() >= self.threshold:
+                self._open()
+        elif self.state == STATE_HALF_OPEN and is_probe:
+            if is_blocked:
+                self._current_backoff = min(self._current_backoff * self.backoff_factor, self.max_backoff)
+                self._open()
+            else:
+                self.state = STATE_CLOSED
+                self._current_backoff = self.backoff
+                self._probe_time = None
+                self.logger.info("probe task has not been blocked, circuit closed and dispatch resumed")
+
+    def allow(self):
+        """Indica si se puede despachar una tarea. Con el circuito medio abierto sólo se permite la tarea de prueba; si
+        esta no termina en el tiempo de espera actual, se permite otra.
+
+        Returns
+        -------
+        bool
+            True si se puede despachar una tarea
+        """
+        now = time.time()
+        if self.state == STATE_OPEN and now >= self._open_until:
+            self.state = STATE_HALF_OPEN
+            self._probe_time = None
+            self.logger.info("circuit half open, dispatching a probe task")
+        if self.state == STATE_HALF_OPEN and (self._probe_time is None or
+                                              now - self._probe_time > self._current_backoff):
+            self._probe_time = now
+            return True
+        return self.state == STATE_CLOSED
+
+    def get_wait(self):
+        """Devuelve los segundos que quedan hasta que el circuito deje de estar abierto."""
+        if self.state == STATE_OPEN:
+            return max(self._open_until - time.time(), 0)
+        if self.state == STATE_HALF_OPEN and self._probe_time is not None:
+            return max(self._probe_time + self._current_backoff - time.time(), 0)
+        return 0
+
+    def _open(self):
+        self.logger.warning("-{rate:.0%}- of recent tasks blocked, circuit opened: dispatch paused for -{backoff}- "
+                            "seconds".format(rate=self.get_block_rate() if self._window else 1,
+                                             backoff=int(self._current_backoff)))
+        self.state = STATE_OPEN
+        self._open_until = time.time() + self._current_backoff
+        self._probe_time = None
+        # los resultados de la ventana corresponden al periodo anterior a la apertura
+        self._window.clear()
@@ -0,0 +1,160 @@
+"""
+Control adaptativo del número de navegadores en ejecución simultánea (AIMD: incremento aditivo, reducción
+multiplicativa) a partir de las señales de saturación que registran las tareas (esperas agotadas, elementos obsoletos y
+redirecciones a páginas de consentimiento o captcha) y del número de locales extraídos por minuto.
+"""
+import collections
+import logging
+import math
+import time
+
+
+class ConcurrencyController:
+    """Ajusta periódicamente el límite de `slots` activos. Si la proporción de tareas recientes con alguna señal de
+    saturación supera `max_error_rate`, el límite se multiplica por `decrease_factor`. En caso contrario, si todos los
+    `slots` permitidos están ocupados, el límite crece en `increase_step` mientras el número de tareas correctas por
+    minuto no empeore; si empeora tras un incremento, el incremento se deshace.
+
+    ...
+    Attributes
+    ----------
+    logger : logging.Logger
+        logger de la clase
+    min_slots : int
+        límite mínimo de `slots` activos
+    max_slots : int
+        límite máximo de `slots` activos
+    limit : int
+        límite actual de `slots` activos
+    increase_step : int
+        incremento del límite cuando no hay saturación
+    decrease_factor : float
+        factor por el que se multiplica el límite cuando hay saturación
+    max_error_rate : float
+        proporción máxima de tareas recientes con señales de saturación
+    adjust_every : float
+        segundos entre dos ajustes del límite
+    signals : list
+        nombres de los contadores de métricas que se consideran señales de saturación
+    target_kind : str
+        tipo de tarea cuyas finalizaciones correctas por minuto se quieren maximizar
+    _window : collections.deque
+        indica, por cada una de las últimas tareas, si registró alguna señal de saturación
+    _successes : int
+        tareas de tipo `target_kind` terminadas correctamente desde el último ajuste
+    _last_throughput : float
+        tareas correctas por minuto en el intervalo anterior
+    _last_change : int
+        último cambio aplicado al límite
+
+    Methods
+    -------
+    from_config(max_slots, config)
+        construye el controlador a partir de la configuración `scheduler.concurrency` de la ejecución
+    record(kind, is_success, signals)
+        registra el final de una tarea
+    adjust(is_saturated)
+        recalcula el límite si ha pasado el intervalo de ajuste
+    """
+
+    def __init__(self, max_slots, min_slots=1, initial_slots=None, increase_step=1, decrease_factor=0.5,
+                 max_error_rate=0.2, adjust_every=60, window=50, signals=None, target_kind="place"):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.max_slots = max(int(max_slots), 1)
+        self.min_slots = min(max(int(min_slots), 1), self.max_slots)
+        self.limit = min(max(int(initial_slots if initial_slots else self.max_slots), self.min_slots), self.max_slots)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.max_error_rate = max_error_rate
+        self.adjust_every = adjust_every
+        self.signals = signals if signals else ["wait.timeouts", "errors.stale_element", "blocks.redirect"]
+        self.target_kind = target_kind
+        self._window = collections.deque(maxlen=window)
+        self._successes = 0
+        self._last_throughput = None
+        self._last_change = 0
+        self._last_adjust_time = time.time()
+
+    @classmethod
+    def from_config(cls, max_slots, config=None):
+        """Construye el controlador a partir de la configuración.
+
+        Parameters
+        ----------
+        max_slots : int
+            límite máximo de `slots` activos
+        config : dict
+            diccionario con la clave `enabled` y las claves opcionales `min_slots`, `initial_slots`, `increase_step`,
+            `decrease_factor`, `max_error_rate`, `adjust_every`, `window`, `signals` y `target_kind`
+
+        Returns
+        -------
+        ConcurrencyController
+            controlador configurado o None si no está activado
+        """
+        if not config or not config.get("enabled"):
+            return None
+        keys = ["min_slots", "initial_slots", "increase_step", "decrease_factor", "max_error_rate", "adjust_every",
+                "window", "signals", "target_kind"]
+        return cls(max_slots, **{key: config.get(key) for key in keys if config.get(key) is not None})
+
+    def record(self, kind, is_success, signals=None):
+        """Registra el final de una tarea.
+
+        Parameters
+        ----------
+        kind : str
+            tipo de la tarea
+        is_success : bool
+            True si la tarea ha terminado correctamente
+        signals : dict
+            incremento de los contadores de métricas durante la tarea
+        """
+        signals = signals if signals else {}
+        self._window.append(any(signals.get(signal) for signal in self.signals))
+        if is_success and kind == self.target_kind:
+            self._successes += 1
+
+    def get_error_rate(self):
+        """Devuelve la proporción de tareas recientes con alguna señal de saturación."""
+        return sum(self._window) / len(self._window) if self._window else 0
+
+    def adjust(self, is_saturated=True):
+        """Recalcula el límite de `slots` activos si ha pasado el intervalo de ajuste.
+
+        Parameters
+        ----------
+        is_saturated : bool
+            True si todos los `slots` permitidos están ocupados. Si no lo están, no tiene sentido incrementar el
+            límite
+
+        Returns
+        -------
+        int
+            límite de `slots` activos
+        """
+        now = time.time()
+        elapsed = now - self._last_adjust_time
+        if elapsed < self.adjust_every:
+            return self.limit
+        throughput = self._successes * 60 / elapsed
+        error_rate = self.get_error_rate()
+        previous_limit = self.limit
+        if error_rate > self.max_error_rate:
+            self.limit = max(int(math.floor(self.limit * self.decrease_factor)), self.min_slots)
+            # las señales de la ventana corresponden al límite anterior
+            self._window.clear()
+        elif self._last_change > 0 and self._last_throughput is not None and throughput < self._last_throughput:
+            self.limit = max(self.limit - self._last_change, self.min_slots)
+        elif is_saturated:
+            self.limit = min(self.limit + self.increase_step, self.max_slots)
+        self._last_change = self.limit - previous_limit
+        self._last_throughput = throughput
+        self._successes = 0
+        self._last_adjust_time = now
+        if self.limit != previous_limit:
+            self.logger.info("active slots changed from -{previous}- to -{limit}- (error rate: {error_rate:.2f}, "
+                             "{throughput:.1f} {kind} tasks/min)".format(previous=previous_limit, limit=self.limit,
+                                                                         error_rate=error_rate, throughput=throughput,
+                                                                         kind=self.target_kind))
+        return self.limit
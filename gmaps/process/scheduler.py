@@ -0,0 +1,818 @@
+"""
+Planificador de tareas con un único presupuesto global de concurrencia, medido en navegadores (`slots`). Todas las
+tareas (búsqueda de locales por código postal y extracción de locales) se encolan en una misma cola con prioridad y se
+reparten entre los procesos de un único pool, de forma que nunca hay más tareas en ejecución que `slots`.
+
+Las tareas pueden generar nuevas tareas mientras se ejecutan (`emit`), por ejemplo la búsqueda de un código postal
+publica los locales de cada página de resultados en cuanto la extrae, de forma que su extracción empieza sin esperar a
+que termine la paginación.
+
+Los resultados se consumen en orden de finalización (`iter_completed`) y los argumentos de entrada se leen bajo demanda
+(`feed`), por lo que ni los argumentos ni los resultados de toda la ejecución tienen que estar en memoria y una tarea
+lenta no retrasa el resto.
+
+Cada tipo de tarea puede tener un plazo (`deadlines`). Si una tarea lo supera, se cancela y se vuelve a encolar hasta
+`max_attempts` intentos. El propio proceso que la ejecuta finaliza los navegadores que ha registrado la tarea
+(`track_driver`) para desbloquearla, siempre que siga siendo su tarea en ejecución, de forma que no se finalizan los
+navegadores de la siguiente tarea de su bloque ni los drivers ociosos de su pool. Si el proceso sigue bloqueado tras
+`kill_grace` segundos, se finaliza el propio proceso y el pool lo sustituye por uno nuevo.
+
+Al final de la ejecución, cuando ya no quedan tareas pendientes, las tareas que llevan en ejecución mucho más que la
+mediana de su tipo (`hedge_factor`) se lanzan por duplicado en los `slots` libres. El primer intento que termina gana y
+el resto se cancela, de forma que la duración de la ejecución no depende de unas pocas páginas lentas. Las escrituras
+duplicadas no son un problema porque los `writer` comprueban si el local ya está registrado.
+
+El número de `slots` es el máximo de navegadores; si se configura `concurrency`, el número de `slots` activos se ajusta
+durante la ejecución (ver `gmaps.process.concurrency.ConcurrencyController`) a partir de las métricas que registra cada
+tarea.
+
+Las tareas que terminan en una página de consentimiento o de captcha (`BlockedPageException`) no se dan por fallidas:
+se vuelven a encolar sin consumir intentos, hasta `max_block_retries` veces, y si se configura `breaker` el despacho de
+tareas se detiene mientras la proporción de tareas bloqueadas sea alta (ver `gmaps.process.breaker.CircuitBreaker`).
+"""
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import statistics
+import threading
+import time
+from multiprocessing.pool import Pool
+
+from gmaps.commons.driver.proc import get_driver_pid, kill_process_tree
+from gmaps.commons.extractor.landing import BlockedPageException
+from gmaps.commons.metrics.metrics import get_metrics
+from gmaps.process.breaker import STATE_HALF_OPEN, CircuitBreaker
+from gmaps.process.concurrency import ConcurrencyController
+
+# cola de eventos hacia el planificador, tareas canceladas por el planificador y tarea en ejecución en el proceso del
+# pool junto con los pids de los chromedriver que ha registrado. Se inicializan en cada proceso del pool con
+# `_init_worker`
+_events = None
+_cancelled = None
+_current_task_id = None
+_task_driver_pids = []
+_task_lock = threading.Lock()
+
+# segundos entre cada comprobación de las tareas canceladas en los procesos del pool
+_WATCH_INTERVAL = 0.5
+
+
+def _init_worker(events, cancelled=None, initializer=None, initargs=()):
+    global _events, _cancelled
+    _events = events
+    _cancelled = cancelled
+    if cancelled is not None:
+        threading.Thread(target=_watch_cancellations, name="scheduler-watchdog", daemon=True).start()
+    if initializer:
+        initializer(*initargs)
+
+
+def _is_cancelled(task_id):
+    """Indica si el planificador ha cancelado la tarea `task_id`."""
+    return _cancelled is not None and task_id in _cancelled[:]
+
+
+def _watch_cancellations():
+    """Comprueba periódicamente, en un thread de cada proceso del pool, si el planificador ha cancelado la tarea en
+    ejecución y, en ese caso, finaliza los navegadores que ha registrado para desbloquearla. La comprobación y la
+    finalización se hacen con el lock de la tarea en ejecución, por lo que nunca se finalizan los navegadores de otra
+    tarea."""
+    while True:
+        time.sleep(_WATCH_INTERVAL)
+        with _task_lock:
+            if _current_task_id is None or not _task_driver_pids or not _is_cancelled(_current_task_id):
+                continue
+            task_id = _current_task_id
+            killed = [pid for driver_pid in _task_driver_pids for pid in kill_process_tree(driver_pid)]
+            _task_driver_pids.clear()
+        logging.getLogger(WorkScheduler.__name__).warning(
+            "task -{task_id}- has been cancelled, -{killed}- browser processes have been killed".format(
+                task_id=task_id, killed=len(killed)))
+
+
+def _set_current_task(task_id):
+    global _current_task_id
+    with _task_lock:
+        _current_task_id = task_id
+        _task_driver_pids.clear()
+
+
+def _run_chunk(handler, tasks):
+    """Ejecuta, una tras otra, las tareas de un bloque en un proceso del pool y notifica el final de cada una a través
+    de la cola de eventos, la misma por la que se publican las tareas generadas, de forma que el planificador siempre
+    recibe las tareas generadas antes que el final de la tarea que las genera. Antes del final de cada tarea se envía
+    el incremento de los contadores de métricas del proceso durante la tarea. Las tareas canceladas antes de empezar no
+    se ejecutan."""
+    metrics = get_metrics()
+    for task_id, arguments in tasks:
+        _set_current_task(task_id)
+        _events.put(("start", task_id, os.getpid()))
+        counters = metrics.snapshot().get("counters")
+        try:
+            if _is_cancelled(task_id):
+                raise RuntimeError("task cancelled before start")
+            event = ("done", task_id, handler(arguments))
+        except BlockedPageException as bpe:
+            event = ("blocked", task_id, str(bpe))
+        except Exception as e:
+            event = ("failed", task_id, str(e))
+        finally:
+            _set_current_task(None)
+        signals = {name: value - counters.get(name, 0) for name, value in metrics.snapshot().get("counters").items()
+                   if value != counters.get(name, 0)}
+        if signals:
+            _events.put(("signals", task_id, signals))
+        _events.put(event)
+
+
+def emit(arguments):
+    """Publica en el planificador una tarea generada por la tarea en ejecución en este proceso. El tipo de la nueva
+    tarea es el configurado en `spawns` para el tipo de la tarea en ejecución.
+
+    Parameters
+    ----------
+    arguments : dict
+        argumentos de la función de la nueva tarea
+
+    Returns
+    -------
+    bool
+        True si se ha publicado la tarea. False si no se está ejecutando dentro del planificador
+    """
+    if _events is None or _current_task_id is None:
+        return False
+    _events.put(("spawn", _current_task_id, arguments))
+    return True
+
+
+def track_driver(driver):
+    """Registra el driver usado por la tarea en ejecución en este proceso, para que sus navegadores se puedan finalizar
+    si el planificador cancela la tarea. Sólo se finalizan los navegadores registrados por la tarea cancelada.
+
+    Parameters
+    ----------
+    driver : webdriver.Chrome
+        driver que usa la tarea en ejecución
+
+    Returns
+    -------
+    bool
+        True si se ha registrado el driver. False si no se está ejecutando dentro del planificador
+    """
+    driver_pid = get_driver_pid(driver)
+    if _current_task_id is None or driver_pid is None:
+        return False
+    with _task_lock:
+        if driver_pid not in _task_driver_pids:
+            _task_driver_pids.append(driver_pid)
+    return True
+
+
+class Task:
+    """Tarea del planificador.
+
+    ...
+    Attributes
+    ----------
+    task_id : int
+        identificador de la tarea, único dentro del planificador
+    kind : str
+        tipo de tarea. Determina la función que la ejecuta y su prioridad
+    arguments : dict
+        argumentos con los que se llama a la función de la tarea
+    priority : int
+        prioridad de la tarea. Las tareas con menor valor se ejecutan antes
+    attempt : int
+        número de intento de la tarea, empezando por 1
+    origin_id : int
+        identificador de la tarea original de la que la tarea es un reintento
+    pid : int
+        pid del proceso del pool que ejecuta la tarea. None si todavía no ha empezado
+    start_time : float
+        instante en que la tarea ha empezado a ejecutarse
+    cancel_time : float
+        instante en que la tarea ha sido cancelada por superar su plazo. None si no ha sido cancelada
+    kill_time : float
+        instante en que se ha solicitado finalizar los navegadores de la tarea cancelada, una vez que ha empezado a
+        ejecutarse. None si todavía no se ha solicitado
+    signals : dict
+        incremento de los contadores de métricas del proceso durante la tarea
+    blocks : int
+        número de veces que la tarea ha terminado en una página de bloqueo y se ha vuelto a encolar
+    is_probe : bool
+        True si la tarea se ha despachado como prueba con el circuit breaker medio abierto
+    """
+
+    def __init__(self, task_id, kind, arguments, priority=0, attempt=1, origin_id=None, blocks=0):
+        self.task_id = task_id
+        self.kind = kind
+        self.arguments = arguments
+        self.priority = priority
+        self.attempt = attempt
+        self.origin_id = task_id if origin_id is None else origin_id
+        self.pid = None
+        self.start_time = None
+        self.cancel_time = None
+        self.kill_time = None
+        self.signals = {}
+        self.blocks = blocks
+        self.is_probe = False
+
+    def __lt__(self, other):
+        return (self.priority, self.task_id) < (other.priority, other.task_id)
+
+
+class WorkScheduler:
+    """Planificador de tareas sobre un único pool de procesos. Las tareas se despachan desde el proceso principal según
+    su prioridad, y sólo cuando hay algún `slot` libre, por lo que la carga de la máquina se mantiene en exactamente
+    `slots` navegadores. Las tareas de tipo incluido en `spawns` generan nuevas tareas con `emit` mientras se ejecutan,
+    que se encolan en la misma cola (por ejemplo, la búsqueda de un código postal genera las tareas de extracción de
+    sus locales página a página).
+
+    Cada `slot` ejecuta bloques de hasta `chunk_size` tareas del mismo tipo, para reducir el coste de comunicación con
+    el pool cuando las tareas son muy cortas.
+
+    ...
+    Attributes
+    ----------
+    logger : logging.Logger
+        logger de la clase
+    slots : int
+        número máximo de bloques de tareas en ejecución simultánea
+    handlers : dict
+        función que ejecuta cada tipo de tarea. Debe poder serializarse (función de nivel de módulo)
+    priorities : dict
+        prioridad de cada tipo de tarea
+    spawns : dict
+        tipo de las tareas que genera cada tipo de tarea
+    chunk_size : int
+        número máximo de tareas que se envían juntas a un proceso del pool
+    progress_every : float
+        cada cuántos segundos se informa del progreso de la ejecución
+    deadlines : dict
+        tiempo máximo en segundos de ejecución de cada tipo de tarea. Sin plazo si no está configurado
+    max_attempts : int
+        número máximo de intentos de una tarea que supera su plazo
+    kill_grace : float
+        segundos que se espera a que una tarea cancelada termine antes de finalizar el proceso que la ejecuta
+    hedge_factor : float
+        veces la mediana de duración de su tipo a partir de las cuales una tarea se lanza por duplicado cuando ya no
+        quedan tareas pendientes. None para no duplicar tareas
+    hedge_min_samples : int
+        número de tareas terminadas de un tipo necesarias para calcular la mediana de duración
+    hedge_kinds : list
+        tipos de tarea que se pueden duplicar. Por defecto todos
+    initializer : callable
+        función que se ejecuta al arrancar cada proceso del pool
+    initargs : tuple
+        argumentos de `initializer`
+    max_block_retries : int
+        número máximo de veces que se vuelve a encolar una tarea que termina en una página de bloqueo
+    _controller : gmaps.process.concurrency.ConcurrencyController
+        controlador del número de `slots` activos. None para usar siempre todos los `slots`
+    _breaker : gmaps.process.breaker.CircuitBreaker
+        circuit breaker que detiene el despacho de tareas mientras Google bloquea las peticiones. None para no
+        detenerlo
+    _queue : list
+        montículo de tareas pendientes
+    _sources : list
+        iteradores de argumentos de tareas pendientes de leer
+    _running : dict
+        tareas en ejecución por identificador
+    _chunks : dict
+        identificadores de las tareas sin terminar de cada bloque en ejecución
+    _task_chunk : dict
+        bloque al que pertenece cada tarea en ejecución
+    _stats : dict
+        tareas conocidas, terminadas, fallidas, canceladas por plazo, duplicadas y bloqueadas por tipo de tarea
+    _emitted : dict
+        huellas de las tareas generadas por cada tarea original en ejecución, para no duplicarlas en los reintentos
+    _killed_workers : int
+        número de procesos del pool finalizados por seguir bloqueados tras cancelar su tarea
+    _durations : dict
+        duración de las últimas tareas terminadas correctamente por tipo de tarea
+    _hedged : set
+        tareas originales que ya se han lanzado por duplicado
+    _events : multiprocessing.Queue
+        eventos de las tareas (tareas generadas, finalizadas y fallidas) pendientes de procesar
+    _cancelled : multiprocessing.Array
+        identificadores de las últimas tareas canceladas, que consultan los procesos del pool para finalizar los
+        navegadores de su tarea en ejecución
+    _cancelled_count : int
+        número de tareas canceladas. Determina la posición de `_cancelled` en la que se registra la siguiente
+    _ids : itertools.count
+        generador de identificadores de tarea
+
+    Methods
+    -------
+    from_config(handlers, slots, config, priorities=None, spawns=None, initializer=None, initargs=())
+        construye el planificador a partir de la configuración `scheduler` de la ejecución
+    submit(kind, arguments)
+        encola una tarea
+    feed(kind, iterable, total=None)
+        encola bajo demanda una tarea por cada argumento de `iterable`
+    iter_completed()
+        ejecuta las tareas y devuelve el resultado de cada una en cuanto termina
+    run()
+        ejecuta todas las tareas encoladas y las que estas generen
+    """
+
+    def __init__(self, slots, handlers, priorities=None, spawns=None, chunk_size=1, progress_every=60, deadlines=None,
+                 max_attempts=2, kill_grace=30, hedge_factor=None, hedge_min_samples=20, hedge_kinds=None,
+                 concurrency=None, breaker=None, max_block_retries=5, initializer=None, initargs=()):
+        """Constructor de la clase
+
+        Parameters
+        ----------
+        slots : int
+            número máximo de bloques de tareas en ejecución simultánea
+        handlers : dict
+            función que ejecuta cada tipo de tarea
+        priorities : dict
+            prioridad de cada tipo de tarea. Las tareas con menor valor se ejecutan antes
+        spawns : dict
+            tipo de las tareas que genera cada tipo de tarea
+        chunk_size : int
+            número máximo de tareas que se envían juntas a un proceso del pool
+        progress_every : float
+            cada cuántos segundos se informa del progreso de la ejecución
+        deadlines : dict
+            tiempo máximo en segundos de ejecución de cada tipo de tarea
+        max_attempts : int
+            número máximo de intentos de una tarea que supera su plazo
+        kill_grace : float
+            segundos que se espera a que una tarea cancelada termine antes de finalizar el proceso que la ejecuta
+        hedge_factor : float
+            veces la mediana de duración a partir de las cuales una tarea se lanza por duplicado al final de la
+            ejecución. None para no duplicar tareas
+        hedge_min_samples : int
+            número de tareas terminadas de un tipo necesarias para calcular la mediana de duración
+        hedge_kinds : list
+            tipos de tarea que se pueden duplicar. Por defecto todos
+        concurrency : dict
+            configuración del control adaptativo del número de `slots` activos
+        breaker : dict
+            configuración del circuit breaker frente a los bloqueos de Google
+        max_block_retries : int
+            número máximo de veces que se vuelve a encolar una tarea que termina en una página de bloqueo
+        initializer : callable
+            función que se ejecuta al arrancar cada proceso del pool, por ejemplo para compartir recursos creados en el
+            proceso principal
+        initargs : tuple
+            argumentos de `initializer`
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.slots = max(int(slots), 1)
+        self.handlers = handlers
+        self.priorities = priorities if priorities else {}
+        self.spawns = spawns if spawns else {}
+        self.chunk_size = max(int(chunk_size), 1)
+        self.progress_every = progress_every
+        self.deadlines = deadlines if deadlines else {}
+        self.max_attempts = max(int(max_attempts), 1)
+        self.kill_grace = kill_grace
+        self.hedge_factor = hedge_factor
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_kinds = hedge_kinds if hedge_kinds else list(handlers)
+        self.initializer = initializer
+        self.initargs = initargs
+        self.max_block_retries = max(int(max_block_retries), 0)
+        self._controller = ConcurrencyController.from_config(self.slots, concurrency)
+        self._breaker = CircuitBreaker.from_config(breaker)
+        self._queue = []
+        self._sources = []
+        self._running = {}
+        self._chunks = {}
+        self._task_chunk = {}
+        self._stats = {kind: {"known": 0, "completed": 0, "failed": 0, "timeouts": 0, "hedged": 0,
+                              "blocked": 0}
+                       for kind in handlers}
+        self._emitted = {}
+        self._killed_workers = 0
+        self._durations = {kind: [] for kind in handlers}
+        self._hedged = set()
+        self._events = multiprocessing.Queue()
+        # una tarea cancelada deja de consultarse cuando termina, por lo que basta con recordar tantas como pueden estar
+        # en ejecución a la vez
+        self._cancelled = multiprocessing.Array("q", [-1] * (2 * self.slots * self.chunk_size))
+        self._cancelled_count = 0
+        self._ids = itertools.count()
+        self._chunk_ids = itertools.count()
+        self._init_time = None
+        self._last_report_time = None
+
+    @classmethod
+    def from_config(cls, handlers, slots, config=None, priorities=None, spawns=None, initializer=None, initargs=()):
+        """Construye el planificador a partir de la configuración.
+
+        Parameters
+        ----------
+        handlers : dict
+            función que ejecuta cada tipo de tarea
+        slots : int
+            número máximo de bloques de tareas en ejecución simultánea
+        config : dict
+            diccionario con las claves opcionales `chunk_size`, `progress_every`, `deadlines`, `max_attempts`,
+            `kill_grace`, `hedge_factor`, `hedge_min_samples`, `hedge_kinds`, `concurrency`, `breaker` y
+            `max_block_retries`
+        priorities : dict
+            prioridad de cada tipo de tarea
+        spawns : dict
+            tipo de las tareas que genera cada tipo de tarea
+        initializer : callable
+            función que se ejecuta al arrancar cada proceso del pool
+        initargs : tuple
+            argumentos de `initializer`
+
+        Returns
+        -------
+        WorkScheduler
+            planificador configurado
+        """
+        config = config if config else {}
+        keys = ["chunk_size", "progress_every", "deadlines", "max_attempts", "kill_grace", "hedge_factor",
+                "hedge_min_samples", "hedge_kinds", "concurrency", "breaker", "max_block_retries"]
+        return cls(slots, handlers, priorities=priorities, spawns=spawns, initializer=initializer, initargs=initargs,
+                   **{key: config.get(key) for key in keys if config.get(key) is not None})
+
+    def submit(self, kind, arguments):
+        """Encola una tarea.
+
+        Parameters
+        ----------
+        kind : str
+            tipo de tarea
+        arguments : dict
+            argumentos de la función de la tarea
+
+        Returns
+        -------
+        Task
+            tarea encolada
+        """
+        self._stats[kind]["known"] += 1
+        return self._push(kind, arguments)
+
+    def feed(self, kind, iterable, total=None):
+        """Encola una tarea por cada argumento de `iterable`. Los argumentos se leen bajo demanda, a medida que hay
+        sitio en la cola, en lugar de todos a la vez.
+
+        Parameters
+        ----------
+        kind : str
+            tipo de tarea
+        iterable : iterable
+            argumentos de la función de cada tarea
+        total : int
+            número de tareas, para informar del progreso. Por defecto la longitud de `iterable` si la tiene
+        """
+        if total is None and hasattr(iterable, "__len__"):
+            total = len(iterable)
+        self._sources.append((kind, iter(iterable), total is None))
+        self._stats[kind]["known"] += total if total else 0
+
+    def iter_completed(self):
+        """Ejecuta las tareas encoladas y las que se generen a partir de ellas, hasta que no quede ninguna pendiente ni
+        en ejecución, y devuelve el resultado de cada tarea en cuanto termina, sin esperar al resto.
+
+        Yields
+        ------
+        tuple
+            tipo de la tarea, True si ha terminado correctamente y su resultado, o el error si ha fallado
+        """
+        self._init_time = self._last_report_time = time.time()
+        # con plazos, duplicados o control del despacho configurados, la espera de eventos se interrumpe
+        # periódicamente para revisarlos
+        is_supervised = self.deadlines or self.hedge_factor or self._controller or self._breaker
+        poll_timeout = min([self.progress_every, self.kill_grace, 5]) if is_supervised else self.progress_every
+        with Pool(processes=self.slots, initializer=_init_worker,
+                  initargs=(self._events, self._cancelled, self.initializer, self.initargs)) as pool:
+            while self._queue or self._running or self._sources:
+                self._dispatch(pool)
+                if not self._running:
+                    if self._queue and self._breaker:
+                        # el circuit breaker ha detenido el despacho de tareas
+                        time.sleep(max(min(self._breaker.get_wait(), poll_timeout), 0.1))
+                    continue
+                try:
+                    event, task_id, value = self._events.get(timeout=poll_timeout)
+                except queue.Empty:
+                    event, task_id, value = None, None, None
+                task = self._running.get(task_id)
+                if event == "start" and task:
+                    task.pid = value
+                    task.start_time = time.time()
+                    if task.cancel_time is not None:
+                        # la tarea se canceló antes de que empezase: se finalizan sus navegadores ahora
+                        self._request_kill(task)
+                elif event == "spawn" and task and task.cancel_time is None:
+                    self._spawn(task, value)
+                elif event == "signals" and task:
+                    task.signals = value
+                elif event in ["done", "failed"] and task:
+                    self._finish(task)
+                    if task.cancel_time is None:
+                        if self._breaker:
+                            self._breaker.record(False, task.is_probe)
+                        completed = self._resolve(task, event == "done", value)
+                        if completed:
+                            yield completed
+                elif event == "blocked" and task:
+                    self._finish(task)
+                    if task.cancel_time is None:
+                        completed = self._block(task, value)
+                        if completed:
+                            yield completed
+                for completed in self._supervise():
+                    yield completed
+                self._hedge()
+                if self._controller:
+                    self._controller.adjust(is_saturated=len(self._chunks) >= self._controller.limit and
+                                            bool(self._queue or self._sources))
+                self._report_progress()
+            if self._killed_workers:
+                # el pool no puede cerrarse de forma ordenada si alguna tarea se ha perdido al finalizar su proceso, por
+                # lo que se finalizan los navegadores que queden y después el pool
+                for worker in multiprocessing.active_children():
+                    kill_process_tree(worker.pid, include_root=False)
+                pool.terminate()
+            else:
+                # se cierra el pool de forma ordenada para que cada proceso finalice los drivers de su pool
+                pool.close()
+                pool.join()
+        self._report_progress(force=True)
+
+    def run(self):
+        """Ejecuta todas las tareas encoladas y las que se generen a partir de ellas y devuelve todos los resultados.
+
+        Returns
+        -------
+        dict
+            resultados por tipo de tarea. Las tareas que fallan no tienen resultado
+        """
+        results = {kind: [] for kind in self.handlers}
+        for kind, is_success, result in self.iter_completed():
+            if is_success:
+                results[kind].append(result)
+        return results
+
+    def _push(self, kind, arguments, attempt=1, origin_id=None, blocks=0):
+        task = Task(next(self._ids), kind, arguments, self.priorities.get(kind, 0), attempt, origin_id, blocks)
+        heapq.heappush(self._queue, task)
+        return task
+
+    def _spawn(self, task, arguments):
+        """Encola una tarea generada por `task`, salvo que ya la hubiese generado un intento anterior de la misma
+        tarea."""
+        spawned_kind = self.spawns.get(task.kind)
+        if not spawned_kind:
+            self.logger.warning("-{kind}- tasks can not generate new tasks".format(kind=task.kind))
+            return
+        fingerprint = hashlib.sha1(json.dumps(arguments, sort_keys=True, default=str).encode("utf-8")).digest()
+        emitted = self._emitted.setdefault(task.origin_id, set())
+        if fingerprint in emitted:
+            return
+        emitted.add(fingerprint)
+        self.submit(spawned_kind, arguments)
+
+    def _get_live_siblings(self, task):
+        """Devuelve los intentos en ejecución y no cancelados de la misma tarea original que `task`."""
+        return [running for running in self._running.values() if running.origin_id == task.origin_id
+                and running.task_id != task.task_id and running.cancel_time is None]
+
+    def _resolve(self, task, is_success, value):
+        """Resuelve el final de un intento. Si ha terminado correctamente, gana a los intentos duplicados que siguen en
+        ejecución, que se cancelan. Si ha fallado y queda algún duplicado en ejecución, se espera a este.
+
+        Returns
+        -------
+        tuple
+            resultado definitivo con el formato de `iter_completed` o None si todavía no es definitivo
+        """
+        siblings = self._get_live_siblings(task)
+        if not is_success and siblings:
+            self.logger.warning("-{kind}- task -{task_id}- failed, waiting for its duplicate: {error}".format(
+                kind=task.kind, task_id=task.task_id, error=str(value)))
+            return None
+        if task.origin_id in self._hedged:
+            # el duplicado puede no haber salido todavía de la cola
+            self._queue = [queued for queued in self._queue if queued.origin_id != task.origin_id]
+            heapq.heapify(self._queue)
+        now = time.time()
+        for sibling in siblings:
+            sibling.cancel_time = now
+            self._request_kill(sibling)
+            self.logger.info("-{kind}- task -{task_id}- has been completed first by its duplicate -{winner}-".format(
+                kind=sibling.kind, task_id=sibling.task_id, winner=task.task_id))
+        if is_success and task.start_time is not None:
+            self._durations[task.kind] = (self._durations[task.kind] + [now - task.start_time])[-200:]
+        return self._complete(task, is_success, value)
+
+    def _block(self, task, value):
+        """Resuelve un intento que ha terminado en una página de bloqueo. El bloqueo no es un fallo de la tarea, por lo
+        que se vuelve a encolar sin consumir intentos (se despachará cuando el circuit breaker lo permita), salvo que
+        ya se haya bloqueado `max_block_retries` veces o quede un duplicado en ejecución.
+
+        Returns
+        -------
+        tuple
+            resultado definitivo con el formato de `iter_completed` o None si la tarea se ha vuelto a encolar
+        """
+        self._stats[task.kind]["blocked"] += 1
+        if self._breaker:
+            self._breaker.record(True, task.is_probe)
+        if self._get_live_siblings(task):
+            return None
+        if task.blocks >= self.max_block_retries:
+            return self._complete(task, False, "{error} after -{blocks}- retries".format(error=value,
+                                                                                         blocks=task.blocks))
+        if self._controller:
+            self._controller.record(task.kind, False, task.signals)
+        self._push(task.kind, task.arguments, attempt=task.attempt, origin_id=task.origin_id, blocks=task.blocks + 1)
+        self.logger.warning("-{kind}- task -{task_id}- has been blocked, requeued: {error}".format(
+            kind=task.kind, task_id=task.task_id, error=value))
+        return None
+
+    def _hedge(self):
+        """Lanza por duplicado, en los `slots` libres una vez que ya no quedan tareas pendientes, las tareas que llevan
+        en ejecución más de `hedge_factor` veces la mediana de duración de su tipo, empezando por las más lentas."""
+        free_slots = self._get_limit() - len(self._chunks)
+        if not self.hedge_factor or self._queue or self._sources or free_slots <= 0:
+            return
+        now = time.time()
+        stragglers = []
+        for task in self._running.values():
+            durations = self._durations.get(task.kind)
+            if task.kind not in self.hedge_kinds or task.origin_id in self._hedged or task.start_time is None or \
+                    task.cancel_time is not None or len(durations) < self.hedge_min_samples:
+                continue
+            elapsed = now - task.start_time
+            if elapsed > self.hedge_factor * statistics.median(durations):
+                stragglers.append((elapsed, task))
+        for elapsed, task in sorted(stragglers, key=lambda straggler: -straggler[0])[:free_slots]:
+            self._hedged.add(task.origin_id)
+            self._stats[task.kind]["hedged"] += 1
+            self._push(task.kind, task.arguments, attempt=task.attempt, origin_id=task.origin_id)
+            self.logger.info("-{kind}- task -{task_id}- has been running for -{elapsed}- seconds, launching a "
+                             "duplicate".format(kind=task.kind, task_id=task.task_id, elapsed=int(elapsed)))
+
+    def _complete(self, task, is_success, value):
+        """Registra el resultado definitivo de una tarea.
+
+        Returns
+        -------
+        tuple
+            tipo de la tarea, True si ha terminado correctamente y su resultado o el error si ha fallado
+        """
+        self._emitted.pop(task.origin_id, None)
+        self._hedged.discard(task.origin_id)
+        self._stats[task.kind]["completed" if is_success else "failed"] += 1
+        if self._controller:
+            self._controller.record(task.kind, is_success, task.signals)
+        if not is_success:
+            self.logger.error("-{kind}- task -{task_id}- failed: {error}".format(
+                kind=task.kind, task_id=task.task_id, error=str(value)))
+        return task.kind, is_success, value
+
+    def _supervise(self):
+        """Cancela las tareas en ejecución que han superado su plazo y finaliza los procesos que siguen bloqueados tras
+        cancelar su tarea.
+
+        Returns
+        -------
+        list
+            resultados definitivos, con el formato de `iter_completed`, de las tareas canceladas que han agotado sus
+            intentos
+        """
+        completed = []
+        now = time.time()
+        for task in list(self._running.values()):
+            if task.start_time is None or task.task_id not in self._running:
+                continue
+            deadline = self.deadlines.get(task.kind)
+            if task.cancel_time is None and deadline and now - task.start_time > deadline:
+                completed += self._cancel(task, now)
+            elif task.kill_time is not None and now - task.kill_time > self.kill_grace:
+                self._kill_worker(task)
+        return completed
+
+    def _cancel(self, task, now):
+        """Cancela una tarea que ha superado su plazo: solicita al proceso que la ejecuta que finalice sus navegadores
+        para desbloquearla y vuelve a encolar la tarea si le quedan intentos. La tarea sigue ocupando su `slot` hasta
+        que el proceso termine con ella."""
+        task.cancel_time = now
+        self._stats[task.kind]["timeouts"] += 1
+        # una tarea bloqueada es también una señal de saturación
+        task.signals["wait.timeouts"] = task.signals.get("wait.timeouts", 0) + 1
+        self._request_kill(task)
+        self.logger.warning("-{kind}- task -{task_id}- exceeded its deadline in attempt -{attempt}-, killing its "
+                            "browsers".format(kind=task.kind, task_id=task.task_id, attempt=task.attempt))
+        if self._get_live_siblings(task) or task.attempt < self.max_attempts:
+            if self._controller:
+                self._controller.record(task.kind, False, task.signals)
+            if not self._get_live_siblings(task):
+                self._push(task.kind, task.arguments, attempt=task.attempt + 1, origin_id=task.origin_id,
+                           blocks=task.blocks)
+            # si queda un duplicado de la tarea en ejecución, este pasa a ser el único intento
+            return []
+        return [self._complete(task, False, "deadline exceeded after -{attempts}- attempts".format(
+            attempts=task.attempt))]
+
+    def _request_kill(self, task):
+        """Registra la tarea como cancelada para que el proceso del pool que la ejecuta finalice los navegadores que
+        ha registrado, si sigue siendo su tarea en ejecución. Si la tarea todavía no ha empezado, no se ejecutará; en
+        caso de que su inicio ya estuviese en camino, la solicitud se repite al recibirlo. El plazo de `kill_grace`
+        antes de finalizar el proceso sólo empieza a contar cuando se conoce el proceso que ejecuta la tarea."""
+        with self._cancelled.get_lock():
+            self._cancelled[self._cancelled_count % len(self._cancelled)] = task.task_id
+        self._cancelled_count += 1
+        if task.pid is not None:
+            task.kill_time = time.time()
+
+    def _kill_worker(self, task):
+        """Finaliza el proceso del pool que sigue bloqueado tras cancelar su tarea. El pool lo sustituye por un proceso
+        nuevo; las tareas de su bloque que no habían terminado se vuelven a encolar."""
+        self.logger.warning("-{kind}- task -{task_id}- is still blocked, killing worker -{pid}-".format(
+            kind=task.kind, task_id=task.task_id, pid=task.pid))
+        kill_process_tree(task.pid)
+        self._killed_workers += 1
+        chunk_id = self._task_chunk.get(task.task_id)
+        for task_id in list(self._chunks.get(chunk_id, [])):
+            chunk_task = self._running.get(task_id)
+            self._finish(chunk_task)
+            if chunk_task.cancel_time is None:
+                self._push(chunk_task.kind, chunk_task.arguments, attempt=chunk_task.attempt,
+                           origin_id=chunk_task.origin_id, blocks=chunk_task.blocks)
+
+    def _fill(self):
+        """Lee argumentos de los iteradores pendientes hasta tener suficientes tareas encoladas para ocupar todos los
+        `slots`."""
+        while self._sources and len(self._queue) < self.slots * self.chunk_size:
+            kind, arguments_iterator, is_unknown_total = self._sources[0]
+            arguments = next(arguments_iterator, None)
+            if arguments is None:
+                self._sources.pop(0)
+                continue
+            if is_unknown_total:
+                self._stats[kind]["known"] += 1
+            self._push(kind, arguments)
+
+    def _dispatch(self, pool):
+        """Envía al pool bloques de las tareas pendientes de mayor prioridad mientras haya algún `slot` libre y el
+        circuit breaker lo permita. Con el circuito medio abierto sólo se envía una tarea, la de prueba."""
+        self._fill()
+        while self._queue and len(self._chunks) < self._get_limit() and (not self._breaker or self._breaker.allow()):
+            chunk = [heapq.heappop(self._queue)]
+            if self._breaker and self._breaker.state == STATE_HALF_OPEN:
+                chunk[0].is_probe = True
+            while self._queue and len(chunk) < self.chunk_size and self._queue[0].kind == chunk[0].kind and \
+                    not chunk[0].is_probe:
+                chunk.append(heapq.heappop(self._queue))
+            chunk_id = next(self._chunk_ids)
+            self._chunks[chunk_id] = {task.task_id for task in chunk}
+            for task in chunk:
+                self._running[task.task_id] = task
+                self._task_chunk[task.task_id] = chunk_id
+            # los errores de la propia llamada al pool (por ejemplo, argumentos que no se pueden serializar) no llegan
+            # a `_run_chunk`, por lo que se notifican desde el proceso principal. Los eventos de las tareas que ya han
+            # terminado se descartan
+            task_ids = [task.task_id for task in chunk]
+            pool.apply_async(_run_chunk, (self.handlers.get(chunk[0].kind),
+                                          [(task.task_id, task.arguments) for task in chunk]),
+                             error_callback=lambda error, task_ids=task_ids: [
+                                 self._events.put(("failed", task_id, str(error))) for task_id in task_ids])
+            self._fill()
+        self.logger.debug("-{running}- tasks running and -{pending}- tasks pending".format(
+            running=len(self._running), pending=len(self._queue)))
+
+    def _get_limit(self):
+        """Devuelve el número de `slots` activos."""
+        return self._controller.limit if self._controller else self.slots
+
+    def _finish(self, task):
+        """Da por terminada una tarea y libera el `slot` de su bloque si era la última del bloque."""
+        self._running.pop(task.task_id)
+        chunk_id = self._task_chunk.pop(task.task_id)
+        self._chunks[chunk_id].discard(task.task_id)
+        if not self._chunks[chunk_id]:
+            self._chunks.pop(chunk_id)
+
+    def _report_progress(self, force=False):
+        """Informa, como mucho una vez cada `progress_every` segundos, de las tareas terminadas de cada tipo."""
+        now = time.time()
+        if not force and now - self._last_report_time < self.progress_every:
+            return
+        self._last_report_time = now
+        elapsed_minutes = max(now - self._init_time, 1) / 60
+        for kind, stats in self._stats.items():
+            if not stats.get("known"):
+                continue
+            self.logger.info("-{kind}-: -{completed}- of -{known}- tasks completed, -{failed}- failed, -{timeouts}- "
+                             "deadlines exceeded, -{hedged}- duplicated, -{blocked}- blocked "
+                             "(-{rate:.1f}- tasks/min)".format(
+                                 kind=kind, rate=stats.get("completed") / elapsed_minutes, **stats))
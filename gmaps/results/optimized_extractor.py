@@ -2,6 +2,12 @@ import logging
 import time
 
 from gmaps.commons.extractor.extractor import AbstractGMapsExtractor
+from gmaps.commons.extractor.landing import BlockedPageException
+from gmaps.commons.extractor.waits import network_idle
+from gmaps.commons.fetcher.http import get_http_fetcher, parse_app_initialization_state
+from gmaps.commons.fetcher.routing import get_field_router
+from gmaps.commons.metrics.metrics import get_metrics
+from gmaps.places.payload import decode_search_results_from_state
 from selenium.webdriver.support import expected_conditions as ec
 from selenium.webdriver.common.by import By
 
@@ -41,17 +47,32 @@ class OptimizedResultsExtractor(AbstractGMapsExtractor):
     _places_element_xpath_query : str
         query de xpath para obtener los elementos de resultados de los cuales se conseguirán los nombres de los
         locales comerciales.
+    _result_fields_xpath : dict
+        queries de xpath, relativas a cada elemento de resultado, de los campos básicos del local comercial.
     _next_button_xpath : str
         query de xpath para obtener el botón de siguiente página.
+    _results_page_size : int
+        número máximo de resultados por página de búsqueda.
+    _http_fetcher : gmaps.commons.fetcher.http.HttpFetcher
+        descarga HTTP sin navegador de la página de resultados. None si no está activada.
+    _field_router : gmaps.commons.fetcher.routing.FieldRouter
+        router que decide, por la tasa de éxito de cada campo, si se intenta primero la descarga HTTP.
 
     Methods
     -------
+    harvest_page(external_driver=None)
+        extrae la información básica de todos los resultados de la página en una única llamada al navegador.
+    _scrap_http()
+        extrae los resultados sin navegador, descargando la página de búsqueda por HTTP.
+    iter_pages()
+        generador que devuelve los resultados de cada página en cuanto se extraen.
     scrap()
         función principal que se encargará de acceder a una url de búsqueda por código postal y tipos de locales y
         navegar por las distintas páginas de resultados extrayendo los nombres de los locales comerciales.
     """
 
-    def __init__(self, driver_location=None, postal_code=None, places_types=None, num_pages=None, base_url=None):
+    def __init__(self, driver_location=None, postal_code=None, places_types=None, num_pages=None, base_url=None,
+                 driver_pool=None, resource_blocking=None, latency_tracker=None, http_fetch=None, session_profile=None):
         """Constructor de la clase
 
         Parameters
@@ -66,8 +87,21 @@ class OptimizedResultsExtractor(AbstractGMapsExtractor):
             número de páginas de resultados que se van a recorrer.
         base_url : str
             url base para el código postal.
+        driver_pool : gmaps.commons.driver.pool.DriverPool
+            pool de drivers del que tomar prestado el driver en lugar de arrancar uno nuevo.
+        resource_blocking : str or dict
+            preset o configuración del perfil de bloqueo de recursos del navegador.
+        latency_tracker : gmaps.commons.extractor.latency.LatencyTracker
+            tracker de latencias usado para calibrar los tiempos de espera.
+        http_fetch : dict
+            configuración de la descarga HTTP sin navegador. Si está activada, el driver sólo se arranca cuando la
+            descarga HTTP no es suficiente.
+        session_profile : gmaps.commons.driver.session.SessionProfile
+            sesión (cookies del consentimiento aceptado e idioma) que se inyecta en el driver al construirlo.
         """
-        super().__init__(driver_location, output_config=None)
+        super().__init__(driver_location, output_config=None, driver_pool=driver_pool,
+                         resource_blocking=resource_blocking, latency_tracker=latency_tracker,
+                         session_profile=session_profile)
         self.logger = logging.getLogger(self.__class__.__name__)
         self._places_types = "+".join(places_types)
         self._postal_code = postal_code
@@ -79,50 +113,131 @@ class OptimizedResultsExtractor(AbstractGMapsExtractor):
         )
         self._url_place_template = "https://www.google.com/maps/search/{postal_code_info}+{places_types}+{place_name}/{coords}"
         self._places_element_xpath_query = "//div[contains(@class, 'section-result-content')]"
+        self._result_fields_xpath = {
+            "name": "div[@class='section-result-text-content']//h3/span",
+            "type": "div[@class='section-result-text-content']//span[contains(@class, 'section-result-details')]",
+            "cost": "div[@class='section-result-text-content']//span[contains(@class, 'section-result-cost')]",
+            "address": "div[@class='section-result-text-content']//span[contains(@class, 'section-result-location')]",
+            "telephone": "div[@class='section-result-text-content']//span[contains(@class, 'section-result-phone-number')]/span"
+        }
         self._next_button_xpath = "//div[@class='gm2-caption']/div/div/button[@jsaction='pane.paginationSection.nextPage']"
+        self._results_page_size = 20
+        self._http_fetcher = get_http_fetcher(http_fetch)
+        self._field_router = get_field_router("results", http_fetch, ["name", "address"]) \
+            if self._http_fetcher else None
+        self._lazy_driver = self._http_fetcher is not None
         self.auto_boot()
 
-    def get_basic_info(self, single_rest_result):
-        """Función encargada de extraer la información, como nombre, url y dirección básica de un resultado de local
-        comercial
+    def _get_place_url(self, name):
+        """Genera la url de acceso directo al local comercial a partir de su nombre."""
+        return self._url_place_template.format(postal_code_info=self._postal_code_info, coords=self._coords,
+                                               places_types=self._places_types, place_name=name.replace(" ", "+"))
+
+    def harvest_page(self, external_driver=None):
+        """Función que extrae la información básica de todos los resultados de la página actual en una única llamada
+        al navegador, en lugar de hacer una llamada por resultado y campo. Los campos que no existan en un resultado se
+        devuelven como None en lugar de abortar el procesado de la página.
 
         Parameters
         ----------
-        single_rest_result : WebElement
-            elemento web del que se extrae la información básica
+        external_driver : webdriver.Chrome
+            driver del que extraer los resultados. En caso de ser None se usará el de la instancia
 
         Returns
         -------
-        dict
-            diccionario que contiene la información básica del resultado
-
+        list
+            lista de diccionarios con la información básica de cada resultado con nombre
         """
-        name = single_rest_result.find_element_by_xpath("div[@class='section-result-text-content']//h3/span").text
-        self.logger.info("-{postal_code}-: place found name: -{name}-".format(postal_code=self._postal_code, name=name))
-        found_type = single_rest_result.find_element_by_xpath("div[@class='section-result-text-content']//span[contains(@class, 'section-result-details')]").text
-        cost = single_rest_result.find_element_by_xpath("div[@class='section-result-text-content']//span[contains(@class, 'section-result-cost')]").text
-        address = single_rest_result.find_element_by_xpath("div[@class='section-result-text-content']//span[contains(@class, 'section-result-location')]").text
-        telephone = single_rest_result.find_element_by_xpath("div[@class='section-result-text-content']//span[contains(@class, 'section-result-phone-number')]/span").text
+        places, _ = self._harvest(external_driver if external_driver else self.get_driver())
+        return places
 
+    def _harvest(self, driver):
+        """Extrae los resultados de la página actual como `harvest_page` y devuelve además la referencia al primer
+        elemento de resultado, que se usa para detectar que la página ha cambiado tras la paginación sin volver a
+        buscar los resultados en el navegador.
+
+        Returns
+        -------
+        tuple
+            lista de resultados con nombre y primer elemento de resultado de la página o None si no hay ninguno
         """
-        if address == "":
-            url = self._url_place_template.format(postal_code_info=self._postal_code_info, coords=self._coords,
-                                                  places_types=self._places_types, place_name=name.replace(" ", "+"))
-        else:
-            url = self._url_place_template.format(postal_code_info=self._postal_code_info, coords=self._coords,
-                                                  places_types=address.replace(" ", "+"),
-                                                  place_name=name.replace(" ", "+"))
+        script = """
+            var fields = arguments[1];
+            var cards = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            var records = [];
+            for (var i = 0; i < cards.snapshotLength; i++) {
+                var card = cards.snapshotItem(i);
+                var record = {};
+                Object.keys(fields).forEach(function(name) {
+                    var element = document.evaluate(fields[name], card, null, XPathResult.FIRST_ORDERED_NODE_TYPE,
+                        null).singleNodeValue;
+                    record[name] = element === null ? null : (element.innerText || '').trim();
+                });
+                records.push(record);
+            }
+            return {first: cards.snapshotLength ? cards.snapshotItem(0) : null, records: records};
         """
-        url = self._url_place_template.format(postal_code_info=self._postal_code_info, coords=self._coords,
-                                              places_types=self._places_types, place_name=name.replace(" ", "+"))
-        return {
-            "name": name,
-            "address": address,
-            "type": found_type,
-            "cost": cost,
-            "telephone": telephone,
-            "url": url
-        }
+        harvest = driver.execute_script(script, self._places_element_xpath_query, self._result_fields_xpath)
+        places = []
+        for record in harvest.get("records", []):
+            if not record.get("name"):
+                self.logger.warning("-{postal_code}-: result without name found, skipping it: {record}".format(
+                    postal_code=self._postal_code, record=record))
+                continue
+            self.logger.info("-{postal_code}-: place found name: -{name}-".format(postal_code=self._postal_code,
+                                                                                 name=record.get("name")))
+            record["url"] = self._get_place_url(record.get("name"))
+            places.append(record)
+        return places, harvest.get("first")
+
+    def _scrap_http(self):
+        """Extrae los resultados sin navegador: descarga la página de búsqueda por HTTP y decodifica los resultados del
+        estado inicial que incluye el html. La paginación necesita el navegador, por lo que sólo se usa si la primera
+        página contiene todos los resultados o si sólo se quiere recorrer una página.
+
+        Returns
+        -------
+        list
+            resultados con el mismo formato que `harvest_page` o None si hay que extraerlos con Selenium
+        """
+        if not self._http_fetcher or not self._field_router.use_http():
+            return None
+        metrics = get_metrics()
+        self.pace("search")
+        current_url, html = self._http_fetcher.fetch(self._results_url)
+        if html is None:
+            # la descarga ha fallado: no hay url que clasificar ni estado que decodificar
+            self._field_router.record({field: False for field in self._field_router.required_fields})
+            metrics.incr("http.results.fallback")
+            self.logger.info("-{postal_code}-: http fetch failed, falling back to selenium".format(
+                postal_code=self._postal_code))
+            return None
+        self.check_landing(url=current_url)
+        places = decode_search_results_from_state(parse_app_initialization_state(html))
+        found_fields = {field: bool(places) and all(place.get(field) for place in places)
+                        for field in self._field_router.required_fields}
+        self._field_router.record(found_fields)
+        if not all(found_fields.values()):
+            metrics.incr("http.results.fallback")
+            self.logger.info("-{postal_code}-: results not found by http, falling back to selenium".format(
+                postal_code=self._postal_code))
+            return None
+        if self._num_pages > 1 and len(places) >= self._results_page_size:
+            metrics.incr("http.results.paginated")
+            self.logger.info("-{postal_code}-: there are more results pages, falling back to selenium".format(
+                postal_code=self._postal_code))
+            return None
+        metrics.incr("http.results.success")
+        self.logger.info("-{postal_code}-: found {total} places by http".format(postal_code=self._postal_code,
+                                                                                 total=len(places)))
+        return [{
+            "name": place.get("name"),
+            "address": place.get("address"),
+            "type": place.get("premise_type"),
+            "cost": place.get("price_range"),
+            "telephone": place.get("telephone_number"),
+            "url": self._get_place_url(place.get("name"))
+        } for place in places]
 
     def scrap(self):
         """Función principal que se encargará de acceder a una url de búsqueda por código postal y tipos de locales y
@@ -130,37 +245,61 @@ class OptimizedResultsExtractor(AbstractGMapsExtractor):
 
         Returns
         -------
-        dict
-            devuelve un diccionario cuyas claves son los nombres de los locales y cuyos valores son las urls para cada
-            nombre de local comercial
+        list
+            información básica y url de cada local comercial encontrado
+        """
+        places_found = []
+        for page_places in self.iter_pages():
+            places_found += page_places
+        return places_found
+
+    def iter_pages(self):
+        """Generador que accede a la url de búsqueda y devuelve los resultados de cada página en cuanto se extraen, sin
+        esperar a recorrer el resto de páginas, para que la extracción de los locales pueda empezar mientras se sigue
+        paginando.
+
+        Yields
+        ------
+        list
+            información básica y url de los locales comerciales de una página de resultados
         """
+        places_found = self._scrap_http()
+        if places_found is not None:
+            yield places_found
+            return
         driver = self.get_driver()
         places_found = []
         total_time = 0
         try:
             # se accede a la url de búsqueda de resultados para un código postal teniendo ya añadido los tipos de
             # locales que se quieren buscar.
+            self.pace("search")
             driver.get(self._results_url)
+            self.check_landing(external_driver=driver)
             for n_page in range(self._num_pages):
                 init_page_time = time.time()
                 self.logger.info("-{postal_code}-: page number: -{n_page}-".format(
                     postal_code=self._postal_code, n_page=n_page))
-                driver.wait.until(
-                    ec.presence_of_all_elements_located((By.XPATH, self._places_element_xpath_query))
-                )
-                self.force_sleep(self.sleep_m)
+                self.wait_until("results_page",
+                                ec.presence_of_all_elements_located((By.XPATH, self._places_element_xpath_query)))
+                # se espera a que la página de resultados termine de cargar en lugar de dormir un tiempo fijo
+                self.wait_for(network_idle(), timeout=self.sleep_m)
                 # Se extraen los nombres de los locales encontrados en los resultados y se generan dinámicamente las
                 # urls de acceso directo para cada uno de estos locales.
-                page_elements = driver.find_elements_by_xpath(self._places_element_xpath_query)
-                # se actualiza el listado de resultados con el par nombre-url. Se usa un diccionario para evitar
-                # posibles duplicados
-                places_found += [self.get_basic_info(result) for result in page_elements]
+                page_places, first_result = self._harvest(driver)
+                places_found += page_places
+                yield page_places
 
                 # si existe botón de de siguiente página, se intenta seguir, en caso contrario, se sale del bucle
                 next_button = self.get_info_obj(self._next_button_xpath)
                 if next_button:
+                    current_url = driver.current_url
+                    self.pace("search")
                     driver.execute_script("arguments[0].click();", next_button)
-                    driver.wait.until(ec.url_changes(driver.current_url))
+                    self.wait_until("results_next_page", ec.url_changes(current_url))
+                    # los resultados de la página anterior dejan de estar en el DOM cuando se carga la siguiente
+                    if first_result:
+                        self.wait_for(ec.staleness_of(first_result), timeout=self.sleep_m)
                 else:
                     self.logger.warning("-{postal_code}-: next page not found...something went wrong. aborting bucle")
                     break
@@ -171,6 +310,9 @@ class OptimizedResultsExtractor(AbstractGMapsExtractor):
                     "-{postal_code}-: iteration -{it_number}- was executed in: -{elapsed}- seconds".format(
                         postal_code=self._postal_code, it_number=n_page, elapsed=elapsed))
 
+        except BlockedPageException:
+            # el código postal se reintentará más tarde, cuando Google deje de bloquear las peticiones
+            raise
         except Exception as e:
             self.logger.error("-{postal_code}-: something went wrong during places names and url extraction".format(
                 postal_code=self._postal_code))
@@ -184,4 +326,3 @@ class OptimizedResultsExtractor(AbstractGMapsExtractor):
                                                                         total=len(places_found)))
         self.logger.info("-{postal_code}-: total time elapsed: -{elapsed}- seconds".format(
             postal_code=self._postal_code, elapsed=total_time))
-        return places_found
@@ -0,0 +1,58 @@
+import time
+import unittest
+
+from gmaps.commons.extractor.landing import LANDING_CAPTCHA, LANDING_CONSENT, LANDING_NORMAL, classify_landing
+from gmaps.process.breaker import STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreaker
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def _open(self, breaker):
+        for _ in range(breaker.min_samples):
+            breaker.record(True)
+        assert breaker.state == STATE_OPEN
+        breaker._open_until = time.time()
+
+    def test_opens_when_block_rate_crosses_threshold(self):
+        breaker = CircuitBreaker(threshold=0.5, window=10, min_samples=4, backoff=60)
+        for is_blocked in [False, False, True]:
+            breaker.record(is_blocked)
+        assert breaker.allow()
+        breaker.record(True)
+        assert breaker.state == STATE_OPEN
+        assert not breaker.allow()
+        assert breaker.get_wait() > 0
+
+    def test_single_probe_closes_circuit(self):
+        breaker = CircuitBreaker(min_samples=2, backoff=60)
+        self._open(breaker)
+        assert breaker.allow()
+        assert breaker.state == STATE_HALF_OPEN
+        assert not breaker.allow()
+        breaker.record(True)
+        assert breaker.state == STATE_HALF_OPEN
+        breaker.record(False, is_probe=True)
+        assert breaker.state == STATE_CLOSED
+        assert breaker.allow()
+
+    def test_blocked_probe_backs_off_exponentially(self):
+        breaker = CircuitBreaker(min_samples=2, backoff=60, max_backoff=100, backoff_factor=2)
+        self._open(breaker)
+        breaker.allow()
+        breaker.record(True, is_probe=True)
+        assert breaker.state == STATE_OPEN
+        assert breaker._current_backoff == 100
+        assert 90 < breaker.get_wait() <= 100
+
+    def test_disabled_by_default(self):
+        assert CircuitBreaker.from_config({"enabled": False}) is None
+
+
+class TestClassifyLanding(unittest.TestCase):
+
+    def test_classify_landing(self):
+        assert classify_landing("https://www.google.com/maps/place/Bar") == LANDING_NORMAL
+        assert classify_landing("https://consent.google.com/ml?continue=x") == LANDING_CONSENT
+        assert classify_landing("https://www.google.com/sorry/index?continue=x") == LANDING_CAPTCHA
+        assert classify_landing("https://www.google.com/maps", {"consent": True}) == LANDING_CONSENT
+        assert classify_landing("https://www.google.com/maps", {"consent": True, "captcha": True}) == LANDING_CAPTCHA
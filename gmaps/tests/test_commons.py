@@ -0,0 +1,18 @@
+import unittest
+
+from gmaps.commons.commons import normalize_text
+
+
+class TestCommons(unittest.TestCase):
+
+    def test_normalize_text_folds_accents_case_and_whitespace(self):
+        assert normalize_text("  Bar  Pepe\nCañas Málaga ") == "bar pepe canas malaga"
+        assert normalize_text("Café Ávila") == normalize_text("cafe avila")
+
+    def test_normalize_text_empty(self):
+        assert normalize_text(None) == ""
+        assert normalize_text("") == ""
+
+
+if __name__ == '__main__':
+    unittest.main()
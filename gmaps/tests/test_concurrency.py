@@ -0,0 +1,32 @@
+import time
+import unittest
+
+from gmaps.process.concurrency import ConcurrencyController
+
+
+class TestConcurrencyController(unittest.TestCase):
+
+    def _adjust(self, controller, successes, signals=None, is_saturated=True):
+        for _ in range(successes):
+            controller.record("place", True, signals)
+        controller._last_adjust_time = time.time() - 60
+        return controller.adjust(is_saturated=is_saturated)
+
+    def test_limit_grows_additively_while_throughput_improves(self):
+        controller = ConcurrencyController(max_slots=10, initial_slots=4)
+        assert self._adjust(controller, 10) == 5
+        assert self._adjust(controller, 12) == 6
+        assert self._adjust(controller, 12, is_saturated=False) == 6
+
+    def test_limit_shrinks_multiplicatively_on_saturation_signals(self):
+        controller = ConcurrencyController(max_slots=10, initial_slots=8, min_slots=3)
+        assert self._adjust(controller, 10, {"wait.timeouts": 1}) == 4
+        assert self._adjust(controller, 10, {"blocks.redirect": 2}) == 3
+
+    def test_increase_is_undone_when_throughput_drops(self):
+        controller = ConcurrencyController(max_slots=10, initial_slots=4)
+        assert self._adjust(controller, 20) == 5
+        assert self._adjust(controller, 10) == 4
+
+    def test_disabled_by_default(self):
+        assert ConcurrencyController.from_config(10, {"enabled": False}) is None
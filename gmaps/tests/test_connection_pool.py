@@ -0,0 +1,78 @@
+import unittest
+
+import psycopg2
+import psycopg2.extensions
+
+from gmaps.commons.db.connection_pool import ConnectionPool
+
+
+class FakeConnection:
+
+    def __init__(self, is_healthy=True):
+        self.closed = 0
+        self.is_healthy = is_healthy
+        self.in_transaction = False
+        self.rollbacks = 0
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, query, *args):
+        if not self.is_healthy:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.in_transaction = True
+
+    def get_transaction_status(self):
+        if self.in_transaction:
+            return psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        return psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = 1
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def test_released_connection_is_reused_after_rollback(self):
+        opened = []
+        pool = ConnectionPool(lambda: opened.append(FakeConnection()) or opened[-1])
+        connection = pool.acquire()
+        connection.execute("SELECT 1")
+        pool.release(connection)
+        assert pool.acquire() is connection
+        assert connection.rollbacks == 1
+        assert len(opened) == 1
+
+    def test_broken_connection_is_replaced(self):
+        opened = []
+        pool = ConnectionPool(lambda: opened.append(FakeConnection()) or opened[-1], health_check_seconds=0)
+        connection = pool.acquire()
+        pool.release(connection)
+        connection.is_healthy = False
+        reconnected = pool.acquire()
+        assert reconnected is not connection
+        assert connection.closed
+        assert len(opened) == 2
+
+    def test_connections_are_bounded(self):
+        pool = ConnectionPool(FakeConnection, max_connections=1, acquire_timeout=0.1)
+        connection = pool.acquire()
+        with self.assertRaises(TimeoutError):
+            pool.acquire()
+        connection.close()
+        pool.release(connection)
+        assert pool.acquire() is not connection
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+import threading
+import unittest
+
+from gmaps.commons.driver.capture import PERFORMANCE_LOG_CAPABILITY
+from gmaps.commons.driver.pool import DriverPool, get_driver_pool
+from gmaps.commons.driver.recycling import DriverRecyclingPolicy
+from gmaps.gmaps_zip_extractor import get_worker_driver_pool
+from gmaps.places.extractor import PlacesExtractor
+from gmaps.results.optimized_extractor import OptimizedResultsExtractor
+
+
+class FakeDriver:
+
+    def __init__(self):
+        self.window_handles = ["main"]
+        self.visited = []
+        self.is_quit = False
+        self.switch_to = self
+
+    def window(self, handle):
+        pass
+
+    def execute_script(self, script, *args):
+        pass
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        return {}
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def quit(self):
+        self.is_quit = True
+
+
+class FakeDriverMixin:
+    """Sustituye la construcción del chromedriver por un `FakeDriver` que guarda las capacidades solicitadas."""
+
+    def _build_driver(self, provided_driver_location=None, driver_options=None):
+        driver = FakeDriver()
+        driver.capabilities = driver_options.to_capabilities()
+        return driver
+
+
+class FakeResultsExtractor(FakeDriverMixin, OptimizedResultsExtractor):
+    pass
+
+
+class FakePlacesExtractor(FakeDriverMixin, PlacesExtractor):
+    pass
+
+
+class TestDriverPool(unittest.TestCase):
+    _base_url = "https://www.google.com/maps/place/28047+Madrid/@40.3911256,-3.763457,14z"
+
+    def test_released_driver_is_reused(self):
+        built = []
+        build = lambda: built.append(FakeDriver()) or built[-1]
+        pool = DriverPool(size=1)
+        driver = pool.acquire(builder=build)
+        pool.release(driver)
+        reused = pool.acquire(builder=build)
+        assert reused is driver
+        assert len(built) == 1
+        assert driver.visited == ["about:blank"]
+        assert not driver.is_quit
+
+    def test_driver_is_quit_when_pool_is_full(self):
+        pool = DriverPool(size=1)
+        first = pool.acquire(builder=FakeDriver)
+        second = pool.acquire(builder=FakeDriver)
+        pool.release(first)
+        pool.release(second)
+        assert not first.is_quit
+        assert second.is_quit
+
+    def test_shutdown_quits_idle_drivers(self):
+        pool = DriverPool(size=2)
+        driver = pool.acquire(builder=FakeDriver)
+        pool.release(driver)
+        pool.shutdown()
+        assert driver.is_quit
+        other = pool.acquire(builder=FakeDriver)
+        pool.release(other)
+        assert other.is_quit
+
+    def test_driver_is_recycled_after_max_pages(self):
+        pool = DriverPool(size=1, recycling_policy=DriverRecyclingPolicy(max_pages=2))
+        driver = pool.acquire(builder=FakeDriver)
+        pool.release(driver)
+        assert pool.acquire(builder=FakeDriver) is driver
+        pool.release(driver)
+        assert driver.is_quit
+        replacement = pool.acquire(builder=FakeDriver)
+        assert replacement is not driver
+        assert replacement.pages_served == 0
+
+    def test_idle_driver_is_recycled_after_max_age(self):
+        pool = DriverPool(size=1, recycling_policy=DriverRecyclingPolicy(max_age_seconds=60))
+        driver = pool.acquire(builder=FakeDriver)
+        pool.release(driver)
+        driver.created_at -= 120
+        assert pool.acquire(builder=FakeDriver) is not driver
+        assert driver.is_quit
+
+    def test_standby_driver_is_prefetched(self):
+        built = []
+        build = lambda: built.append(FakeDriver()) or built[-1]
+        pool = DriverPool(size=0, standby=1)
+        driver = pool.acquire(builder=build)
+        pool.release(driver)
+        assert driver.is_quit
+        prefetched = pool.acquire(builder=build)
+        assert prefetched is not driver
+        assert not prefetched.is_quit
+        pool.release(prefetched)
+        pool.shutdown()
+        assert all(d.is_quit for d in built)
+        assert len(built) == 3
+
+    def test_no_prefetch_when_driver_will_be_reused(self):
+        built = []
+        build = lambda: built.append(FakeDriver()) or built[-1]
+        pool = DriverPool(size=1, standby=1)
+        driver = pool.acquire(builder=build)
+        pool.release(driver)
+        assert pool.acquire(builder=build) is driver
+        assert len(built) == 1
+
+    def test_booting_drivers_count_against_size_on_release(self):
+        built = []
+        booted = threading.Event()
+
+        def build():
+            built.append(FakeDriver())
+            if len(built) > 1:
+                booted.wait(5)
+            return built[-1]
+
+        pool = DriverPool(size=1, standby=2)
+        driver = pool.acquire(builder=build)
+        pool.release(driver)
+        booted.set()
+        pool.shutdown()
+        # el driver de reserva que se estaba arrancando ocupa el único hueco del pool
+        assert driver.is_quit
+        assert len(built) == 2
+
+    def test_prefetch_uses_builder_of_each_lease(self):
+        pool = DriverPool(size=0, standby=1)
+        first_built, second_built = [], []
+        pool.release(pool.acquire(builder=lambda: first_built.append(FakeDriver()) or first_built[-1]))
+        pool.release(pool.acquire(builder=lambda: second_built.append(FakeDriver()) or second_built[-1]))
+        pool.shutdown()
+        # el segundo préstamo recibe el driver de reserva del primero, pero su propia reserva usa su builder
+        assert len(first_built) == 2
+        assert len(second_built) == 1
+
+    def test_network_engine_does_not_lease_drivers_built_without_performance_log(self):
+        driver_pool_config = {"size": 1}
+        results_extractor = FakeResultsExtractor(places_types=["bar"], base_url=self._base_url,
+                                                 driver_pool=get_worker_driver_pool(driver_pool_config))
+        results_driver = results_extractor.get_driver()
+        results_extractor.finish()
+        place_extractor = FakePlacesExtractor(places_types=["bar"],
+                                              driver_pool=get_worker_driver_pool(driver_pool_config, "network"),
+                                              extraction_engine="network")
+        place_driver = place_extractor.get_driver()
+        place_extractor.finish()
+        assert PERFORMANCE_LOG_CAPABILITY not in results_driver.capabilities
+        assert place_driver is not results_driver
+        assert place_driver.capabilities[PERFORMANCE_LOG_CAPABILITY]["performance"] == "ALL"
+
+    def test_pool_is_shared_in_process(self):
+        assert get_driver_pool(name="test") is get_driver_pool(name="test")
+
+
+if __name__ == '__main__':
+    unittest.main()
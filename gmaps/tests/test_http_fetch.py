@@ -0,0 +1,128 @@
+import json
+import unittest
+
+from gmaps.commons.fetcher.http import parse_app_initialization_state
+from gmaps.commons.fetcher.routing import FieldRouter
+from gmaps.places.extractor import PlacesExtractor
+from gmaps.places.payload import decode_place_from_state
+from gmaps.places.writer import get_comment_fingerprint
+
+
+class FakeFetcher:
+
+    def __init__(self, html=None):
+        self.html = html
+
+    def fetch(self, url):
+        return (url, self.html) if self.html is not None else (None, None)
+
+
+class FakeWriter:
+
+    def __init__(self, fingerprints):
+        self.fingerprints = fingerprints
+
+    def get_comment_fingerprints(self, hash_commercial_premise):
+        return self.fingerprints
+
+
+class FakePlacesExtractor(PlacesExtractor):
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.landings = []
+
+    def _build_driver(self, provided_driver_location=None, driver_options=None):
+        return None
+
+    def check_landing(self, external_driver=None, url=None):
+        self.landings.append(url)
+        return "normal"
+
+
+class TestHttpFetch(unittest.TestCase):
+
+    def test_parse_app_initialization_state(self):
+        place = [None] * 40
+        place[11] = "Bar Pepe"
+        place[39] = "Calle Mayor, 1"
+        state = [None, None, None, [None, None, None, None, None, None,
+                                    ")]}'\n" + json.dumps([None, None, None, None, None, None, place])]]
+        html = "<script>window.APP_INITIALIZATION_STATE={state};window.APP_FLAGS=[];</script>".format(
+            state=json.dumps(state))
+        decoded = decode_place_from_state(parse_app_initialization_state(html))
+        assert decoded.get("name") == "Bar Pepe"
+        assert decoded.get("address") == "Calle Mayor, 1"
+        assert parse_app_initialization_state("<html></html>") is None
+
+    def test_router_uses_http_until_enough_samples(self):
+        router = FieldRouter(required_fields=["name", "comments"], min_samples=3, explore_every=5)
+        for _ in range(3):
+            assert router.use_http()
+            router.record({"name": True, "comments": False})
+        assert router.get_success_rate("name") == 1
+        assert router.get_success_rate("comments") == 0
+        assert not router.use_http()
+
+    def test_router_explores_http_periodically(self):
+        router = FieldRouter(required_fields=["name"], min_samples=1, explore_every=3)
+        router.record({"name": False})
+        assert [router.use_http() for _ in range(6)] == [False, False, True, False, False, True]
+
+    def test_router_keeps_http_with_high_success_rate(self):
+        router = FieldRouter(required_fields=["name"], min_samples=2, min_success_rate=0.5)
+        router.record({"name": True})
+        router.record({"name": False})
+        assert router.use_http()
+
+
+
+class TestPlacesHttpFetch(unittest.TestCase):
+
+    def get_extractor(self, html=None, known_fingerprints=None):
+        extractor = FakePlacesExtractor(places_types=["bar"], num_reviews=3, url="https://maps/place",
+                                        incremental_reviews=known_fingerprints is not None)
+        extractor._http_fetcher = FakeFetcher(html)
+        extractor._field_router = FieldRouter(required_fields=["name", "comments"], min_samples=1)
+        if known_fingerprints is not None:
+            extractor._writer = FakeWriter(known_fingerprints)
+        return extractor
+
+    def test_failed_fetch_falls_back_without_checking_landing(self):
+        extractor = self.get_extractor()
+        assert extractor._scrap_http() is None
+        assert extractor.landings == []
+        assert extractor._field_router.get_success_rate("name") == 0
+
+    def test_incremental_comments_are_complete_when_a_known_one_is_reached(self):
+        extractor = self.get_extractor(known_fingerprints={get_comment_fingerprint("Luis", "Normal")})
+        place = {"name": "Bar Pepe", "comments": [{"author": "Ana", "content": "Muy bueno"},
+                                                  {"author": "Luis", "content": "Normal"}]}
+        comments, _, is_complete = extractor._get_payload_comments(place)
+        assert [comment["author"] for comment in comments] == ["Ana"]
+        assert is_complete
+
+    def test_incremental_comments_are_judged_before_the_filter(self):
+        known_fingerprints = {get_comment_fingerprint(author, "Bien") for author in ["Ana", "Luis", "Eva"]}
+        extractor = self.get_extractor(known_fingerprints=known_fingerprints)
+        place = {"name": "Bar Pepe", "comments": [{"author": author, "content": "Bien"}
+                                                  for author in ["Ana", "Luis", "Eva"]]}
+        comments, _, is_complete = extractor._get_payload_comments(place)
+        assert comments == []
+        assert is_complete
+        _, _, is_complete = extractor._get_payload_comments({"name": "Bar Pepe", "comments": [
+            {"author": "Rosa", "content": "Bien"}]})
+        assert not is_complete
+
+    def test_known_fingerprints_are_carried_to_the_writer(self):
+        fingerprint = get_comment_fingerprint("Luis", "Normal")
+        extractor = self.get_extractor(known_fingerprints={fingerprint})
+        place = {"name": "Bar Pepe", "comments": [{"author": "Luis", "content": "Normal"}]}
+        comments, known_fingerprints, _ = extractor._get_payload_comments(place)
+        place_info = extractor._build_payload_place_info(place, comments, "https://maps/place", known_fingerprints)
+        assert place_info["incremental_reviews"]
+        assert place_info["known_comment_fingerprints"] == [fingerprint]
+
+
+if __name__ == '__main__':
+    unittest.main()
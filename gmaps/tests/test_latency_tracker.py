@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+
+from gmaps.commons.extractor.latency import LatencyTracker
+
+
+class TestLatencyTracker(unittest.TestCase):
+
+    def test_default_timeout_without_enough_samples(self):
+        tracker = LatencyTracker(min_samples=5, default_timeout=10)
+        tracker.record("occupancy", 0.5)
+        assert tracker.get_timeout("occupancy") == 10
+
+    def test_timeout_from_percentile(self):
+        tracker = LatencyTracker(min_samples=5, percentile=90, safety_factor=2, min_timeout=1, max_timeout=20)
+        for seconds in [0.2, 0.4, 0.6, 0.8, 1.0, 1.2, 1.4, 1.6, 1.8, 2.0]:
+            tracker.record("place_info", seconds)
+        assert tracker.get_timeout("place_info") == 3.6
+        for _ in range(10):
+            tracker.record("fast", 0.1)
+        assert tracker.get_timeout("fast") == 1
+        for _ in range(10):
+            tracker.record("slow", 30)
+        assert tracker.get_timeout("slow") == 20
+
+    def test_samples_are_persisted_between_runs(self):
+        file_path = os.path.join(tempfile.mkdtemp(), "latencies.json")
+        first = LatencyTracker(file_path=file_path, min_samples=2, safety_factor=1)
+        first.record("results_page", 1.5)
+        first.save()
+        second = LatencyTracker(file_path=file_path, min_samples=2, safety_factor=1)
+        second.record("results_page", 2.5)
+        second.save()
+        third = LatencyTracker(file_path=file_path, min_samples=2, safety_factor=1)
+        third.load()
+        assert third.get_timeout("results_page") == 2.5
+
+
+if __name__ == '__main__':
+    unittest.main()
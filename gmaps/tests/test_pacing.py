@@ -0,0 +1,30 @@
+import time
+import unittest
+from multiprocessing.pool import Pool
+
+from gmaps.commons.extractor.pacing import RateLimiter, get_rate_limiter, set_rate_limiter
+
+
+def _acquire(endpoint):
+    return get_rate_limiter().acquire(endpoint)
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_burst_is_served_without_waiting(self):
+        limiter = RateLimiter({"place": {"rate": 10, "burst": 2}})
+        assert limiter.acquire("place") == 0
+        assert limiter.acquire("place") == 0
+        assert limiter.acquire("place") > 0
+        assert limiter.acquire("reviews") == 0
+
+    def test_rate_is_shared_across_processes(self):
+        limiter = RateLimiter({"search": {"rate": 20, "burst": 1}})
+        init_time = time.time()
+        with Pool(processes=4, initializer=set_rate_limiter, initargs=(limiter,)) as pool:
+            pool.map(_acquire, ["search"] * 12)
+        # 12 peticiones con un token inicial y 20 tokens por segundo necesitan al menos 11 / 20 segundos
+        assert time.time() - init_time >= 0.5
+
+    def test_disabled_by_default(self):
+        assert RateLimiter.from_config({"enabled": False}) is None
@@ -0,0 +1,54 @@
+import json
+import unittest
+
+from gmaps.places.payload import dig, parse_payload, decode_place
+from gmaps.places.writer import PlaceDbWriter
+
+
+def build_place_payload():
+    place = [None] * 179
+    place[4] = [None, None, "€€", None, None, None, None, 4.5, 1234]
+    place[9] = [None, None, 40.4168, -3.7038]
+    place[11] = "Bar Pepe"
+    place[13] = ["Bar"]
+    place[34] = [None, [["lunes", ["9:00–14:00", "17:00–23:00"]]]]
+    place[39] = "Calle Mayor, 1, 28013 Madrid"
+    place[52] = [[[[None, "Ana"], "hace 2 días", None, "Muy buen servicio", 5, None, None, None, None, None, None,
+                   None, [None, [None, "12 reseñas"]]]]]
+    place[84] = [[[1, [[13, 45], [14, 60]]]]]
+    place[178] = [["910 00 00 00"]]
+    return ")]}'\n" + json.dumps([None, None, None, None, None, None, place])
+
+
+class TestPlacePayload(unittest.TestCase):
+
+    def test_dig_returns_none_for_missing_paths(self):
+        assert dig([1, [2, 3]], [1, 0]) == 2
+        assert dig([1, [2, 3]], [1, 5]) is None
+        assert dig([1, None], [1, 0]) is None
+
+    def test_parse_payload_strips_xssi_prefix(self):
+        assert parse_payload(")]}'\n[1, 2]") == [1, 2]
+        assert parse_payload("<html>") is None
+
+    def test_decode_place(self):
+        place = decode_place(parse_payload(build_place_payload()))
+        assert place.get("name") == "Bar Pepe"
+        assert place.get("score") == "4,5"
+        assert place.get("total_scores") == "1234"
+        assert place.get("coordinates") == "40.4168, -3.7038"
+        assert place.get("opening_hours") == ["lunes 9:00–14:00 y 17:00–23:00"]
+        assert place.get("comments")[0].get("author") == "Ana"
+        assert place.get("comments")[0].get("content") == "Muy buen servicio"
+
+    def test_decoded_occupancy_is_readable_by_writer(self):
+        place = decode_place(parse_payload(build_place_payload()))
+        occupancy = PlaceDbWriter.decompose_occupancy_data(None, place.get("occupancy"))
+        assert occupancy.get("lunes") == {"13": 45.0, "14": 60.0}
+
+    def test_decode_place_without_place_data(self):
+        assert decode_place(parse_payload(")]}'\n[null]")) is None
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+
+from gmaps.commons.extractor.pacing import set_rate_limiter
+from gmaps.places.extractor import PlacesExtractor
+
+
+class FakeDriver:
+
+    def __init__(self, cards=None):
+        self.cards = cards
+        self.scripts = 0
+
+    def execute_script(self, script, *args):
+        self.scripts += 1
+        return self.cards
+
+
+class RecordingRateLimiter:
+
+    def __init__(self):
+        self.endpoints = []
+
+    def acquire(self, endpoint):
+        self.endpoints.append(endpoint)
+        return 0
+
+
+class FakePlacesExtractor(PlacesExtractor):
+
+    def _build_driver(self, provided_driver_location=None, driver_options=None):
+        return FakeDriver()
+
+
+class TestFoundPlaceInList(unittest.TestCase):
+    _cards = [
+        {"index": 0, "name": "Cafetería  Ávila", "address": "Calle de Alcalá, 10"},
+        {"index": 1, "name": "Bar Pepe", "address": "Calle Mayor, 1"},
+        {"index": 2, "name": "BAR PEPE\n", "address": "Plaza  Mayor, 3"}
+    ]
+
+    def get_extractor(self, place_name, place_address):
+        return FakePlacesExtractor(places_types=["Bar"], place_name=place_name, place_address=place_address)
+
+    def test_place_is_found_ignoring_accents_and_case(self):
+        driver = FakeDriver(self._cards)
+        assert self.get_extractor("cafeteria avila", "calle de alcala").found_place_in_list(driver) == 0
+        assert driver.scripts == 1
+
+    def test_place_is_found_ignoring_whitespace(self):
+        driver = FakeDriver(self._cards)
+        assert self.get_extractor(" Bar Pepe ", "Plaza Mayor").found_place_in_list(driver) == 2
+
+    def test_duplicated_names_are_told_apart_by_address(self):
+        driver = FakeDriver(self._cards)
+        assert self.get_extractor("Bar Pepe", "Calle Mayor").found_place_in_list(driver) == 1
+
+    def test_place_not_found(self):
+        driver = FakeDriver(self._cards)
+        assert self.get_extractor("Bar Pepe", "Calle de Toledo").found_place_in_list(driver) is None
+        assert self.get_extractor("Taberna Lola", "Calle Mayor").found_place_in_list(driver) is None
+
+    def test_empty_result_list(self):
+        driver = FakeDriver(None)
+        extractor = self.get_extractor("Bar Pepe", "Calle Mayor")
+        assert extractor._get_result_cards(driver) == []
+        assert extractor.found_place_in_list(driver) is None
+
+
+class TestClickResult(unittest.TestCase):
+
+    def tearDown(self):
+        set_rate_limiter(None)
+
+    def test_click_on_result_is_paced_as_place_navigation(self):
+        rate_limiter = RecordingRateLimiter()
+        set_rate_limiter(rate_limiter)
+        extractor = FakePlacesExtractor(places_types=["Bar"], place_name="Bar Pepe")
+        assert extractor._click_result(FakeDriver(True), 1)
+        assert rate_limiter.endpoints == ["place"]
+
+
+if __name__ == '__main__':
+    unittest.main()
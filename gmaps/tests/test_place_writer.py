@@ -0,0 +1,97 @@
+import hashlib
+import unittest
+
+from gmaps.places.writer import PlaceDbWriter, get_commercial_premise_hash, get_comment_fingerprint
+
+
+class FakeDb:
+    """Conexión que registra las consultas ejecutadas y devuelve el id 1 al insertar un local comercial."""
+
+    def __init__(self, comments=None):
+        self.comments = comments if comments else []
+        self.queries = []
+        self.inserted = {}
+        self._result = None
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, values=None):
+        self.queries.append((query, values))
+        self._result = (1,) if "RETURNING id" in query else None
+
+    def executemany(self, query, values):
+        self.inserted[query] = values
+
+    def fetchone(self):
+        return self._result
+
+    def fetchall(self):
+        return self.comments
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakePlaceDbWriter(PlaceDbWriter):
+
+    def auto_boot(self):
+        self.db = FakeDb(comments=[("Ana", "Muy bueno")])
+
+
+class TestPlaceWriter(unittest.TestCase):
+
+    def test_commercial_premise_hash(self):
+        assert get_commercial_premise_hash("Bar Pepe", "Calle Mayor, 1") == hashlib.sha256(
+            "Bar PepeCalle Mayor, 1".encode()).hexdigest()
+        assert get_commercial_premise_hash("Bar Pepe", None) is None
+
+    def test_comment_fingerprint_ignores_accents_and_whitespace(self):
+        assert get_comment_fingerprint("José", "Muy  buen\nservicio") == get_comment_fingerprint(
+            "jose", "muy buen servicio")
+        assert get_comment_fingerprint("José", "Muy buen servicio") != get_comment_fingerprint(
+            "Ana", "Muy buen servicio")
+
+
+class TestPlaceDbWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.writer = FakePlaceDbWriter(config={})
+        self.element = {"name": "Bar Pepe", "address": "Calle Mayor, 1", "date": "2026-10-17", "opening_hours": [],
+                        "current_url": "https://maps/place", "incremental_reviews": True,
+                        "comments": [{"author": "Ana", "content": "Muy bueno"},
+                                     {"author": "Luis", "content": "Normal"}]}
+
+    def get_queries(self):
+        return [query for query, _ in self.writer.db.queries]
+
+    def get_inserted_authors(self):
+        return [values[1] for values in self.writer.db.inserted[self.writer._commercial_premise_comments_query]]
+
+    def test_incremental_write_uses_the_extracted_fingerprints(self):
+        self.element["known_comment_fingerprints"] = [get_comment_fingerprint("Luis", "Normal")]
+        assert self.writer.write(self.element)
+        assert self.writer._find_comments_query not in self.get_queries()
+        assert self.get_inserted_authors() == ["Ana"]
+
+    def test_incremental_write_queries_the_fingerprints_if_not_extracted(self):
+        assert self.writer.write(self.element)
+        assert self.writer._find_comments_query in self.get_queries()
+        assert self.get_inserted_authors() == ["Luis"]
+
+    def test_extraction_time_is_stored(self):
+        self.element["extraction_seconds"] = 12.5
+        assert self.writer.write(self.element)
+        assert (self.writer._commercial_premise_extraction_time_query,
+                (1, 12.5, "2026-10-17", get_commercial_premise_hash("Bar Pepe", "Calle Mayor, 1"))) in \
+            self.writer.db.queries
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+from gmaps.commons.driver.blocking import ResourceBlockingProfile
+
+
+class TestResourceBlocking(unittest.TestCase):
+
+    def test_preset_is_applied_to_driver_options(self):
+        profile = ResourceBlockingProfile.from_config("text-only")
+        arguments = ["--headless"]
+        experimental = {}
+        profile.apply_options(arguments, experimental)
+        assert "--blink-settings=imagesEnabled=false" in arguments
+        assert experimental["prefs"]["profile.managed_default_content_settings.images"] == 2
+        assert "*.woff2" in profile.blocked_urls
+
+    def test_occupancy_preset_keeps_fonts(self):
+        profile = ResourceBlockingProfile.from_config({"preset": "with-occupancy", "blocked_urls": ["*/ads/*"]})
+        assert "*.woff2" not in profile.blocked_urls
+        assert "*/ads/*" in profile.blocked_urls
+
+    def test_unknown_preset(self):
+        with self.assertRaises(ValueError):
+            ResourceBlockingProfile.from_config("everything")
+        assert ResourceBlockingProfile.from_config(None) is None
+
+
+if __name__ == '__main__':
+    unittest.main()
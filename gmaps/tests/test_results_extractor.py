@@ -0,0 +1,56 @@
+import unittest
+
+from gmaps.results.optimized_extractor import OptimizedResultsExtractor
+
+
+class FakeDriver:
+
+    def __init__(self, harvest=None):
+        self.harvest = harvest
+        self.scripts = 0
+
+    def execute_script(self, script, *args):
+        self.scripts += 1
+        return self.harvest
+
+
+class FakeResultsExtractor(OptimizedResultsExtractor):
+
+    def _build_driver(self, provided_driver_location=None, driver_options=None):
+        return FakeDriver()
+
+
+class TestOptimizedResultsExtractor(unittest.TestCase):
+    _base_url = "https://www.google.com/maps/place/28047+Madrid/@40.3911256,-3.763457,14z"
+
+    def setUp(self):
+        self.extractor = FakeResultsExtractor(postal_code="28047", places_types=["Bar"], num_pages=1,
+                                              base_url=self._base_url)
+
+    def test_harvest_page_skips_results_without_name(self):
+        driver = FakeDriver({"first": "first-card", "records": [
+            {"name": "Bar Pepe", "address": "Calle Mayor 1", "type": "Bar", "cost": None, "telephone": None},
+            {"name": None, "address": "Calle Mayor 2", "type": "Bar", "cost": None, "telephone": None},
+            {"name": "", "address": None, "type": None, "cost": None, "telephone": None}
+        ]})
+        places = self.extractor.harvest_page(driver)
+        assert driver.scripts == 1
+        assert [place["name"] for place in places] == ["Bar Pepe"]
+        assert places[0]["address"] == "Calle Mayor 1"
+        assert places[0]["url"] == \
+            "https://www.google.com/maps/search/28047+Madrid+Bar+Bar+Pepe/@40.3911256,-3.763457,14z"
+
+    def test_harvest_returns_first_result_of_page(self):
+        driver = FakeDriver({"first": "first-card", "records": [{"name": "Bar Pepe"}]})
+        places, first_result = self.extractor._harvest(driver)
+        assert first_result == "first-card"
+        assert len(places) == 1
+
+    def test_harvest_page_without_results(self):
+        driver = FakeDriver({"first": None, "records": []})
+        assert self.extractor.harvest_page(driver) == []
+        assert self.extractor._harvest(driver) == ([], None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import unittest
+
+from selenium.common.exceptions import NoSuchElementException
+
+from gmaps.places.extractor import PlacesExtractor
+from gmaps.places.reviews import ReviewCollector, _INSTALL_SCRIPT, _DRAIN_SCRIPT, _PENDING_SCRIPT, _SCROLL_SCRIPT
+from gmaps.places.writer import get_comment_fingerprint
+
+
+def get_review_text(author, content):
+    return "{author}\n3 reseñas\nhace una semana\n{content}\nMe gusta".format(author=author, content=content)
+
+
+class FakeDriver:
+    """Reproduce en python el estado que el observer de comentarios guarda en la página."""
+
+    def __init__(self):
+        self.rendered = []
+        self.state = None
+
+    def render(self, *texts):
+        self.rendered.extend(texts)
+        if self.state is not None:
+            self.state["pending"].extend(texts)
+
+    def navigate(self):
+        self.state = None
+
+    def execute_script(self, script, *args):
+        if script == _INSTALL_SCRIPT:
+            self.state = {"pending": list(self.rendered), "total": 0, "last": None}
+            return len(self.state["pending"])
+        if script == _DRAIN_SCRIPT:
+            if self.state is None:
+                return None
+            limit = args[0] if args[0] is not None else len(self.state["pending"])
+            drained, self.state["pending"] = self.state["pending"][:limit], self.state["pending"][limit:]
+            records = []
+            for text in drained:
+                records.append({"index": self.state["total"], "text": text})
+                self.state["total"] += 1
+                self.state["last"] = text
+            return records
+        if script == _PENDING_SCRIPT:
+            return len(self.state["pending"]) if self.state is not None else -1
+        if script == _SCROLL_SCRIPT:
+            return self.state is not None and self.state["last"] is not None
+
+    def find_element_by_xpath(self, xpath):
+        raise NoSuchElementException(xpath)
+
+
+class FakePlacesExtractor(PlacesExtractor):
+
+    def _build_driver(self, provided_driver_location=None, driver_options=None):
+        return FakeDriver()
+
+
+class TestReviewCollector(unittest.TestCase):
+
+    def test_drain_only_returns_new_reviews(self):
+        driver = FakeDriver()
+        driver.render("a", "b")
+        collector = ReviewCollector(driver, "review")
+        assert collector.install() == 2
+        assert [review["text"] for review in collector.drain()] == ["a", "b"]
+        assert collector.drain() == []
+        assert not collector.has_pending()
+        driver.render("c")
+        assert collector.has_pending()
+        assert collector.drain() == [{"index": 2, "text": "c"}]
+        assert collector.total == 3
+
+    def test_drain_leaves_reviews_over_limit_pending(self):
+        driver = FakeDriver()
+        driver.render("a", "b", "c")
+        collector = ReviewCollector(driver, "review")
+        collector.install()
+        assert [review["text"] for review in collector.drain(limit=2)] == ["a", "b"]
+        assert collector.has_pending()
+        assert [review["text"] for review in collector.drain()] == ["c"]
+
+    def test_drain_reinstalls_observer_after_navigation(self):
+        driver = FakeDriver()
+        collector = ReviewCollector(driver, "review")
+        collector.install()
+        assert not collector.scroll_to_last()
+        driver.navigate()
+        driver.render("a")
+        assert collector.has_pending()
+        assert [review["text"] for review in collector.drain()] == ["a"]
+        assert collector.scroll_to_last()
+
+
+class TestDrainComments(unittest.TestCase):
+
+    def setUp(self):
+        self.driver = FakeDriver()
+        self.driver.render(get_review_text("Ana", "Muy bueno"), get_review_text("Luis", "Normal"),
+                           get_review_text("Eva", "Caro"))
+        self.collector = ReviewCollector(self.driver, "review")
+        self.collector.install()
+
+    def get_extractor(self, num_reviews):
+        return FakePlacesExtractor(places_types=["bar"], num_reviews=num_reviews)
+
+    def test_comments_are_formatted_up_to_num_reviews(self):
+        comments, found_known = self.get_extractor(2)._drain_comments(self.collector, [])
+        assert not found_known
+        assert [(comment["author"], comment["content"]) for comment in comments] == [("Ana", "Muy bueno"),
+                                                                                     ("Luis", "Normal")]
+        assert comments[0]["publish_date"] == "hace una semana"
+
+    def test_known_comments_are_skipped(self):
+        known_fingerprints = {get_comment_fingerprint("Luis", "Normal")}
+        comments, found_known = self.get_extractor(5)._drain_comments(self.collector, [], known_fingerprints)
+        assert not found_known
+        assert [comment["author"] for comment in comments] == ["Ana", "Eva"]
+
+    def test_extraction_stops_at_first_known_comment(self):
+        known_fingerprints = {get_comment_fingerprint("Luis", "Normal")}
+        comments, found_known = self.get_extractor(5)._drain_comments(self.collector, [], known_fingerprints,
+                                                                      stop_at_known=True)
+        assert found_known
+        assert [comment["author"] for comment in comments] == ["Ana"]
+
+    def test_extracted_comments_are_skipped_without_stopping(self):
+        seen_fingerprints = {get_comment_fingerprint("Ana", "Muy bueno")}
+        comments, found_known = self.get_extractor(3)._drain_comments(self.collector, [{"author": "Ana"}],
+                                                                      seen_fingerprints=seen_fingerprints)
+        assert not found_known
+        assert [comment["author"] for comment in comments] == ["Ana", "Luis", "Eva"]
+
+    def test_comments_continue_from_the_payload_comments(self):
+        extractor = self.get_extractor(2)
+        payload_comments = [{"author": "Ana", "content": "Muy bueno"}]
+        comments = extractor._get_comments("Bar Pepe", 0, external_driver=self.driver, comments=payload_comments)
+        assert comments[0] is payload_comments[0]
+        assert [comment["author"] for comment in comments] == ["Ana", "Luis"]
+        assert payload_comments == [{"author": "Ana", "content": "Muy bueno"}]
+
+
+if __name__ == '__main__':
+    unittest.main()
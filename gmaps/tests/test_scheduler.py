@@ -0,0 +1,145 @@
+import os
+import subprocess
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+from gmaps.commons.extractor.landing import LANDING_CAPTCHA, BlockedPageException
+from gmaps.process.scheduler import WorkScheduler, emit, track_driver
+
+
+def _search(arguments):
+    for index in range(arguments.get("places")):
+        emit({"value": "{zip}-{index}".format(zip=arguments.get("zip"), index=index)})
+    return arguments.get("places")
+
+
+def _extract(arguments):
+    if arguments.get("value") == "fail":
+        raise ValueError("failed place")
+    if arguments.get("value") == "hang":
+        time.sleep(60)
+    if arguments.get("value") == "slow":
+        # sólo el primer intento es lento
+        try:
+            with open(arguments.get("marker"), "x"):
+                pass
+            time.sleep(60)
+        except FileExistsError:
+            pass
+    if arguments.get("value") == "blocked":
+        # sólo el primer intento es bloqueado
+        try:
+            with open(arguments.get("marker"), "x"):
+                pass
+            raise BlockedPageException(LANDING_CAPTCHA, "https://www.google.com/sorry/index")
+        except FileExistsError:
+            pass
+    return arguments.get("value")
+
+
+def _hang_with_browser(arguments):
+    # un proceso no registrado por la tarea, como los drivers ociosos del pool, y el "navegador" de la tarea
+    idle = subprocess.Popen(["sleep", "60"])
+    browser = subprocess.Popen(["sleep", "60"])
+    track_driver(SimpleNamespace(service=SimpleNamespace(process=browser)))
+    browser.wait()
+    with open(arguments.get("marker"), "w") as f:
+        f.write("idle alive" if idle.poll() is None else "idle killed")
+    idle.kill()
+    return arguments.get("value")
+
+
+class TestWorkScheduler(unittest.TestCase):
+
+    def test_spawned_tasks_are_executed(self):
+        scheduler = WorkScheduler(slots=2, handlers={"zip": _search, "place": _extract},
+                                  priorities={"place": 0, "zip": 1}, spawns={"zip": "place"})
+        scheduler.submit("zip", {"zip": "28001", "places": 3})
+        scheduler.submit("zip", {"zip": "28002", "places": 0})
+        results = scheduler.run()
+        assert sorted(results.get("zip")) == [0, 3]
+        assert sorted(results.get("place")) == ["28001-0", "28001-1", "28001-2"]
+
+    def test_failed_tasks_have_no_result(self):
+        scheduler = WorkScheduler(slots=1, handlers={"place": _extract})
+        scheduler.submit("place", {"value": "fail"})
+        scheduler.submit("place", {"value": "ok"})
+        assert scheduler.run().get("place") == ["ok"]
+
+    def test_fed_tasks_are_completed_in_chunks(self):
+        scheduler = WorkScheduler(slots=2, handlers={"place": _extract}, chunk_size=3)
+        scheduler.feed("place", ({"value": index} for index in range(10)), total=10)
+        completed = list(scheduler.iter_completed())
+        assert sorted([value for _, _, value in completed]) == list(range(10))
+        assert all([is_success for _, is_success, _ in completed])
+
+    def test_hung_tasks_are_cancelled_after_their_deadline(self):
+        scheduler = WorkScheduler(slots=2, handlers={"place": _extract}, deadlines={"place": 1}, max_attempts=2,
+                                  kill_grace=1)
+        scheduler.submit("place", {"value": "hang"})
+        scheduler.submit("place", {"value": "ok"})
+        completed = list(scheduler.iter_completed())
+        assert ("place", True, "ok") in completed
+        assert len([is_success for _, is_success, _ in completed if not is_success]) == 1
+        assert scheduler._stats.get("place").get("timeouts") == 2
+
+    def test_cancelled_task_only_kills_its_own_browsers(self):
+        marker = os.path.join(tempfile.mkdtemp(), "browser")
+        scheduler = WorkScheduler(slots=1, handlers={"place": _hang_with_browser}, deadlines={"place": 1},
+                                  max_attempts=1, kill_grace=10)
+        scheduler.submit("place", {"value": "hang", "marker": marker})
+        init_time = time.time()
+        completed = list(scheduler.iter_completed())
+        assert time.time() - init_time < 10
+        assert [is_success for _, is_success, _ in completed] == [False]
+        assert scheduler._killed_workers == 0
+        with open(marker) as f:
+            assert f.read() == "idle alive"
+
+    def test_duplicate_cancelled_before_start_is_not_killed_without_process(self):
+        scheduler = WorkScheduler(slots=2, handlers={"place": _extract}, kill_grace=0)
+        winner = scheduler._push("place", {"value": "slow"})
+        pending = scheduler._push("place", {"value": "slow"}, origin_id=winner.task_id)
+        started = scheduler._push("place", {"value": "slow"}, origin_id=winner.task_id)
+        scheduler._queue = []
+        for task in [winner, pending, started]:
+            scheduler._running[task.task_id] = task
+        winner.pid = started.pid = os.getpid()
+        winner.start_time = started.start_time = time.time()
+        scheduler._resolve(winner, True, "slow")
+        assert pending.cancel_time is not None and pending.kill_time is None
+        assert started.kill_time is not None
+        assert pending.task_id in scheduler._cancelled[:] and started.task_id in scheduler._cancelled[:]
+        scheduler._running.pop(started.task_id)
+        scheduler._supervise()
+        # el plazo antes de finalizar el proceso no cuenta hasta que la tarea empieza
+        assert scheduler._killed_workers == 0
+
+    def test_stragglers_are_duplicated_when_queue_is_drained(self):
+        marker = os.path.join(tempfile.mkdtemp(), "slow")
+        scheduler = WorkScheduler(slots=2, handlers={"place": _extract}, hedge_factor=2, hedge_min_samples=3,
+                                  kill_grace=1)
+        scheduler.submit("place", {"value": "slow", "marker": marker})
+        for index in range(5):
+            scheduler.submit("place", {"value": index})
+        init_time = time.time()
+        completed = list(scheduler.iter_completed())
+        assert time.time() - init_time < 30
+        assert len(completed) == 6
+        assert all([is_success for _, is_success, _ in completed])
+        assert scheduler._stats.get("place").get("hedged") == 1
+
+    def test_blocked_tasks_are_requeued_without_consuming_attempts(self):
+        marker = os.path.join(tempfile.mkdtemp(), "blocked")
+        scheduler = WorkScheduler(slots=1, handlers={"place": _extract}, max_attempts=1,
+                                  breaker={"enabled": True, "threshold": 0.5, "min_samples": 1, "backoff": 1})
+        scheduler.submit("place", {"value": "blocked", "marker": marker})
+        init_time = time.time()
+        assert list(scheduler.iter_completed()) == [("place", True, "blocked")]
+        assert time.time() - init_time >= 1
+        assert scheduler._stats.get("place").get("blocked") == 1
+
+    def test_emit_outside_scheduler(self):
+        assert not emit({"value": "ignored"})
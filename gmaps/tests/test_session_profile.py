@@ -0,0 +1,77 @@
+import os
+import tempfile
+import time
+import unittest
+
+from gmaps.commons.driver.pool import DriverPool
+from gmaps.commons.driver.session import SessionProfile
+
+
+class FakeDriver:
+
+    def __init__(self, cookies=None):
+        self.window_handles = ["main"]
+        self.switch_to = self
+        self.current_url = "https://www.google.com/maps"
+        self.browser_cookies = list(cookies) if cookies else []
+        self.injected = []
+
+    def window(self, handle):
+        pass
+
+    def get(self, url):
+        self.current_url = url
+
+    def execute_script(self, script, *args):
+        return {}
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        if cmd == "Network.getAllCookies":
+            return {"cookies": self.browser_cookies}
+        if cmd == "Network.clearBrowserCookies":
+            self.injected = []
+        if cmd == "Network.setCookies":
+            self.injected = cmd_args.get("cookies")
+        return {}
+
+
+class TestSessionProfile(unittest.TestCase):
+
+    def test_captured_session_is_saved_and_loaded(self):
+        file_path = os.path.join(tempfile.mkdtemp(), "session.json")
+        profile = SessionProfile.from_config({"enabled": True, "file_path": file_path})
+        assert not profile.load()
+        driver = FakeDriver([{"name": "SOCS", "value": "CAI", "domain": ".google.com", "path": "/", "size": 6,
+                              "session": True, "expires": -1},
+                             {"name": "other", "value": "1", "domain": ".example.com", "path": "/"}])
+        assert profile.capture(driver)
+        loaded = SessionProfile(file_path=file_path)
+        assert loaded.load()
+        assert loaded.cookies == [{"name": "SOCS", "value": "CAI", "domain": ".google.com", "path": "/"}]
+        loaded.created = time.time() - 100 * 3600
+        assert loaded.is_stale()
+
+    def test_locale_is_applied_to_driver_options(self):
+        profile = SessionProfile(locale="es-ES")
+        arguments = []
+        experimental = {}
+        profile.apply_options(arguments, experimental)
+        assert arguments == ["--lang=es-ES"]
+        assert experimental["prefs"]["intl.accept_languages"] == "es-ES,es"
+
+    def test_session_is_injected_again_when_pool_resets_driver(self):
+        profile = SessionProfile()
+        profile.cookies = [{"name": "SOCS", "value": "CAI", "domain": ".google.com", "path": "/"}]
+        pool = DriverPool(size=1)
+        driver = FakeDriver()
+        profile.apply_driver(driver)
+        driver.session_profile = profile
+        pool.release(pool.acquire(builder=lambda: driver))
+        assert pool.acquire(builder=FakeDriver).injected == profile.cookies
+
+    def test_disabled_by_default(self):
+        assert SessionProfile.from_config({"enabled": False}) is None
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import time
+import unittest
+
+from selenium.webdriver.common.by import By
+
+from gmaps.commons.extractor.waits import network_idle, spinner_stable, any_of, all_of
+
+
+class FakeElement:
+
+    def __init__(self, displayed=True):
+        self.displayed = displayed
+
+    def is_displayed(self):
+        return self.displayed
+
+
+class FakeDriver:
+
+    def __init__(self):
+        self.elements = []
+        self.resources = 0
+        self.ready_state = "loading"
+
+    def execute_script(self, script, *args):
+        if "readyState" in script:
+            return [self.ready_state, self.resources]
+        self.probed = args
+        return any(element.is_displayed() for element in self.elements)
+
+
+class TestWaits(unittest.TestCase):
+
+    def test_network_idle_waits_for_stable_resources(self):
+        driver = FakeDriver()
+        condition = network_idle(idle_time=0.05)
+        assert not condition(driver)
+        driver.ready_state = "complete"
+        assert not condition(driver)
+        driver.resources = 3
+        assert not condition(driver)
+        time.sleep(0.06)
+        assert condition(driver)
+
+    def test_spinner_stable(self):
+        driver = FakeDriver()
+        condition = spinner_stable((By.XPATH, "//spinner"), idle_time=0.05)
+        driver.elements = [FakeElement(displayed=True)]
+        assert not condition(driver)
+        driver.elements = [FakeElement(displayed=False)]
+        assert not condition(driver)
+        time.sleep(0.06)
+        assert condition(driver)
+        assert driver.probed == ("xpath", "//spinner")
+
+    def test_spinner_stable_translates_css_locators(self):
+        driver = FakeDriver()
+        spinner_stable((By.CLASS_NAME, "section-loading"))(driver)
+        assert driver.probed == ("css selector", ".section-loading")
+
+    def test_composed_conditions(self):
+        driver = FakeDriver()
+        driver.elements = [FakeElement()]
+        assert any_of(lambda d: False, spinner_stable((By.XPATH, "//spinner"), idle_time=0), lambda d: True)(driver)
+        assert not all_of(lambda d: True, spinner_stable((By.XPATH, "//spinner"), idle_time=0))(driver)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+
+from gmaps.executions.cost import ZipCostModel
+
+
+class TestZipCostModel(unittest.TestCase):
+
+    def setUp(self):
+        self.model = ZipCostModel([("28013", "Bar+Restaurante", 300), ("28013", "Restaurante+Bar", 200),
+                                   ("28013", "Cafe", 50), ("05001", "Bar", 4), ("50001", "Bar", 40)])
+
+    def test_cost_is_independent_of_types_order(self):
+        assert self.model.get_cost("28013", ["Restaurante", "Bar"]) == 250
+        assert self.model.get_cost("28013", ["Bar", "Restaurante"]) == 250
+
+    def test_cost_falls_back_to_zip_and_global_history(self):
+        assert self.model.get_cost("28013", ["Farmacia"]) == 150
+        assert self.model.get_cost("41001", ["Bar"]) == 45
+
+    def test_heaviest_zip_codes_go_first(self):
+        zip_config = [{"postal_code": "05001", "types": ["Bar"]}, {"postal_code": "41001", "types": ["Bar"]},
+                      {"postal_code": "28013", "types": ["Bar", "Restaurante"]}]
+        assert [zip_info.get("postal_code") for zip_info in self.model.sort(zip_config)] == ["28013", "41001", "05001"]
+
+    def test_durations_weight_the_expected_places(self):
+        model = ZipCostModel([("28013", "Bar", 100), ("05001", "Bar", 60), ("50001", "Bar", 10)],
+                             [("28013", "Bar", 2), ("05001", "Bar", 5), ("05001", "Cafe", 7)])
+        assert model.get_cost("28013", ["Bar"]) == 200
+        assert model.get_cost("05001", ["Bar"]) == 300
+        # sin duraciones del código postal se usa la mediana de todo el histórico de duraciones
+        assert model.get_cost("50001", ["Bar"]) == 50
+        zip_config = [{"postal_code": "28013", "types": ["Bar"]}, {"postal_code": "05001", "types": ["Bar"]}]
+        assert [zip_info.get("postal_code") for zip_info in model.sort(zip_config)] == ["05001", "28013"]
@@ -2,8 +2,7 @@ import json
 import logging
 import os
 
-import psycopg2
-
+from gmaps.commons.db.connection_pool import get_connection_pool
 from gmaps.commons.writer.writer import FileWriter, DbWriter
 
 
@@ -72,16 +71,18 @@ class UrlDbWriter(DbWriter):
     logger : logging.Logger
         logger de la clase.
     db
-        referencia a la conexión a la base de datos.
+        referencia a la conexión a la base de datos, prestada por el pool de conexiones del proceso.
+    _pool_config : dict
+        configuración del pool de conexiones (`pool` en la configuración de la base de datos).
     _insert_zip_code_info : str
         query para hacer las insercciónes en la tabla `zip_code_info`
 
     Methods
     -------
     auto_boot()
-        función encargada de abrir la conexión a la base de datos.
+        función encargada de tomar prestada una conexión del pool de conexiones del proceso.
     finish()
-        función encargada de cerrar la conexión a la base de datos.
+        función encargada de devolver la conexión al pool de conexiones del proceso.
     write(element)
         escribe la información de element en la base de datos.
     """
@@ -98,6 +99,7 @@ class UrlDbWriter(DbWriter):
         self.db_name = config.get("database")
         self.logger = logging.getLogger(self.__class__.__name__)
         self.db = None
+        self._pool_config = config.get("pool")
         self._insert_zip_code_info = """
             INSERT INTO zip_code_info
             (
@@ -107,16 +109,18 @@ class UrlDbWriter(DbWriter):
         """
 
     def finish(self):
-        """Función encargada de cerrar la conexión a la base de datos."""
-        self.db.close()
+        """Función encargada de devolver la conexión a la base de datos al pool de conexiones del proceso."""
+        if self.db is not None:
+            get_connection_pool(self.host, self.db_name, self.db_user, self.db_pass, self._pool_config).release(
+                self.db)
+            self.db = None
 
     def auto_boot(self):
-        self.db = psycopg2.connect(
-            host=self.host,
-            user=self.db_user,
-            password=self.db_pass,
-            database=self.db_name
-        )
+        """Función encargada de tomar prestada una conexión del pool de conexiones del proceso. Si la instancia ya
+        tiene una conexión, no hace nada."""
+        if self.db is None:
+            self.db = get_connection_pool(self.host, self.db_name, self.db_user, self.db_pass,
+                                          self._pool_config).acquire()
 
     def write(self, element, is_update=False):
         """Escribe la información del código postal en la base de datos.